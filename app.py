@@ -1,4 +1,5 @@
-import json
+import io
+import zipfile
 from pathlib import Path
 from typing import Dict, Any, List
 
@@ -9,7 +10,6 @@ import pandas as pd
 BACKEND_URL = "http://127.0.0.1:8000"
 
 PDF_SAVE_DIR = Path("pdfs")
-PDF_SAVE_DIR.mkdir(exist_ok=True)
 
 st.set_page_config(page_title="Invoice QC Console", layout="wide")
 st.title("Invoice QC Console")
@@ -25,6 +25,11 @@ try:
 except Exception:
     st.sidebar.error("Not reachable")
 
+save_uploads = st.sidebar.checkbox(
+    f"Also save uploads to {PDF_SAVE_DIR}/ for the CLI",
+    value=False,
+)
+
 
 # ---------------- Upload ----------------
 uploaded_files = st.file_uploader(
@@ -33,11 +38,12 @@ uploaded_files = st.file_uploader(
     accept_multiple_files=True,
 )
 
-if uploaded_files:
+if uploaded_files and save_uploads:
 
     saved_paths = []
 
-    # ✅ SAVE PDFs LOCALLY so CLI can see them
+    # Only on request: the API does not need these copies
+    PDF_SAVE_DIR.mkdir(exist_ok=True)
     for f in uploaded_files:
         save_path = PDF_SAVE_DIR / f.name
         with open(save_path, "wb") as out:
@@ -53,8 +59,12 @@ if uploaded_files and st.button("Run QC on uploaded PDFs"):
 
     with st.spinner("Uploading to backend + processing..."):
 
+        # File objects, not getvalue() copies. requests still reads each
+        # file once into the multipart body it builds in memory.
+        for f in uploaded_files:
+            f.seek(0)
         files = [
-            ("files", (f.name, f.getvalue(), "application/pdf"))
+            ("files", (f.name, f, "application/pdf"))
             for f in uploaded_files
         ]
 
@@ -99,35 +109,52 @@ if uploaded_files and st.button("Run QC on uploaded PDFs"):
 
     status_map = {r["invoice_id"]: r["is_valid"] for r in results}
 
-    for inv in extracted:
-        invoice_id = inv.get("invoice_number") or inv.get("source_pdf") or "UNKNOWN"
-        is_valid = status_map.get(invoice_id)
-
-        col1, col2 = st.columns([3, 1])
-
-        with col1:
-            st.write(
-                f"**{invoice_id}** | Buyer: {inv.get('buyer_name') or '-'} | "
-                f"Seller: {inv.get('seller_name') or '-'}"
-            )
-
-        with col2:
-            try:
-                resp = requests.post(
-                    f"{backend_url}/generate-report-pdf",
-                    json=inv,
-                    params={"is_valid": json.dumps(is_valid)},
-                )
-
-                pdf_hex = resp.json()["pdf_hex"]
-                pdf_bytes = bytes.fromhex(pdf_hex)
-
-                st.download_button(
-                    label="⬇️ Download PDF",
-                    data=pdf_bytes,
-                    file_name=f"{invoice_id}.pdf",
-                    mime="application/pdf",
-                )
-
-            except Exception as e:
-                st.error(f"PDF generation error: {e}")
+    # One request renders every report; the ZIP entries come back in the
+    # same order as the invoices sent.
+    reports_zip = None
+    try:
+        resp = requests.post(
+            f"{backend_url}/report-pdfs",
+            json=[
+                {
+                    "invoice": inv,
+                    "is_valid": status_map.get(
+                        inv.get("invoice_number") or inv.get("source_pdf") or "UNKNOWN"
+                    ),
+                }
+                for inv in extracted
+            ],
+        )
+        resp.raise_for_status()
+        reports_zip = resp.content
+    except Exception as e:
+        st.error(f"PDF generation error: {e}")
+
+    if reports_zip is not None:
+        st.download_button(
+            label="⬇️ Download all (ZIP)",
+            data=reports_zip,
+            file_name="invoice_reports.zip",
+            mime="application/zip",
+        )
+
+        with zipfile.ZipFile(io.BytesIO(reports_zip)) as zf:
+            for idx, (inv, entry) in enumerate(zip(extracted, zf.namelist())):
+                invoice_id = inv.get("invoice_number") or inv.get("source_pdf") or "UNKNOWN"
+
+                col1, col2 = st.columns([3, 1])
+
+                with col1:
+                    st.write(
+                        f"**{invoice_id}** | Buyer: {inv.get('buyer_name') or '-'} | "
+                        f"Seller: {inv.get('seller_name') or '-'}"
+                    )
+
+                with col2:
+                    st.download_button(
+                        label="⬇️ Download PDF",
+                        data=zf.read(entry),
+                        file_name=f"{invoice_id}.pdf",
+                        mime="application/pdf",
+                        key=f"report-{idx}",
+                    )
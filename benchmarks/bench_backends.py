@@ -0,0 +1,128 @@
+"""
+Benchmark: text backends on the same PDFs.
+
+    python -m benchmarks.bench_backends [--count 32] [--samples pdfs] [--repeat 3]
+
+Extracts the sample PDFs and a synthetic corpus (benchmarks.corpus, about
+100 pages at the default --count) once per installed backend
+(ExtractOptions(backend=...)), best of --repeat runs each, without the
+cache. Prints ms per page and the speedup over pdfplumber, per-field
+agreement with pdfplumber's fields, and the corpus field accuracy
+against its truth.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from invoice_qc.backends import BACKENDS, DEFAULT_BACKEND
+from invoice_qc.extractor import ExtractOptions, extract_invoice_from_file
+
+from .bench_pipeline import FIELDS, field_accuracy
+from .corpus import add_corpus_arguments, corpus_kwargs, generate_corpus
+
+
+def _extract_all(paths: List[Path], options: ExtractOptions):
+    invoices = []
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, "rb") as fh:
+            invoices.append(extract_invoice_from_file(fh, path.name, options=options))
+    return invoices, time.perf_counter() - start
+
+
+def _agreement(reference, invoices) -> dict:
+    """Share of PDFs on which each field equals the reference's."""
+    return {
+        name: round(
+            sum(getattr(a, name) == getattr(b, name) for a, b in zip(reference, invoices))
+            / max(len(reference), 1),
+            4,
+        )
+        for name in FIELDS
+    }
+
+
+def _compare(label: str, paths: List[Path], backends: List[str], repeat: int, truth=None):
+    results = {}
+    for backend in backends:
+        options = ExtractOptions(backend=backend)
+        runs = [_extract_all(paths, options) for _ in range(repeat)]
+        results[backend] = (runs[0][0], min(seconds for _, seconds in runs))
+
+    reference, reference_s = results[DEFAULT_BACKEND]
+    pages = sum(inv.pages_parsed or 0 for inv in reference)
+
+    print(f"\n{label}: {len(paths)} PDFs, {pages} pages")
+    print(f"{'':<12}{'total s':>9}{'ms/page':>10}{'speedup':>9}{'agree':>8}")
+    for backend, (invoices, seconds) in results.items():
+        agreement = _agreement(reference, invoices)
+        overall = sum(agreement.values()) / len(agreement)
+        print(
+            f"{backend:<12}{seconds:>9.3f}{seconds * 1e3 / max(pages, 1):>10.2f}"
+            f"{reference_s / seconds:>8.2f}x{overall:>8.1%}"
+        )
+
+    for backend, (invoices, _) in results.items():
+        if backend == DEFAULT_BACKEND:
+            continue
+        differing = [
+            f"{a.source_pdf}:{name}"
+            for a, b in zip(reference, invoices)
+            for name in FIELDS
+            if getattr(a, name) != getattr(b, name)
+        ]
+        print(
+            f"agreement ({backend}): {json.dumps(_agreement(reference, invoices))}"
+            + (f" differing: {differing[:5]}" if differing else "")
+        )
+
+    if truth is not None:
+        for backend, (invoices, _) in results.items():
+            accuracy = field_accuracy(invoices, truth)
+            print(f"accuracy ({backend}): {json.dumps(accuracy)}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", default="pdfs", help="Directory of sample PDFs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--backends",
+        default=",".join(BACKENDS),
+        help="Comma-separated backends to compare (pdfplumber is always included)",
+    )
+    parser.add_argument(
+        "--corpus-dir",
+        default=None,
+        help="Reuse (or create) the corpus here instead of a temp directory",
+    )
+    add_corpus_arguments(parser)
+    parser.set_defaults(count=32)
+    args = parser.parse_args(argv)
+
+    backends = [DEFAULT_BACKEND] + [
+        name
+        for name in args.backends.split(",")
+        if name != DEFAULT_BACKEND and BACKENDS[name].available()
+    ]
+
+    samples = sorted(Path(args.samples).glob("*.pdf"))
+    if samples:
+        _compare("samples", samples, backends, args.repeat)
+
+    with tempfile.TemporaryDirectory(prefix="invoice_qc_bench_") as tmp:
+        corpus = Path(args.corpus_dir) if args.corpus_dir else Path(tmp) / "corpus"
+        truth_file = corpus / "truth.json"
+        if not truth_file.exists():
+            generate_corpus(str(corpus), args.count, seed=args.seed, **corpus_kwargs(args))
+        truth = json.loads(truth_file.read_text(encoding="utf-8"))
+        paths = [corpus / t["filename"] for t in truth]
+        _compare("synthetic corpus", paths, backends, args.repeat, truth)
+
+
+if __name__ == "__main__":
+    main()
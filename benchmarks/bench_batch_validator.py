@@ -0,0 +1,93 @@
+"""
+Benchmark: per-object validate_invoices vs columnar validate_columns.
+
+    python -m benchmarks.bench_batch_validator [--count 200000]
+
+Generates random invoices (with missing fields, bad currencies, negative
+amounts, mismatched totals and duplicates), checks that both validators
+return the same output and prints their timings: with per-row result
+dicts, with lazy (columnar) results, and summary only.
+"""
+
+import argparse
+import random
+import time
+from datetime import date
+from typing import List
+
+from invoice_qc.batch_validator import invoices_to_columns, validate_columns
+from invoice_qc.schema import Invoice
+from invoice_qc.validator import validate_invoices
+
+
+def make_invoices(count: int, seed: int = 0) -> List[Invoice]:
+    rng = random.Random(seed)
+    invoices = []
+    for i in range(count):
+        net = round(rng.uniform(-5, 1000), 2)
+        tax = round(net * 0.19, 2)
+        gross = net + tax if rng.random() < 0.9 else round(rng.uniform(0, 1200), 2)
+        invoices.append(
+            Invoice(
+                source_pdf=f"invoice_{i}.pdf",
+                invoice_number=f"AUFNR{rng.randint(1, count)}" if rng.random() < 0.97 else None,
+                invoice_date=date(rng.choice([1999, 2023, 2024, 2025]), rng.randint(1, 12), 1),
+                seller_name=rng.choice(["Abc Corporation", "Xyz Gmbh", None]),
+                buyer_name=rng.choice(["Example Ag", "Beispiel Gmbh"]),
+                currency=rng.choice(["EUR", "EUR", "usd", "XYZ", None]),
+                net_total=net,
+                tax_amount=tax,
+                gross_total=gross,
+            )
+        )
+    return invoices
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    invoices = make_invoices(args.count)
+
+    start = time.perf_counter()
+    expected = validate_invoices(invoices)
+    per_object = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = invoices_to_columns(invoices)
+    to_columns = time.perf_counter() - start
+
+    start = time.perf_counter()
+    got = validate_columns(columns)
+    columnar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lazy = validate_columns(columns, lazy=True)
+    columnar_lazy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summary_only = validate_columns(columns, include_results=False)
+    columnar_summary = time.perf_counter() - start
+
+    assert got == expected, "columnar results differ"
+    assert lazy["results"].to_list() == expected["results"], "lazy results differ"
+    assert list(lazy["results"][:100]) == expected["results"][:100], "lazy rows differ"
+    assert summary_only["summary"] == expected["summary"], "summaries differ"
+
+    print(f"invoices                 : {args.count}")
+    print(f"validate_invoices        : {per_object:.3f} s")
+    print(f"invoices_to_columns      : {to_columns:.3f} s")
+    print(f"validate_columns         : {columnar:.3f} s ({per_object / columnar:.1f}x)")
+    print(
+        f"validate_columns lazy    : {columnar_lazy:.3f} s "
+        f"({per_object / columnar_lazy:.1f}x)"
+    )
+    print(
+        f"validate_columns summary : {columnar_summary:.3f} s "
+        f"({per_object / columnar_summary:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
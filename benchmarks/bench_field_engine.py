@@ -0,0 +1,140 @@
+"""
+Micro-benchmark: the original per-field text scans vs extract_fields.
+
+    python -m benchmarks.bench_field_engine [--pages 200] [--repeat 20]
+
+Builds a large text blob (an invoice page followed by annex pages), checks
+that both paths return identical fields on it and on PARITY_TEXTS, and
+prints timings for each.
+"""
+
+import argparse
+import re
+import time
+
+from invoice_qc.extractor import (
+    DATE_PATTERN,
+    extract_fields,
+    normalize_name,
+    parse_amount,
+    parse_date,
+)
+
+INVOICE_PAGE = """Seite 1 von 1
+ABC Corporation Bestellung AUFNR34343 im Auftrag von 3498578433
+Beispielname Unternehmen
+Albertus-Magnus-Str. 8,
+12345 Köln Deutschland
+Bestellung AUFNR34343 vom 22.05.2024
+1 Sterilisationsmittel 4 VE 1 VE=20 Stück 64,00
+Gesamtwert EUR 64,00
+MwSt. 19,00% EUR 12,16
+Gesamtwert inkl. MwSt. EUR 76,16"""
+
+ANNEX_LINE = "Pos. {i} Artikelbeschreibung Menge 4 VE Einzelpreis 16,0000 Lieferung {i}.05.2024"
+
+
+# Edge cases the two paths must agree on as well
+PARITY_TEXTS = [
+    "Bestellung AUFNR: 12345 vom 22.05.2024",
+    "Bestellung AUFNR: 12345 vom 22.05.2024\nBestellung AUFNR34343 vom 23.05.2024",
+    "AUFNR\n" + INVOICE_PAGE,
+    "Bestellung vom 22.05.2024\nGesamtwert EUR 64,00",
+    "",
+]
+
+
+def build_text(pages: int, lines_per_page: int = 40) -> str:
+    annex = "\n".join(ANNEX_LINE.format(i=i) for i in range(lines_per_page))
+    return "\n".join([INVOICE_PAGE] + [annex] * pages)
+
+
+# -------------------- Baseline (pre-engine extractors) --------------------
+
+def _buyer(text: str):
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    for i, line in enumerate(lines):
+        if "deutschland" in line.lower() or re.search(r"\b[0-9]{5}\b", line):
+            if i > 0:
+                return normalize_name(lines[i - 1])
+    return None
+
+
+def _seller(text: str):
+    m = re.search(r"\n([A-Za-z\s]+(?:Corporation|GmbH|Ltd))", text)
+    if m:
+        return normalize_name(m.group(1))
+    name_match = re.search(r"\b([A-Za-z ]{4,40}(?:Corporation|GmbH|Ltd))\b", text)
+    return normalize_name(name_match.group(1)) if name_match else None
+
+
+def _totals(text: str):
+    net = tax = gross = None
+    for line in text.splitlines():
+        lower = line.lower()
+        numbers = re.findall(r"[€]?\s*[\d.,]+", line)
+        if not numbers:
+            continue
+        value = parse_amount(numbers[-1])
+        if not value:
+            continue
+        if any(k in lower for k in ["netto", "net total", "net amount", "subtotal"]):
+            net = value
+        elif any(k in lower for k in ["mwst", "tax", "vat", "gst"]):
+            tax = value
+        elif any(k in lower for k in ["gesamt", "gross", "total"]):
+            gross = value
+    return net, tax, gross
+
+
+def separate_scans(text: str) -> dict:
+    m = re.search(r"(AUFNR\d+)", text)
+    d = re.search(r"Bestellung\s+AUFNR\d+.*?vom\s+" + DATE_PATTERN, text)
+    net, tax, gross = _totals(text)
+    return {
+        "invoice_number": m.group(1) if m else None,
+        "invoice_date": parse_date(d.group(1)) if d else None,
+        "buyer_name": _buyer(text),
+        "seller_name": _seller(text),
+        "currency": "EUR" if "EUR" in text or "€" in text else None,
+        "net_total": net,
+        "tax_amount": tax,
+        "gross_total": gross,
+    }
+
+
+# -------------------- Benchmark --------------------
+
+
+def _time(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    text = build_text(args.pages)
+    for sample in PARITY_TEXTS + [text]:
+        assert separate_scans(sample) == extract_fields(sample), (
+            f"field mismatch on {sample[:60]!r}"
+        )
+
+    old = _time(separate_scans, text, args.repeat)
+    new = _time(extract_fields, text, args.repeat)
+
+    print(f"text size       : {len(text) / 1024:.0f} KiB")
+    print(f"separate scans  : {old * 1000:.2f} ms")
+    print(f"extract_fields  : {new * 1000:.2f} ms")
+    print(f"speedup         : {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
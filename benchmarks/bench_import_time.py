@@ -0,0 +1,66 @@
+"""
+Benchmark: interpreter startup plus import time of the package entry points.
+
+    python -m benchmarks.bench_import_time [--repeat 10]
+
+Every target runs in a fresh interpreter. The "everything" row imports the
+PDF stack up front, which is what each entry point cost before imports
+were made lazy. The last column lists the heavy dependencies each target
+ends up loading.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY = ("pdfplumber", "reportlab", "numpy", "fastapi")
+
+TARGETS = [
+    ("python (no imports)", "pass"),
+    ("import invoice_qc", "import invoice_qc"),
+    ("import invoice_qc.validator", "import invoice_qc.validator"),
+    ("import invoice_qc.cli", "import invoice_qc.cli"),
+    ("cli --help", "import sys; sys.argv = ['cli', '--help']\n"
+                   "from invoice_qc.cli import main\n"
+                   "try:\n    main()\nexcept SystemExit:\n    pass"),
+    ("everything", "import invoice_qc.cli, invoice_qc.pdf_generator, pdfplumber"),
+]
+
+
+def _run(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def _loaded(code: str) -> str:
+    probe = (
+        f"{code}\nimport sys\n"
+        f"print('loaded:' + ','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", probe], check=True, capture_output=True, text=True
+    ).stdout
+    loaded = out[out.rindex("loaded:") + len("loaded:"):].strip()
+    return loaded or "-"
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print(f"{'target':<30}{'min ms':>9}{'median ms':>11}  heavy modules loaded")
+    for label, code in TARGETS:
+        _run(code)  # warm the filesystem and bytecode caches
+        runs = [_run(code) for _ in range(args.repeat)]
+        print(
+            f"{label:<30}{min(runs) * 1e3:>9.1f}{statistics.median(runs) * 1e3:>11.1f}"
+            f"  {_loaded(code)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
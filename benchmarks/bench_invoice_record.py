@@ -0,0 +1,107 @@
+"""
+Benchmark: pydantic Invoice vs slotted InvoiceRecord on the pipeline path.
+
+    python -m benchmarks.bench_invoice_record [--count 200000]
+
+Builds the same random invoices as bench_batch_validator in each form from
+prepared field dicts (what extract_fields returns), then times
+construction, dict(), a JSON round trip (the cache format), validation and
+the from_model / to_model conversions, and measures the memory held per
+invoice with tracemalloc. Field values are shared with the input dicts,
+so the memory column is the per-object overhead.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+import warnings
+from typing import Callable, Dict, List
+
+from invoice_qc.schema import INVOICE_FIELDS, Invoice, InvoiceRecord
+from invoice_qc.validator import validate_invoices
+
+from .bench_batch_validator import make_invoices
+
+# Invoice.construct/dict/json/parse_raw are the v1 names the repo uses
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+
+def _construct(fields: Dict):
+    # construct() is a deprecated alias that warns on every call in pydantic 2
+    construct = getattr(Invoice, "model_construct", None) or Invoice.construct
+    return construct(**fields)
+
+
+def _timed(fn: Callable, *args):
+    gc.collect()
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+
+def _held_bytes(build: Callable, fields: List[Dict]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    objects = build(fields)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return held / len(fields)
+
+
+FORMS = {
+    "Invoice(...)": lambda fs: [Invoice(**f) for f in fs],
+    "Invoice.construct": lambda fs: [_construct(f) for f in fs],
+    "InvoiceRecord": lambda fs: [InvoiceRecord(**f) for f in fs],
+}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    # line_items is passed explicitly: pydantic 2 model_construct inspects
+    # the default factory's signature on every call when it is missing
+    fields = [
+        {**{name: getattr(inv, name) for name in INVOICE_FIELDS}, "line_items": []}
+        for inv in make_invoices(args.count)
+    ]
+
+    print(f"invoices: {args.count}")
+    print(f"{'':<20}{'build s':>10}{'bytes/invoice':>15}")
+    built = {}
+    for label, build in FORMS.items():
+        built[label], seconds = _timed(build, fields)
+        print(f"{label:<20}{seconds:>10.3f}{_held_bytes(build, fields):>15.0f}")
+
+    models = built["Invoice(...)"]
+    records = built["InvoiceRecord"]
+
+    rows = [
+        ("dict()", lambda xs: [x.dict() for x in xs]),
+        ("json()", lambda xs: [x.json() for x in xs]),
+        ("validate_invoices", validate_invoices),
+    ]
+    print(f"\n{'':<20}{'Invoice s':>11}{'record s':>11}")
+    for label, fn in rows:
+        expected, model_s = _timed(fn, models)
+        got, record_s = _timed(fn, records)
+        if label != "json()":
+            assert got == expected, f"{label} differs"
+        print(f"{label:<20}{model_s:>11.3f}{record_s:>11.3f}  ({model_s / record_s:.1f}x)")
+
+    raw = [r.json() for r in records]
+    parsed, model_s = _timed(lambda: [Invoice.parse_raw(s) for s in raw])
+    got, record_s = _timed(lambda: [InvoiceRecord.parse_raw(s) for s in raw])
+    assert [p.dict() for p in parsed] == [g.dict() for g in got], "parse_raw differs"
+    print(f"{'parse_raw':<20}{model_s:>11.3f}{record_s:>11.3f}  ({model_s / record_s:.1f}x)")
+
+    _, from_s = _timed(lambda: [InvoiceRecord.from_model(m) for m in models])
+    _, to_s = _timed(lambda: [r.to_model() for r in records])
+    print(f"\nfrom_model: {from_s:.3f} s   to_model: {to_s:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
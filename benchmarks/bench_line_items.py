@@ -0,0 +1,127 @@
+"""
+Benchmark: cost of line-item extraction.
+
+    python -m benchmarks.bench_line_items [--count 32] [--samples pdfs] [--repeat 3]
+
+Extracts the sample PDFs and a synthetic corpus (benchmarks.corpus, about
+100 pages at the default --count) with and without line items, in full
+page and --regions mode, best of --repeat runs each, without the cache.
+Prints ms per invoice for each mode and the overhead of line items, the
+time extract_line_items itself takes on the page text, the items found,
+and the share of corpus invoices whose line totals add up to the true
+net total.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from invoice_qc.backends import BACKENDS
+from invoice_qc.extractor import (
+    ExtractOptions,
+    _read_pages,
+    extract_invoice_from_file,
+    extract_line_items,
+)
+
+from .corpus import add_corpus_arguments, corpus_kwargs, generate_corpus
+
+MODES = {
+    "full page": (ExtractOptions(line_items=False), ExtractOptions()),
+    "regions": (
+        ExtractOptions(regions=True, line_items=False),
+        ExtractOptions(regions=True),
+    ),
+}
+
+
+def _extract_all(paths: List[Path], options: ExtractOptions):
+    invoices = []
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, "rb") as fh:
+            invoices.append(extract_invoice_from_file(fh, path.name, options=options))
+    return invoices, time.perf_counter() - start
+
+
+def _best(paths: List[Path], options: ExtractOptions, repeat: int):
+    runs = [_extract_all(paths, options) for _ in range(repeat)]
+    return runs[0][0], min(seconds for _, seconds in runs)
+
+
+def _texts(paths: List[Path]) -> List[str]:
+    texts = []
+    for path in paths:
+        with open(path, "rb") as fh, BACKENDS["pdfplumber"](fh) as doc:
+            pages = _read_pages(doc, ExtractOptions())
+        texts.append("\n".join(pages[i] for i in sorted(pages)))
+    return texts
+
+
+def _compare(label: str, paths: List[Path], repeat: int, truth=None) -> None:
+    n = max(len(paths), 1)
+    print(f"\n{label}: {len(paths)} PDFs")
+    print(f"{'':<12}{'without':>10}{'with':>10}{'overhead':>10}   ms/invoice")
+
+    with_items = None
+    for mode, (without, with_) in MODES.items():
+        _, without_s = _best(paths, without, repeat)
+        invoices, with_s = _best(paths, with_, repeat)
+        with_items = with_items or invoices
+        print(
+            f"{mode:<12}{without_s * 1e3 / n:>10.2f}{with_s * 1e3 / n:>10.2f}"
+            f"{(with_s - without_s) * 1e3 / n:>+10.2f}"
+        )
+
+    texts = _texts(paths)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            extract_line_items(text)
+    parse_ms = (time.perf_counter() - start) * 1e3 / (repeat * n)
+    print(f"extract_line_items alone: {parse_ms:.3f} ms/invoice")
+
+    items = sum(len(inv.line_items) for inv in with_items)
+    print(f"items: {items} ({items / n:.1f} per invoice)")
+
+    if truth is not None:
+        consistent = sum(
+            round(sum(item["line_total"] for item in inv.line_items), 2)
+            == expected["net_total"]
+            for inv, expected in zip(with_items, truth)
+        )
+        print(f"line totals add up to the true net total: {consistent / n:.1%}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", default="pdfs", help="Directory of sample PDFs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--corpus-dir",
+        default=None,
+        help="Reuse (or create) the corpus here instead of a temp directory",
+    )
+    add_corpus_arguments(parser)
+    parser.set_defaults(count=32)
+    args = parser.parse_args(argv)
+
+    samples = sorted(Path(args.samples).glob("*.pdf"))
+    if samples:
+        _compare("samples", samples, args.repeat)
+
+    with tempfile.TemporaryDirectory(prefix="invoice_qc_bench_") as tmp:
+        corpus = Path(args.corpus_dir) if args.corpus_dir else Path(tmp) / "corpus"
+        truth_file = corpus / "truth.json"
+        if not truth_file.exists():
+            generate_corpus(str(corpus), args.count, seed=args.seed, **corpus_kwargs(args))
+        truth = json.loads(truth_file.read_text(encoding="utf-8"))
+        paths = [corpus / t["filename"] for t in truth]
+        _compare("synthetic corpus", paths, args.repeat, truth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Benchmark suite: per-stage timings over a synthetic invoice corpus.
+
+    python -m benchmarks.bench_pipeline [--count 200] [--out bench_results.json]
+
+Generates a corpus with benchmarks.corpus (or reuses --corpus-dir), then
+times each stage on its own:
+
+  extract   extract_invoice_from_file per PDF (no cache)
+  validate  validate_invoices over the whole batch
+  render    one QC report PDF per invoice
+  api       the HTTP endpoints through an in-process TestClient
+
+Field accuracy against the corpus truth is reported alongside, so a speedup
+that breaks extraction shows up in the same file. Results are written as
+JSON; compare two files to spot regressions between versions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from invoice_qc.extractor import (
+    EXTRACTOR_VERSION,
+    ExtractOptions,
+    extract_invoice_from_file,
+)
+from invoice_qc.pdf_generator import InvoiceReportRenderer
+from invoice_qc.schema import Invoice
+from invoice_qc.validator import validate_invoices
+
+from .corpus import add_corpus_arguments, corpus_kwargs, generate_corpus
+
+FIELDS = (
+    "invoice_number",
+    "invoice_date",
+    "seller_name",
+    "buyer_name",
+    "net_total",
+    "tax_amount",
+    "gross_total",
+)
+
+
+def latency_stats(samples: List[float]) -> Dict:
+    """Summary of per-item latencies given in seconds."""
+    ordered = sorted(samples)
+    n = len(ordered)
+    if not n:
+        return {"count": 0}
+    total = sum(ordered)
+    return {
+        "count": n,
+        "total_s": round(total, 4),
+        "per_s": round(n / total, 2) if total else None,
+        "mean_ms": round(total / n * 1e3, 3),
+        "p50_ms": round(ordered[n // 2] * 1e3, 3),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))] * 1e3, 3),
+        "max_ms": round(ordered[-1] * 1e3, 3),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+# -------------------- Stages --------------------
+
+def bench_extract(paths: List[Path], options: ExtractOptions):
+    invoices, samples = [], []
+    pages = 0
+    for path in paths:
+        start = time.perf_counter()
+        with open(path, "rb") as fh:
+            inv = extract_invoice_from_file(fh, path.name, options=options)
+        samples.append(time.perf_counter() - start)
+        invoices.append(inv)
+        pages += inv.pages_parsed or 0
+
+    stats = latency_stats(samples)
+    stats["pages_parsed"] = pages
+    stats["pages_per_s"] = round(pages / sum(samples), 2) if samples else None
+    return invoices, stats
+
+
+def bench_validate(invoices: List[Invoice], repeat: int) -> Dict:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        validation = validate_invoices(invoices)
+        runs.append(time.perf_counter() - start)
+
+    best = min(runs)
+    return {
+        "count": len(invoices),
+        "repeat": repeat,
+        "best_s": round(best, 5),
+        "median_s": round(statistics.median(runs), 5),
+        "per_s": round(len(invoices) / best, 1) if best else None,
+        "invalid": validation["summary"]["invalid_invoices"],
+        "duplicates": validation["summary"]["error_counts"].get("duplicate:invoice", 0),
+    }
+
+
+def bench_render(invoices: List[Invoice]) -> Dict:
+    renderer = InvoiceReportRenderer()
+    samples = []
+    size = 0
+    for inv in invoices:
+        start = time.perf_counter()
+        pdf = renderer.render_bytes(inv, status=True)
+        samples.append(time.perf_counter() - start)
+        size += len(pdf)
+
+    stats = latency_stats(samples)
+    stats["bytes"] = size
+    return stats
+
+
+@contextmanager
+def _api_client(workdir: Path):
+    """
+    In-process client for invoice_qc.api with every on-disk store pointed
+    at workdir, so runs do not see each other's cache or duplicates.
+    """
+    os.environ["INVOICE_QC_CACHE_DIR"] = ""
+    os.environ["INVOICE_QC_DUP_INDEX"] = ""
+    os.environ["INVOICE_QC_JOB_DIR"] = str(workdir / "jobs")
+    os.environ["INVOICE_QC_REPORT_DB"] = str(workdir / "reports.sqlite")
+
+    from fastapi.testclient import TestClient
+
+    from invoice_qc.api import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    resp = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    resp.raise_for_status()
+    return resp, elapsed
+
+
+def bench_api(paths: List[Path], invoices: List[Invoice], batch: int, workdir: Path) -> Dict:
+    records = [json.loads(inv.json()) for inv in invoices]
+    results = {}
+
+    with _api_client(workdir) as client:
+        samples = []
+        for i in range(0, len(paths), batch):
+            files = [
+                ("files", (p.name, p.read_bytes(), "application/pdf"))
+                for p in paths[i : i + batch]
+            ]
+            _, elapsed = _timed(client.post, "/extract-and-validate-pdfs", files=files)
+            samples.append(elapsed)
+        stats = latency_stats(samples)
+        stats["batch"] = batch
+        stats["invoices_per_s"] = round(len(paths) / sum(samples), 2) if samples else None
+        results["extract_and_validate"] = stats
+
+        _, elapsed = _timed(client.post, "/validate-json", json=records)
+        results["validate_json"] = latency_stats([elapsed])
+
+        samples = []
+        for record in records:
+            _, elapsed = _timed(client.post, "/report-pdf", json=record)
+            samples.append(elapsed)
+        results["report_pdf"] = latency_stats(samples)
+
+        body = [{"invoice": r, "is_valid": True} for r in records]
+        resp, elapsed = _timed(client.post, "/report-pdfs", json=body)
+        stats = latency_stats([elapsed])
+        stats["bytes"] = len(resp.content)
+        results["report_pdfs_zip"] = stats
+
+    return results
+
+
+def field_accuracy(invoices: List[Invoice], truth: List[Dict]) -> Dict:
+    hits = dict.fromkeys(FIELDS, 0)
+    for inv, expected in zip(invoices, truth):
+        got = inv.dict()
+        if got["invoice_date"] is not None:
+            got["invoice_date"] = got["invoice_date"].isoformat()
+        for name in FIELDS:
+            a, b = got[name], expected[name]
+            if isinstance(a, str) and isinstance(b, str):
+                a, b = a.casefold(), b.casefold()
+            hits[name] += a == b
+    n = len(truth) or 1
+    return {name: round(count / n, 4) for name, count in hits.items()}
+
+
+# -------------------- Main --------------------
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default="bench_results.json", help="Result JSON file")
+    parser.add_argument(
+        "--corpus-dir",
+        default=None,
+        help="Reuse (or create) the corpus here instead of a temp directory",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Validation repeats")
+    parser.add_argument("--api-batch", type=int, default=20, help="PDFs per upload")
+    parser.add_argument("--skip-api", action="store_true")
+    parser.add_argument("--lazy", action="store_true", help="Extract with lazy=True")
+    add_corpus_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="invoice_qc_bench_") as tmp:
+        tmp = Path(tmp)
+        corpus = Path(args.corpus_dir) if args.corpus_dir else tmp / "corpus"
+        truth_file = corpus / "truth.json"
+
+        start = time.perf_counter()
+        if not truth_file.exists():
+            generate_corpus(str(corpus), args.count, seed=args.seed, **corpus_kwargs(args))
+        generate_s = time.perf_counter() - start
+
+        truth = json.loads(truth_file.read_text(encoding="utf-8"))
+        paths = [corpus / t["filename"] for t in truth]
+
+        print(f"corpus: {len(paths)} PDFs in {corpus}")
+
+        stages = {}
+        invoices, stages["extract"] = bench_extract(paths, ExtractOptions(lazy=args.lazy))
+        print(f"extract : {stages['extract']['mean_ms']:.2f} ms/pdf")
+        stages["validate"] = bench_validate(invoices, args.repeat)
+        print(f"validate: {stages['validate']['best_s'] * 1e3:.2f} ms/batch")
+        stages["render"] = bench_render(invoices)
+        print(f"render  : {stages['render']['mean_ms']:.2f} ms/report")
+        if not args.skip_api:
+            stages["api"] = bench_api(paths, invoices, args.api_batch, tmp)
+            print(
+                "api     : "
+                f"{stages['api']['extract_and_validate']['invoices_per_s']} invoices/s"
+            )
+
+        result = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_revision": _git_revision(),
+                "extractor_version": EXTRACTOR_VERSION,
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "args": vars(args),
+            },
+            "corpus": {
+                "invoices": len(truth),
+                "pages": sum(t["pages"] for t in truth),
+                "duplicates": sum(1 for t in truth if t["duplicate_of"]),
+                "layouts": sorted({t["layout"] for t in truth}),
+                "generate_s": round(generate_s, 3),
+            },
+            "stages": stages,
+            "accuracy": field_accuracy(invoices, truth),
+        }
+
+    Path(args.out).write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: full-page text vs region-of-interest extraction.
+
+    python -m benchmarks.bench_regions [--count 32] [--samples pdfs] [--repeat 3]
+
+Extracts the sample PDFs and a synthetic corpus (benchmarks.corpus, about
+100 pages at the default --count) with ExtractOptions() and
+ExtractOptions(regions=True), best of --repeat runs each, without the
+cache. Prints ms per page for both, the speedup, the fields on which the
+two modes disagree, and the corpus field accuracy against its truth.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from invoice_qc.extractor import ExtractOptions, extract_invoice_from_file
+
+from .bench_pipeline import FIELDS, field_accuracy
+from .corpus import add_corpus_arguments, corpus_kwargs, generate_corpus
+
+MODES = {
+    "full page": ExtractOptions(),
+    "regions": ExtractOptions(regions=True),
+}
+
+
+def _extract_all(paths: List[Path], options: ExtractOptions):
+    invoices = []
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, "rb") as fh:
+            invoices.append(extract_invoice_from_file(fh, path.name, options=options))
+    return invoices, time.perf_counter() - start
+
+
+def _compare(label: str, paths: List[Path], repeat: int, truth=None) -> None:
+    results = {}
+    for mode, options in MODES.items():
+        runs = [_extract_all(paths, options) for _ in range(repeat)]
+        results[mode] = (runs[0][0], min(seconds for _, seconds in runs))
+
+    full, full_s = results["full page"]
+    regions, regions_s = results["regions"]
+    pages = sum(inv.pages_parsed or 0 for inv in full)
+
+    print(f"\n{label}: {len(paths)} PDFs, {pages} pages")
+    print(f"{'':<12}{'total s':>9}{'ms/page':>10}")
+    for mode, (_, seconds) in results.items():
+        print(f"{mode:<12}{seconds:>9.3f}{seconds * 1e3 / max(pages, 1):>10.2f}")
+    print(f"speedup: {full_s / regions_s:.2f}x")
+
+    differing = [
+        f"{a.source_pdf}:{name}"
+        for a, b in zip(full, regions)
+        for name in FIELDS
+        if getattr(a, name) != getattr(b, name)
+    ]
+    print(f"fields differing: {len(differing)}" + (f" {differing[:5]}" if differing else ""))
+
+    if truth is not None:
+        for mode, (invoices, _) in results.items():
+            accuracy = field_accuracy(invoices, truth)
+            print(f"accuracy ({mode}): {json.dumps(accuracy)}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", default="pdfs", help="Directory of sample PDFs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--corpus-dir",
+        default=None,
+        help="Reuse (or create) the corpus here instead of a temp directory",
+    )
+    add_corpus_arguments(parser)
+    parser.set_defaults(count=32)
+    args = parser.parse_args(argv)
+
+    samples = sorted(Path(args.samples).glob("*.pdf"))
+    if samples:
+        _compare("samples", samples, args.repeat)
+
+    with tempfile.TemporaryDirectory(prefix="invoice_qc_bench_") as tmp:
+        corpus = Path(args.corpus_dir) if args.corpus_dir else Path(tmp) / "corpus"
+        truth_file = corpus / "truth.json"
+        if not truth_file.exists():
+            generate_corpus(str(corpus), args.count, seed=args.seed, **corpus_kwargs(args))
+        truth = json.loads(truth_file.read_text(encoding="utf-8"))
+        paths = [corpus / t["filename"] for t in truth]
+        _compare("synthetic corpus", paths, args.repeat, truth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: QC report rendering with and without a reused renderer.
+
+    python -m benchmarks.bench_report_render [--count 500]
+
+"fresh" builds a new InvoiceReportRenderer for every report, which is what
+each create_invoice_pdf_* call used to cost (stylesheet and table styles
+rebuilt per invoice). "reused" renders every report with one renderer.
+Story building is also timed on its own, since doc.build dominates the
+total.
+"""
+
+import argparse
+import time
+
+from invoice_qc.pdf_generator import InvoiceReportRenderer
+
+from .bench_batch_validator import make_invoices
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    invoices = make_invoices(args.count)
+    statuses = [None, True, False]
+    jobs = [(inv, statuses[i % 3]) for i, inv in enumerate(invoices)]
+
+    start = time.perf_counter()
+    for inv, status in jobs:
+        InvoiceReportRenderer().build_story(inv, status=status)
+    story_fresh = time.perf_counter() - start
+
+    renderer = InvoiceReportRenderer()
+    start = time.perf_counter()
+    for inv, status in jobs:
+        renderer.build_story(inv, status=status)
+    story_reused = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for inv, status in jobs:
+        InvoiceReportRenderer().render_bytes(inv, status=status)
+    render_fresh = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for inv, status in jobs:
+        renderer.render_bytes(inv, status=status)
+    render_reused = time.perf_counter() - start
+
+    n = len(jobs)
+    print(f"reports: {n}")
+    print(f"story  fresh : {story_fresh * 1e3 / n:8.3f} ms/report")
+    print(f"story  reused: {story_reused * 1e3 / n:8.3f} ms/report  ({story_fresh / story_reused:.1f}x)")
+    print(f"render fresh : {render_fresh * 1e3 / n:8.3f} ms/report")
+    print(f"render reused: {render_reused * 1e3 / n:8.3f} ms/report  ({render_fresh / render_reused:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
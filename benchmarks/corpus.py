@@ -0,0 +1,259 @@
+"""
+Synthetic invoice corpus for benchmarks.
+
+    python -m benchmarks.corpus --out bench_corpus [--count 200] [--seed 0]
+
+Writes reportlab PDFs shaped like the sample order confirmations, plus a
+truth.json with the expected fields of each file. Item rows carry a unit
+price and a line total, and the line totals add up to the net total. The
+same arguments always produce byte-identical files.
+
+Layouts:
+  single       one page with header, items and totals
+  annex        totals on page 1, item annex on the following pages
+  totals_last  items on every page, totals only on the last one
+"""
+
+import argparse
+import json
+import math
+import random
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+# No timestamps or random document ids in the output
+rl_config.invariant = 1
+
+LAYOUTS = ("single", "annex", "totals_last")
+
+SELLERS = (
+    "ABC Corporation",
+    "Medtech Supplies GmbH",
+    "Nordlicht Handel GmbH",
+    "Brightway Trading Ltd",
+    "Sterimed Corporation",
+)
+BUYERS = (
+    ("Beispielname Unternehmen", "12345 Köln Deutschland"),
+    ("Klinikum Am Park", "50667 Köln Deutschland"),
+    ("Praxis Dr. Weber", "80331 München Deutschland"),
+    ("Zentrallabor Nord", "20095 Hamburg Deutschland"),
+)
+ITEMS = (
+    "Sterilisationsmittel",
+    "Einmalhandschuhe Nitril",
+    "Desinfektionstücher",
+    "Kanülen 0,8 mm",
+    "Verbandsmull steril",
+)
+
+LINE_HEIGHT = 5 * mm
+LINES_PER_PAGE = 48
+
+
+@dataclass
+class InvoiceSpec:
+    filename: str
+    layout: str
+    pages: int
+    invoice_number: str
+    invoice_date: str
+    seller_name: str
+    buyer_name: str
+    net_total: float
+    tax_amount: float
+    gross_total: float
+    duplicate_of: Optional[str] = None
+
+
+def fmt_amount(value: float, decimals: int = 2) -> str:
+    """German number format: 1.234,56"""
+    return (
+        f"{value:,.{decimals}f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    )
+
+
+def make_specs(
+    count: int,
+    seed: int = 0,
+    layouts=LAYOUTS,
+    min_pages: int = 1,
+    max_pages: int = 8,
+    max_amount: float = 50_000.0,
+    start_date: date = date(2023, 1, 1),
+    days: int = 730,
+    duplicate_rate: float = 0.05,
+) -> List[InvoiceSpec]:
+    rng = random.Random(seed)
+    specs: List[InvoiceSpec] = []
+
+    for i in range(count):
+        layout = rng.choice(layouts)
+        pages = 1 if layout == "single" else rng.randint(max(min_pages, 2), max(max_pages, 2))
+
+        if specs and rng.random() < duplicate_rate:
+            # Same invoice submitted again under another file name
+            original = rng.choice(specs)
+            spec = InvoiceSpec(
+                **{**asdict(original), "filename": f"invoice_{i:06d}.pdf"}
+            )
+            spec.layout, spec.pages = layout, pages
+            spec.duplicate_of = original.filename
+            specs.append(spec)
+            continue
+
+        # Log-uniform net amounts between 1 and max_amount
+        net = round(10 ** rng.uniform(0, math.log10(max_amount)), 2)
+        tax = round(net * rng.choice((0.19, 0.07)), 2)
+
+        specs.append(
+            InvoiceSpec(
+                filename=f"invoice_{i:06d}.pdf",
+                layout=layout,
+                pages=pages,
+                invoice_number=f"AUFNR{rng.randint(10_000, 99_999_999)}",
+                invoice_date=(start_date + timedelta(days=rng.randrange(days))).isoformat(),
+                seller_name=rng.choice(SELLERS),
+                buyer_name=rng.choice(BUYERS)[0],
+                net_total=net,
+                tax_amount=tax,
+                gross_total=round(net + tax, 2),
+            )
+        )
+
+    return specs
+
+
+def _item_totals(net: float, count: int, rng: random.Random) -> List[float]:
+    """count line totals adding up to net: a random split of its cents."""
+    cents = round(net * 100)
+    cuts = sorted(rng.randint(0, cents) for _ in range(count - 1))
+    bounds = [0] + cuts + [cents]
+    return [(b - a) / 100 for a, b in zip(bounds, bounds[1:])]
+
+
+def _page_lines(spec: InvoiceSpec, rng: random.Random) -> List[List[str]]:
+    day = date.fromisoformat(spec.invoice_date).strftime("%d.%m.%Y")
+    city = dict(BUYERS)[spec.buyer_name]
+    header = [
+        f"Seite 1 von {spec.pages}",
+        f"{spec.seller_name} Bestellung {spec.invoice_number} im Auftrag von {rng.randint(10**9, 10**10 - 1)}",
+        spec.buyer_name,
+        city,
+        f"Ihre Faxnummer: 0800-{rng.randint(10**6, 10**7 - 1)}",
+        f"Bestellung {spec.invoice_number} vom {day}",
+        "Pos. Artikelbeschreibung Preis in Menge Einheit Umrechnung Bestellwert",
+    ]
+    totals = [
+        f"Nettowert EUR {fmt_amount(spec.net_total)}",
+        f"MwSt. {round(spec.tax_amount / spec.net_total * 100):.0f},00% EUR {fmt_amount(spec.tax_amount)}",
+        f"Gesamtbetrag EUR {fmt_amount(spec.gross_total)}",
+    ]
+
+    annex_lines = LINES_PER_PAGE - 2
+    first_lines = LINES_PER_PAGE - len(header)
+    count = {
+        "single": 12,
+        "annex": 5 + (spec.pages - 1) * annex_lines,
+        "totals_last": first_lines + (spec.pages - 2) * annex_lines + 10,
+    }[spec.layout]
+    # Rows: position, description, unit price, quantity, unit, line total;
+    # the line totals add up to the net total
+    line_totals = iter(_item_totals(spec.net_total, count, rng))
+
+    def items(start: int, n: int) -> List[str]:
+        rows = []
+        for k in range(n):
+            quantity = rng.randint(1, 20)
+            total = next(line_totals)
+            rows.append(
+                f"{start + k} {rng.choice(ITEMS)} {fmt_amount(total / quantity, 4)} "
+                f"{quantity} VE 1 VE=20 Stück {fmt_amount(total)}"
+            )
+        return rows
+
+    if spec.layout == "single":
+        return [header + items(1, 12) + totals]
+
+    pages = []
+    if spec.layout == "annex":
+        pages.append(header + items(1, 5) + totals)
+        for p in range(2, spec.pages + 1):
+            pages.append([f"Seite {p} von {spec.pages}", "Anlage Positionen"] + items(p * 100, annex_lines))
+    else:  # totals_last
+        pages.append(header + items(1, first_lines))
+        for p in range(2, spec.pages):
+            pages.append([f"Seite {p} von {spec.pages}", "Positionen"] + items(p * 100, annex_lines))
+        pages.append([f"Seite {spec.pages} von {spec.pages}", "Positionen"] + items(9000, 10) + totals)
+    return pages
+
+
+def write_pdf(spec: InvoiceSpec, path: Path, seed: int = 0) -> None:
+    rng = random.Random(f"{seed}:{spec.filename}")
+    c = canvas.Canvas(str(path), pagesize=A4)
+    _, height = A4
+    for lines in _page_lines(spec, rng):
+        c.setFont("Helvetica", 9)
+        y = height - 20 * mm
+        for line in lines:
+            c.drawString(20 * mm, y, line)
+            y -= LINE_HEIGHT
+        c.showPage()
+    c.save()
+
+
+def generate_corpus(out_dir: str, count: int, seed: int = 0, **spec_kwargs) -> List[InvoiceSpec]:
+    """
+    Write count PDFs and truth.json into out_dir and return the specs.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    specs = make_specs(count, seed=seed, **spec_kwargs)
+    for spec in specs:
+        write_pdf(spec, out / spec.filename, seed=seed)
+    (out / "truth.json").write_text(
+        json.dumps([asdict(s) for s in specs], indent=2), encoding="utf-8"
+    )
+    return specs
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--layouts", default=",".join(LAYOUTS))
+    parser.add_argument("--min-pages", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=8)
+    parser.add_argument("--max-amount", type=float, default=50_000.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+
+
+def corpus_kwargs(args: argparse.Namespace) -> dict:
+    return {
+        "layouts": tuple(args.layouts.split(",")),
+        "min_pages": args.min_pages,
+        "max_pages": args.max_pages,
+        "max_amount": args.max_amount,
+        "duplicate_rate": args.duplicate_rate,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", required=True, help="Output directory")
+    add_corpus_arguments(parser)
+    args = parser.parse_args(argv)
+
+    specs = generate_corpus(args.out, args.count, seed=args.seed, **corpus_kwargs(args))
+    pages = sum(s.pages for s in specs)
+    print(f"Wrote {len(specs)} PDFs ({pages} pages) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
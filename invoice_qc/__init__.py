@@ -1,15 +1,46 @@
-from .schema import Invoice, LineItem
-from .extractor import extract_invoices_from_dir, extract_invoice_from_file
-from .validator import validate_invoices
-from .pdf_generator import create_invoice_pdf_file, create_invoice_pdf_bytes
-
-__all__ = [
-    "Invoice",
-    "LineItem",
-    "extract_invoices_from_dir",
-    "extract_invoice_from_file",
-    "validate_invoices",
-    "create_invoice_pdf_file",
-    "create_invoice_pdf_bytes",
-]
+"""
+Invoice QC: extraction, validation and reporting for PDF invoices.
 
+Public names are imported on first access, so `import invoice_qc` (and
+the CLI) does not pay for pdfplumber or reportlab until they are used.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .schema import Invoice, InvoiceRecord, LineItem
+    from .extractor import extract_invoices_from_dir, extract_invoice_from_file
+    from .validator import validate_invoices
+    from .pdf_generator import (
+        InvoiceReportRenderer,
+        create_invoice_pdf_file,
+        create_invoice_pdf_bytes,
+    )
+
+_EXPORTS = {
+    "Invoice": ".schema",
+    "InvoiceRecord": ".schema",
+    "LineItem": ".schema",
+    "extract_invoices_from_dir": ".extractor",
+    "extract_invoice_from_file": ".extractor",
+    "validate_invoices": ".validator",
+    "InvoiceReportRenderer": ".pdf_generator",
+    "create_invoice_pdf_file": ".pdf_generator",
+    "create_invoice_pdf_bytes": ".pdf_generator",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,16 +1,185 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, HTTPException, Request, Response, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
 
 import json
 
-from .extractor import extract_invoice_from_file
-from .schema import Invoice
+from .backends import DEFAULT_BACKEND, backend_chain
+from .cache import DEFAULT_CACHE_DIR, ExtractionCache
+from .dup_index import DEFAULT_INDEX_PATH, DuplicateIndex
+from .extractor import (
+    EXTRACTOR_VERSION,
+    ExtractOptions,
+    extract_invoice_from_file,
+    failure_record,
+)
+from .ingest import IngestLimits, Upload, UploadTooLarge, spool_all
+from .jobs import DEFAULT_JOB_DIR, FAILED, FINISHED, RUNNING, JobRunner, JobStore
+from .metrics import HTTP_SECONDS, REGISTRY
+from .pool import ExtractionPool, PoolSaturated
+from .report_store import DEFAULT_REPORT_DB, ReportStore
+from .schema import Invoice, InvoiceRecord
 from .validator import validate_invoices
-from .pdf_generator import create_invoice_pdf_bytes
+from .pdf_generator import create_invoice_pdf_bytes, iter_reports_zip, report_filename
 
-app = FastAPI(title="Invoice QC Service")
+logger = logging.getLogger("invoice_qc.api")
+
+extraction_pool = ExtractionPool.from_env()
+
+# Batch jobs get their own pool so they never fill the backlog of the
+# synchronous endpoints
+_job_workers = os.environ.get("INVOICE_QC_JOB_WORKERS")
+job_pool = ExtractionPool.from_env(
+    workers=int(_job_workers) if _job_workers else None
+)
+
+# Poll interval of streamed job results, in seconds
+JOB_STREAM_POLL = 0.5
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_runner.start()
+    yield
+    await job_runner.stop()
+    extraction_pool.shutdown()
+    job_pool.shutdown()
+    job_store.close()
+    if report_store is not None:
+        report_store.close()
+    if dup_index is not None:
+        dup_index.close()
+
+
+app = FastAPI(title="Invoice QC Service", lifespan=lifespan)
+
+# Set INVOICE_QC_CACHE_DIR to an empty string to disable the cache
+_cache_dir = os.environ.get("INVOICE_QC_CACHE_DIR", DEFAULT_CACHE_DIR)
+extraction_cache = (
+    ExtractionCache(_cache_dir, version=EXTRACTOR_VERSION) if _cache_dir else None
+)
+
+# Set INVOICE_QC_DUP_INDEX to an empty string to only detect duplicates
+# within a single request
+_dup_index_path = os.environ.get("INVOICE_QC_DUP_INDEX", DEFAULT_INDEX_PATH)
+_bloom_capacity = os.environ.get("INVOICE_QC_DUP_BLOOM_CAPACITY")
+dup_index = (
+    DuplicateIndex(
+        _dup_index_path,
+        bloom_capacity=int(_bloom_capacity) if _bloom_capacity else None,
+    )
+    if _dup_index_path
+    else None
+)
+
+ingest_limits = IngestLimits.from_env()
+
+# Set INVOICE_QC_REPORT_DB to an empty string to not keep reports
+_report_db = os.environ.get("INVOICE_QC_REPORT_DB", DEFAULT_REPORT_DB)
+report_store = ReportStore(_report_db) if _report_db else None
+
+job_store = JobStore(os.environ.get("INVOICE_QC_JOB_DIR", DEFAULT_JOB_DIR))
+job_runner = JobRunner(job_store, job_pool, cache=extraction_cache, dup_index=dup_index)
+
+
+# Routes whose uploads count against INVOICE_QC_MAX_REQUEST_MB
+_LIMITED_UPLOAD_ROUTES = ("/extract-and-validate-pdfs",)
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Refuse oversized uploads from Content-Length, before parsing them."""
+    length = request.headers.get("content-length")
+    if (
+        request.method == "POST"
+        and request.url.path in _LIMITED_UPLOAD_ROUTES
+        and length is not None
+        and length.isdigit()
+        and ingest_limits.request_too_large(int(length))
+    ):
+        detail = f"Request exceeds {ingest_limits.max_request_bytes} bytes of uploads"
+        return JSONResponse(status_code=413, content={"detail": detail})
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def record_timing(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    elapsed_ms = elapsed * 1000
+    response.headers["X-Process-Time-Ms"] = f"{elapsed_ms:.1f}"
+    # Route templates (/jobs/{job_id}) keep the label set bounded
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(
+        elapsed,
+        request.method,
+        route.path if route is not None else "unmatched",
+        str(response.status_code),
+    )
+    logger.info(
+        "%s %s -> %s in %.1f ms",
+        request.method,
+        request.url.path,
+        response.status_code,
+        elapsed_ms,
+    )
+    return response
+
+
+def _options(
+    lazy: bool,
+    first_pages: Optional[int],
+    last_pages: Optional[int],
+    regions: bool,
+    backend: str,
+    line_items: bool,
+) -> ExtractOptions:
+    try:
+        backend_chain(backend)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return ExtractOptions(
+        lazy=lazy,
+        first_pages=first_pages,
+        last_pages=last_pages,
+        regions=regions,
+        backend=backend,
+        line_items=line_items,
+    )
+
+
+def _extract_upload(
+    upload: Upload,
+    cache: Optional[ExtractionCache],
+    options: ExtractOptions,
+) -> InvoiceRecord:
+    """
+    Runs inside the extraction pool. Uploads are picklable: process workers
+    receive small files as bytes and spooled ones as a path to map.
+    """
+    try:
+        with upload.open() as fh:
+            return extract_invoice_from_file(
+                fh,
+                upload.filename,
+                cache=cache,
+                options=options,
+                cache_key=upload.cache_key,
+            )
+    except Exception as exc:
+        return failure_record(upload.filename, exc)
 
 
 @app.get("/health")
@@ -18,39 +187,277 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage latencies and counters in the Prometheus text format."""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+def _ingest(files: List[UploadFile], options: ExtractOptions) -> List[Upload]:
+    """
+    Spool the request's uploads in one pass each, computing their cache
+    keys on the way so the cache never re-reads them.
+    """
+    hasher = None
+    if extraction_cache is not None:
+        variant = options.cache_tag()
+
+        def hasher():
+            return extraction_cache.key_hasher(variant)
+
+    return spool_all(
+        [(f.filename, f.file) for f in files], ingest_limits, key_hasher_factory=hasher
+    )
+
+
 @app.post("/extract-and-validate-pdfs")
-async def extract_and_validate_pdfs(files: List[UploadFile] = File(...)):
-    invoices: List[Invoice] = []
+async def extract_and_validate_pdfs(
+    files: List[UploadFile] = File(...),
+    lazy: bool = False,
+    first_pages: Optional[int] = None,
+    last_pages: Optional[int] = None,
+    regions: bool = False,
+    backend: str = DEFAULT_BACKEND,
+    line_items: bool = True,
+):
+    try:
+        extraction_pool.check_capacity()
+    except PoolSaturated as exc:
+        raise HTTPException(
+            status_code=503, detail=str(exc), headers={"Retry-After": "5"}
+        )
 
-    for f in files:
-        inv = extract_invoice_from_file(f.file, f.filename)
-        invoices.append(inv)
+    options = _options(lazy, first_pages, last_pages, regions, backend, line_items)
 
-    validation = validate_invoices(invoices)
+    try:
+        uploads = await run_in_threadpool(_ingest, files, options)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+
+    try:
+        invoices: List[InvoiceRecord] = await extraction_pool.map(
+            _extract_upload,
+            [(u, extraction_cache, options) for u in uploads],
+            on_budget_exceeded=lambda item, exc: failure_record(item[0].filename, exc),
+        )
+    finally:
+        for upload in uploads:
+            upload.discard()
+
+    # Every upload is a new submission to the duplicate index, whatever
+    # its filename, so a re-upload is flagged
+    sources = [f"upload:{uuid.uuid4().hex}" for _ in invoices]
+    # Validation writes to the duplicate index; keep it off the event loop
+    validation = await run_in_threadpool(
+        validate_invoices, invoices, dup_index=dup_index, sources=sources
+    )
 
     payload = {
         "extracted": [i.dict() for i in invoices],
         "validation": validation,
     }
 
-    Path("reports.json").write_text(
-        json.dumps(payload, indent=2, default=str),
-        encoding="utf-8",
-    )
+    # Queued for the store's writer thread; nothing is written here
+    report_id = report_store.append(payload) if report_store is not None else None
+    return {"report_id": report_id, **payload}
 
-    return payload
+
+# -------------------- Stored reports --------------------
+
+def _get_report_store() -> ReportStore:
+    if report_store is None:
+        raise HTTPException(status_code=404, detail="Report storage is disabled")
+    return report_store
+
+
+@app.get("/reports")
+def list_reports(
+    offset: int = 0,
+    limit: int = 50,
+    since: Optional[float] = None,
+    invalid_only: bool = False,
+):
+    """
+    Summaries of stored /extract-and-validate-pdfs reports, newest first.
+    since is a Unix timestamp.
+    """
+    store = _get_report_store()
+    limit = max(0, min(limit, 1000))
+    return {
+        "offset": offset,
+        "limit": limit,
+        "reports": store.list(offset, limit, since=since, invalid_only=invalid_only),
+    }
+
+
+@app.get("/reports/{report_id}")
+def get_report(report_id: str):
+    """A stored report: the original response plus report_id and created_at."""
+    report = _get_report_store().get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Unknown report: {report_id}")
+    return report
 
 
 @app.post("/validate-json")
-async def validate_json(invoices: List[Invoice]):
-    validation = validate_invoices(invoices)
-    return validation
+def validate_json(invoices: List[Invoice], record: bool = False):
+    """
+    Duplicates are looked for within the request. With record=true the
+    invoices are also checked against, and recorded in, the duplicate index
+    as new submissions.
+    """
+    if record and dup_index is not None:
+        sources = [f"upload:{uuid.uuid4().hex}" for _ in invoices]
+        return validate_invoices(invoices, dup_index=dup_index, sources=sources)
+    return validate_invoices(invoices)
+
+
+class ReportRequest(BaseModel):
+    invoice: Invoice
+    is_valid: Optional[bool] = None
 
 
-@app.post("/generate-report-pdf")
-async def generate_report_pdf(invoice: Invoice, is_valid: bool | None = None):
+@app.post("/generate-report-pdf", deprecated=True)
+def generate_report_pdf(invoice: Invoice, is_valid: bool | None = None):
+    """Hex-encoded report; kept for older clients, prefer /report-pdf."""
     pdf_bytes = create_invoice_pdf_bytes(invoice, status=is_valid)
     return {
         "invoice_id": invoice.get_invoice_id(),
         "pdf_hex": pdf_bytes.hex(),
     }
+
+
+@app.post("/report-pdf", response_class=Response)
+def report_pdf(invoice: Invoice, is_valid: bool | None = None):
+    pdf_bytes = create_invoice_pdf_bytes(invoice, status=is_valid)
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{report_filename(invoice)}"'
+        },
+    )
+
+
+@app.post("/report-pdfs", response_class=StreamingResponse)
+def report_pdfs(reports: List[ReportRequest]):
+    """
+    Render many reports into one ZIP, streamed as each report is built.
+    """
+    return StreamingResponse(
+        iter_reports_zip((r.invoice, r.is_valid) for r in reports),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="invoice_reports.zip"'},
+    )
+
+
+# -------------------- Batch jobs --------------------
+
+def _spool_uploads(files: List[UploadFile], job_dir: Path) -> List[tuple]:
+    """
+    Write each upload to the job directory. The per-file limit applies;
+    the per-request one does not, jobs being meant for large batches.
+    """
+    uploads = spool_all(
+        [(f.filename, f.file) for f in files],
+        ingest_limits,
+        dests=[str(job_dir / f"{seq}.pdf") for seq in range(len(files))],
+        request_limit=False,
+    )
+    return [(u.filename, u.path) for u in uploads]
+
+
+def _get_job(job_id: str) -> dict:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    files: List[UploadFile] = File(...),
+    lazy: bool = False,
+    first_pages: Optional[int] = None,
+    last_pages: Optional[int] = None,
+    regions: bool = False,
+    backend: str = DEFAULT_BACKEND,
+    line_items: bool = True,
+):
+    """
+    Queue a batch of PDFs and return its job id straight away. Poll
+    /jobs/{job_id} for progress and /jobs/{job_id}/results for results.
+    """
+    options = _options(lazy, first_pages, last_pages, regions, backend, line_items)
+
+    job_id, job_dir = job_store.new_job_dir()
+    try:
+        spooled = await run_in_threadpool(_spool_uploads, files, job_dir)
+    except UploadTooLarge as exc:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise HTTPException(status_code=413, detail=str(exc))
+    job_store.create(job_id, spooled, options)
+    job_runner.submit(job_id)
+
+    return _get_job(job_id)
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return _get_job(job_id)
+
+
+async def _stream_job(job_id: str, offset: int):
+    while True:
+        # Read the status before the results, so that once it is final
+        # every result is already visible. Both are SQLite reads, so they
+        # run off the event loop.
+        job = await run_in_threadpool(job_store.get, job_id)
+        if job is None:
+            return
+        for item in await run_in_threadpool(job_store.results, job_id, offset):
+            offset = item["seq"] + 1
+            yield json.dumps(item, default=str) + "\n"
+        if job["status"] in FINISHED:
+            if job["status"] == FAILED:
+                yield json.dumps({"error": job["error"]}) + "\n"
+            else:
+                yield json.dumps({"summary": job["summary"]}) + "\n"
+            return
+        await asyncio.sleep(JOB_STREAM_POLL)
+
+
+@app.get("/jobs/{job_id}/results")
+def job_results(
+    job_id: str,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    stream: bool = False,
+):
+    """
+    Results validated so far, in upload order, starting at offset.
+
+    With stream=true the response is NDJSON: one
+    {"seq", "extracted", "validation"} line per invoice as it completes,
+    then a final {"summary": ...} (or {"error": ...}) line.
+    """
+    job = _get_job(job_id)
+    if stream:
+        return StreamingResponse(
+            _stream_job(job_id, offset), media_type="application/x-ndjson"
+        )
+    return {
+        **job,
+        "results": job_store.results(job_id, offset, limit),
+    }
+
+
+@app.delete("/jobs/{job_id}")
+def delete_job(job_id: str):
+    job = _get_job(job_id)
+    if job["status"] == RUNNING:
+        raise HTTPException(status_code=409, detail="Job is running")
+    job_store.delete(job_id)
+    return {"job_id": job_id, "deleted": True}
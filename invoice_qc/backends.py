@@ -0,0 +1,226 @@
+"""
+Text backends: how the extractor turns a PDF's pages into text.
+
+- pdfplumber: page.extract_text(), the reference layout (default)
+- pdfminer: pdfminer's interpreter with layout analysis disabled
+  (laparams=None). The character stream is grouped into lines and words
+  with pdfplumber's default tolerances, which gives the same text without
+  building a pdfplumber object for every character.
+- pdfium: PDFium's own text extraction through pypdfium2, which pdfplumber
+  already depends on. Much faster again, but PDFium emits text in
+  content-stream order, so lines can come out in a different order than
+  the field rules expect.
+
+A backend spec names one backend or a comma-separated fallback chain,
+e.g. "pdfminer,pdfplumber". "auto" is pdfminer, then pdfium. Each backend
+in the chain is tried in turn until one produces text; see
+extractor.read_text.
+"""
+
+import abc
+import importlib.util
+import threading
+from typing import IO, Dict, List, Type
+
+DEFAULT_BACKEND = "pdfplumber"
+AUTO_CHAIN = ("pdfminer", "pdfium")
+
+# Same as pdfplumber's default: a gap wider than this starts a new word
+X_TOLERANCE = 3
+
+# PDFium is not thread-safe; every call into it goes through this lock
+_PDFIUM_LOCK = threading.Lock()
+
+
+class TextBackend(abc.ABC):
+    """
+    An open PDF: page_count, and the text of single pages by index.
+    Used as a context manager; the file itself stays the caller's.
+    """
+
+    name = ""
+    module = ""
+
+    page_count: int
+
+    @classmethod
+    def available(cls) -> bool:
+        return importlib.util.find_spec(cls.module) is not None
+
+    @abc.abstractmethod
+    def page_text(self, idx: int, regions: bool = False, tables: bool = True) -> str:
+        """tables: with regions, also keep item table lines."""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "TextBackend":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class PdfplumberBackend(TextBackend):
+    name = "pdfplumber"
+    module = "pdfplumber"
+
+    def __init__(self, file: IO):
+        import pdfplumber
+
+        self._pdf = pdfplumber.open(file)
+        self.page_count = len(self._pdf.pages)
+
+    def page_text(self, idx: int, regions: bool = False, tables: bool = True) -> str:
+        page = self._pdf.pages[idx]
+        if regions:
+            from .regions import region_text
+
+            text = region_text(page, tables)
+        else:
+            text = page.extract_text() or ""
+        # Drop the page's parsed layout, so memory peaks at the largest
+        # page instead of growing with the page count
+        page.close()
+        return text
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+class PdfminerBackend(TextBackend):
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def __init__(self, file: IO):
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+
+        document = PDFDocument(PDFParser(file))
+        self._pages = list(PDFPage.create_pages(document))
+        resources = PDFResourceManager(caching=True)
+        # laparams=None: characters only, no layout analysis
+        self._device = PDFPageAggregator(resources, laparams=None)
+        self._interpreter = PDFPageInterpreter(resources, self._device)
+        self.page_count = len(self._pages)
+
+    def page_text(self, idx: int, regions: bool = False, tables: bool = True) -> str:
+        self._interpreter.process_page(self._pages[idx])
+        return chars_text(self._device.get_result(), regions, tables)
+
+    def close(self) -> None:
+        self._pages = []
+
+
+class PdfiumBackend(TextBackend):
+    name = "pdfium"
+    module = "pypdfium2"
+
+    def __init__(self, file: IO):
+        import pypdfium2
+
+        with _PDFIUM_LOCK:
+            self._pdf = pypdfium2.PdfDocument(file)
+            self.page_count = len(self._pdf)
+
+    def page_text(self, idx: int, regions: bool = False, tables: bool = True) -> str:
+        # regions is not supported: PDFium's text is already cheap
+        with _PDFIUM_LOCK:
+            page = self._pdf[idx]
+            try:
+                textpage = page.get_textpage()
+                try:
+                    text = textpage.get_text_range()
+                finally:
+                    textpage.close()
+            finally:
+                page.close()
+        return text.replace("\r\n", "\n")
+
+    def close(self) -> None:
+        with _PDFIUM_LOCK:
+            self._pdf.close()
+
+
+BACKENDS: Dict[str, Type[TextBackend]] = {
+    cls.name: cls for cls in (PdfplumberBackend, PdfminerBackend, PdfiumBackend)
+}
+
+
+def backend_chain(spec: str) -> List[Type[TextBackend]]:
+    """
+    The installed backends of a spec, in order. Raises ValueError for
+    unknown names, or when none of the named backends is installed.
+    """
+    if spec == "auto":
+        names = list(AUTO_CHAIN)
+    else:
+        names = [name.strip() for name in spec.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BACKENDS]
+    if unknown or not names:
+        raise ValueError(
+            f"Unknown text backend {spec!r}; choose from "
+            f"{', '.join(BACKENDS)}, auto or a comma-separated chain"
+        )
+    chain = [BACKENDS[name] for name in names if BACKENDS[name].available()]
+    if not chain:
+        raise ValueError(f"No text backend of {spec!r} is installed")
+    return chain
+
+
+def chars_text(layout, regions: bool = False, tables: bool = True) -> str:
+    """
+    Text of a pdfminer page's characters, as page.extract_text() lays it
+    out: lines clustered by their top edge, characters left to right,
+    words split at spaces and at gaps wider than X_TOLERANCE, one space
+    between words. With regions only the lines regions.lines_to_keep
+    picks (for tables, including item tables) are returned.
+    """
+    from pdfminer.layout import LTChar, LTContainer
+
+    from .regions import iter_chars, line_numbers, lines_to_keep
+
+    chars = list(iter_chars(layout, LTChar, LTContainer))
+    if not chars:
+        return ""
+
+    lines = line_numbers([-c.y1 for c in chars])
+    rows: List[List] = [[] for _ in range(max(lines) + 1)]
+    for c, line in zip(chars, lines):
+        rows[line].append(c)
+
+    keep = None
+    if regions:
+        keep = lines_to_keep(
+            ["".join(c.get_text() for c in row) for row in rows], tables
+        )
+
+    out = []
+    for idx, row in enumerate(rows):
+        if keep is not None and idx not in keep:
+            continue
+        row.sort(key=lambda c: c.x0)
+        words: List[str] = []
+        word: List[str] = []
+        prev = None
+        for c in row:
+            text = c.get_text()
+            if text.isspace():
+                if word:
+                    words.append("".join(word))
+                    word = []
+                prev = None
+                continue
+            if prev is not None and (c.x0 > prev.x1 + X_TOLERANCE or c.x0 < prev.x0):
+                words.append("".join(word))
+                word = []
+            word.append(text)
+            prev = c
+        if word:
+            words.append("".join(word))
+        if words:
+            out.append(" ".join(words))
+    return "\n".join(out)
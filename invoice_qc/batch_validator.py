@@ -0,0 +1,459 @@
+"""
+Columnar batch validation.
+
+Applies the rules of validator.validate_invoices to invoices held as
+column arrays, evaluating each rule as a NumPy mask over the whole batch.
+Use it to re-validate large sets of already-extracted invoices; the
+per-object validator remains the reference implementation.
+"""
+
+import gc
+from collections import Counter
+from collections.abc import Sequence as SequenceABC
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .schema import AnyInvoice, InvoiceRecord
+from .validator import (
+    ALLOWED_CURRENCIES,
+    LINE_ITEMS_TOLERANCE,
+    NEAR_DUP_DATE_WINDOW,
+    NEAR_DUP_MAX_EDITS,
+    is_near_duplicate,
+    line_item_checks,
+)
+
+
+STRING_COLUMNS = (
+    "source_pdf",
+    "invoice_number",
+    "seller_name",
+    "buyer_name",
+    "currency",
+    "extraction_error",
+)
+AMOUNT_COLUMNS = ("net_total", "tax_amount", "gross_total")
+DATE_COLUMN = "invoice_date"
+# Derived from line_items, page_count and pages_parsed (see
+# validator.line_item_checks): the line total sum, NaN when the sum rule
+# does not apply, and whether any line total is off
+ITEMS_TOTAL_COLUMN = "line_items_total"
+ITEM_OFF_COLUMN = "line_item_off"
+_ITEM_FIELDS = ("line_items", "page_count", "pages_parsed")
+_COLUMN_FIELDS = STRING_COLUMNS + AMOUNT_COLUMNS + (DATE_COLUMN,) + _ITEM_FIELDS
+
+# Error codes in the order validate_invoice reports them. The currency
+# error carries the offending value, so it is filled in per row.
+_RULES = [
+    "extraction:failed",
+    "missing:invoice_number",
+    "missing:invoice_date",
+    "missing:seller_name",
+    "missing:buyer_name",
+    None,  # invalid:currency:<value>
+    "invalid:negative:net_total",
+    "invalid:negative:tax_amount",
+    "invalid:negative:gross_total",
+    "rule:totals_mismatch",
+    "rule:line_item_mismatch",
+    "rule:line_items_sum_mismatch",
+    "anomaly:invoice_date_out_of_range",
+    "duplicate:invoice",
+    "duplicate:suspected",
+]
+_CURRENCY_BIT = 1 << _RULES.index(None)
+
+
+# -------------------- Column building --------------------
+
+def _str_column(values: Iterable) -> np.ndarray:
+    return np.array([v or "" for v in values], dtype=str)
+
+
+def records_to_columns(records: Sequence[Mapping]) -> Dict[str, np.ndarray]:
+    """
+    Build columns from invoice dicts (e.g. parsed JSON / NDJSON).
+    Missing strings become "", missing amounts NaN and missing dates NaT;
+    line items are reduced to the two line-item columns.
+    """
+    columns = {
+        name: _str_column(r.get(name) for r in records) for name in STRING_COLUMNS
+    }
+    for name in AMOUNT_COLUMNS:
+        columns[name] = np.array(
+            [np.nan if r.get(name) is None else r[name] for r in records],
+            dtype=float,
+        )
+    columns[DATE_COLUMN] = np.array(
+        [r.get(DATE_COLUMN) or "NaT" for r in records], dtype="datetime64[D]"
+    )
+    checks = [
+        line_item_checks(
+            r.get("line_items") or (), r.get("page_count"), r.get("pages_parsed")
+        )
+        for r in records
+    ]
+    columns[ITEMS_TOTAL_COLUMN] = np.array(
+        [np.nan if total is None else total for total, _ in checks], dtype=float
+    )
+    columns[ITEM_OFF_COLUMN] = np.array([off for _, off in checks], dtype=bool)
+    return columns
+
+
+def invoices_to_columns(invoices: Sequence[AnyInvoice]) -> Dict[str, np.ndarray]:
+    return records_to_columns(
+        [
+            {name: getattr(inv, name) for name in _COLUMN_FIELDS}
+            if isinstance(inv, InvoiceRecord)
+            else inv.__dict__
+            for inv in invoices
+        ]
+    )
+
+
+# -------------------- Factorizing --------------------
+
+# FNV-1a parameters, applied per character position across the column
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+def _hash_strings(values: np.ndarray) -> np.ndarray:
+    """64-bit hash of every string of a fixed-width unicode column."""
+    width = values.dtype.itemsize // 4
+    chars = np.ascontiguousarray(values).view(np.uint32).reshape(len(values), width)
+    h = np.full(len(values), _FNV_OFFSET, dtype=np.uint64)
+    for k in range(width):
+        h ^= chars[:, k]
+        h *= _FNV_PRIME
+    return h
+
+
+def _factorize(
+    values: np.ndarray, extra: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (codes, first): codes[i] == codes[j] exactly when values[i] ==
+    values[j] (and extra[i] == extra[j], for an int64 extra column), and
+    first[code] is the first row holding that value.
+
+    Sorting string arrays is slow, so the strings are hashed and the
+    hashes sorted; every row is then compared with the first row of its
+    hash, and only on a hash collision are the values grouped exactly.
+    """
+    if not len(values):
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    h = _hash_strings(values)
+    if extra is not None:
+        h ^= extra.view(np.uint64)
+        h *= _FNV_PRIME
+    _, first, codes = np.unique(h, return_index=True, return_inverse=True)
+    codes = codes.reshape(-1)
+
+    first_rows = first[codes]
+    same = values == values[first_rows]
+    if extra is not None:
+        same &= extra == extra[first_rows]
+    if not same.all():
+        keys = values.tolist()
+        if extra is not None:
+            keys = list(zip(keys, extra.tolist()))
+        index = dict.fromkeys(keys)
+        for code, key in enumerate(index):
+            index[key] = code
+        codes = np.fromiter(map(index.__getitem__, keys), np.int64, len(keys))
+        first = np.full(len(index), len(keys), np.int64)
+        np.minimum.at(first, codes, np.arange(len(keys)))
+    return codes, first
+
+
+# -------------------- Rules --------------------
+
+def _rule_masks(c: Mapping[str, np.ndarray]) -> List[np.ndarray]:
+    n = len(c["invoice_number"])
+    net, tax, gross = (c[name] for name in AMOUNT_COLUMNS)
+    dates = c[DATE_COLUMN]
+    currency = c["currency"]
+
+    if "extraction_error" in c:
+        extraction = c["extraction_error"] != ""
+    else:
+        extraction = np.zeros(n, bool)
+
+    # Currency codes have few distinct values: check each one once
+    codes, first = _factorize(currency)
+    bad_values = np.array(
+        [
+            v != "" and v.upper() not in ALLOWED_CURRENCIES
+            for v in currency[first].tolist()
+        ],
+        dtype=bool,
+    )
+    bad_currency = bad_values[codes] if n else np.zeros(0, bool)
+
+    with np.errstate(invalid="ignore"):
+        complete = ~(np.isnan(net) | np.isnan(tax) | np.isnan(gross))
+        mismatch = complete & (
+            np.abs(np.round(net + tax, 2) - np.round(gross, 2)) > 0.02
+        )
+
+    # Columns built elsewhere may come without the line-item columns
+    if ITEMS_TOTAL_COLUMN in c:
+        items_total = c[ITEMS_TOTAL_COLUMN]
+        item_off = c[ITEM_OFF_COLUMN]
+    else:
+        items_total = np.full(n, np.nan)
+        item_off = np.zeros(n, bool)
+    with np.errstate(invalid="ignore"):
+        items_mismatch = (
+            ~np.isnan(items_total)
+            & ~np.isnan(net)
+            & (np.abs(items_total - np.round(net, 2)) > LINE_ITEMS_TOLERANCE)
+        )
+
+    has_date = ~np.isnat(dates)
+    years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    out_of_range = has_date & ((years < 2000) | (years > 2100))
+
+    return [
+        extraction,
+        c["invoice_number"] == "",
+        ~has_date,
+        c["seller_name"] == "",
+        c["buyer_name"] == "",
+        bad_currency,
+        net < 0,
+        tax < 0,
+        gross < 0,
+        mismatch,
+        item_off,
+        items_mismatch,
+        out_of_range,
+        _duplicate_mask(c["invoice_number"], dates),
+        _suspected_mask(c),
+    ]
+
+
+def _duplicate_mask(numbers: np.ndarray, dates: np.ndarray) -> np.ndarray:
+    """
+    True for every (invoice_number, invoice_date) pair seen earlier in the
+    batch; the first occurrence is not a duplicate.
+    """
+    codes, first = _factorize(numbers, dates.astype(np.int64))
+    return first[codes] != np.arange(len(numbers))
+
+
+def _suspected_mask(
+    c: Mapping[str, np.ndarray],
+    date_window: int = NEAR_DUP_DATE_WINDOW,
+    max_edits: int = NEAR_DUP_MAX_EDITS,
+) -> np.ndarray:
+    """
+    Sorted-neighbourhood form of validator.NearDuplicateIndex: sort by
+    (seller, gross cents, date), then compare each row with the following
+    rows of the same block while they stay inside the date window. The
+    later invoice of every matching pair is flagged.
+    """
+    numbers = c["invoice_number"]
+    dates = c[DATE_COLUMN]
+    gross = c["gross_total"]
+    n = len(numbers)
+    suspected = np.zeros(n, bool)
+
+    # Sellers are normalised once per distinct name
+    raw_codes, first = _factorize(c["seller_name"])
+    folded = [v.strip().casefold() for v in c["seller_name"][first].tolist()]
+    folded_codes: Dict[str, int] = {}
+    fold = np.array(
+        [folded_codes.setdefault(v, len(folded_codes)) if v else -1 for v in folded],
+        dtype=np.int64,
+    )
+    sellers = fold[raw_codes]
+
+    eligible = (
+        (sellers != -1) & ~np.isnan(gross) & (numbers != "") & ~np.isnat(dates)
+    )
+    rows = np.flatnonzero(eligible)
+    if len(rows) < 2:
+        return suspected
+
+    seller_codes = sellers[rows]
+    cents = np.round(gross[rows] * 100).astype(np.int64)
+    ordinals = dates[rows].astype(np.int64)
+
+    order = np.lexsort((rows, ordinals, cents, seller_codes))
+    rows, seller_codes, cents, ordinals = (
+        a[order] for a in (rows, seller_codes, cents, ordinals)
+    )
+
+    lag = 1
+    while lag < len(rows):
+        same_window = (
+            (seller_codes[lag:] == seller_codes[:-lag])
+            & (cents[lag:] == cents[:-lag])
+            & (ordinals[lag:] - ordinals[:-lag] <= date_window)
+        )
+        if not same_window.any():
+            break
+        for k in np.flatnonzero(same_window).tolist():
+            i, j = int(rows[k]), int(rows[k + lag])
+            a = (str(numbers[i]), int(ordinals[k]))
+            b = (str(numbers[j]), int(ordinals[k + lag]))
+            if is_near_duplicate(*a, *b, max_edits):
+                suspected[max(i, j)] = True
+        lag += 1
+
+    return suspected
+
+
+# -------------------- Batch API --------------------
+
+@contextmanager
+def _gc_paused():
+    """
+    Building millions of small, acyclic objects (keys, result dicts)
+    triggers repeated cyclic GC passes over everything alive in the
+    process; pause it for the duration.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _build_results(
+    columns: Mapping[str, np.ndarray], codes: np.ndarray, templates: Dict
+) -> List[Dict]:
+    numbers = columns["invoice_number"]
+    sources = columns["source_pdf"]
+    ids = np.where(
+        numbers != "",
+        numbers,
+        np.where(sources != "", sources, "UNKNOWN_INVOICE"),
+    ).tolist()
+
+    results = [
+        {"invoice_id": i, "is_valid": code == 0, "errors": templates[code].copy()}
+        for i, code in zip(ids, codes.tolist())
+    ]
+
+    currency = columns["currency"]
+    for i in np.flatnonzero(codes & _CURRENCY_BIT).tolist():
+        value = f"invalid:currency:{currency[i]}"
+        errors = results[i]["errors"]
+        errors[errors.index(None)] = value
+
+    return results
+
+
+class ColumnarResults(SequenceABC):
+    """
+    Results of validate_columns(..., lazy=True), kept as columns: codes[i]
+    is the bitmask of the rules row i failed, in _RULES order, and
+    templates maps every code to its error list. Indexing builds the
+    result dict validate_invoices returns for that row; to_list builds
+    them all.
+    """
+
+    def __init__(
+        self, columns: Mapping[str, np.ndarray], codes: np.ndarray, templates: Dict
+    ):
+        self.columns = columns
+        self.codes = codes
+        self.templates = templates
+
+    @property
+    def is_valid(self) -> np.ndarray:
+        return self.codes == 0
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        code = int(self.codes[i])
+        errors = self.templates[code].copy()
+        if code & _CURRENCY_BIT:
+            value = f"invalid:currency:{self.columns['currency'][i]}"
+            errors[errors.index(None)] = value
+        invoice_id = (
+            str(self.columns["invoice_number"][i])
+            or str(self.columns["source_pdf"][i])
+            or "UNKNOWN_INVOICE"
+        )
+        return {"invoice_id": invoice_id, "is_valid": code == 0, "errors": errors}
+
+    def to_list(self) -> List[Dict]:
+        with _gc_paused():
+            return _build_results(self.columns, self.codes, self.templates)
+
+
+def validate_columns(
+    columns: Mapping[str, np.ndarray],
+    include_results: bool = True,
+    lazy: bool = False,
+) -> Dict:
+    """
+    Validate a batch held as columns. Returns the same
+    {"results": [...], "summary": {...}} structure as validate_invoices.
+
+    With include_results=False only the summary is computed, which skips
+    building one result dict per invoice. With lazy=True results is a
+    ColumnarResults, which builds them only when they are read.
+    """
+    with _gc_paused():
+        return _validate_columns(columns, include_results, lazy)
+
+
+def _validate_columns(
+    columns: Mapping[str, np.ndarray], include_results: bool, lazy: bool
+) -> Dict:
+    masks = _rule_masks(columns)
+    n = len(columns["invoice_number"])
+
+    codes = np.zeros(n, dtype=np.int64)
+    for bit, mask in enumerate(masks):
+        codes |= mask.astype(np.int64) << bit
+
+    error_counter = Counter()
+    for name, mask in zip(_RULES, masks):
+        count = int(mask.sum())
+        if name is not None and count:
+            error_counter[name] = count
+
+    currency = columns["currency"]
+    bad_currency = masks[_RULES.index(None)]
+    for value in currency[bad_currency].tolist():
+        error_counter[f"invalid:currency:{value}"] += 1
+
+    # Rows with the same set of failed rules share one error template
+    templates = {
+        int(code): [name for bit, name in enumerate(_RULES) if code >> bit & 1]
+        for code in np.unique(codes)
+    }
+
+    if not include_results:
+        results = []
+    elif lazy:
+        results = ColumnarResults(columns, codes, templates)
+    else:
+        results = _build_results(columns, codes, templates)
+
+    valid = int((codes == 0).sum())
+    summary = {
+        "total_invoices": n,
+        "valid_invoices": valid,
+        "invalid_invoices": n - valid,
+        "error_counts": dict(error_counter),
+    }
+
+    return {
+        "results": results,
+        "summary": summary,
+    }
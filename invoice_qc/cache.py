@@ -0,0 +1,161 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import IO, Dict, Optional, Tuple
+
+from .metrics import CACHE_REQUESTS
+from .schema import AnyInvoice, InvoiceRecord
+
+
+DEFAULT_CACHE_DIR = ".invoice_qc_cache"
+DEFAULT_MAX_ENTRIES = 100_000
+
+_CHUNK_SIZE = 1 << 20
+
+
+def key_hasher(version: str, variant: str = ""):
+    """
+    SHA-256 seeded with the extractor version tag and extraction options;
+    feed it the file contents to get the cache key.
+    """
+    h = hashlib.sha256()
+    h.update(version.encode("utf-8"))
+    h.update(b"\0")
+    h.update(variant.encode("utf-8"))
+    h.update(b"\0")
+    return h
+
+
+def file_digest(file: IO, version: str, variant: str = "") -> str:
+    """
+    SHA-256 of the file contents plus the extractor version tag and
+    extraction options. The file is read in chunks and rewound afterwards.
+    """
+    h = key_hasher(version, variant)
+    file.seek(0)
+    for chunk in iter(lambda: file.read(_CHUNK_SIZE), b""):
+        h.update(chunk)
+    file.seek(0)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """
+    On-disk, content-addressed cache of extracted invoices.
+
+    Entries are JSON files named by the PDF digest. A hit refreshes the
+    entry's mtime, and when the cache grows past max_entries the least
+    recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        root: str = DEFAULT_CACHE_DIR,
+        version: str = "",
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.root = Path(root)
+        self.version = version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _iter_entries(self):
+        if not self.root.exists():
+            return iter(())
+        return self.root.glob("*/*.json")
+
+    def key_for(self, file: IO, variant: str = "") -> str:
+        return file_digest(file, self.version, variant)
+
+    def key_hasher(self, variant: str = ""):
+        """Hasher for computing a key while the file is being read elsewhere."""
+        return key_hasher(self.version, variant)
+
+    def get(self, key: str, filename: Optional[str] = None) -> Optional[InvoiceRecord]:
+        path = self._path(key)
+        try:
+            raw = path.read_text(encoding="utf-8")
+        except OSError:
+            self.misses += 1
+            CACHE_REQUESTS.inc(1, "miss")
+            return None
+
+        try:
+            inv = InvoiceRecord.parse_raw(raw)
+        except ValueError:
+            # Corrupt or outdated entry: treat as a miss and drop it
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            CACHE_REQUESTS.inc(1, "miss")
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        CACHE_REQUESTS.inc(1, "hit")
+        if filename is not None:
+            inv = inv.copy(update={"source_pdf": filename})
+        return inv
+
+    def lookup(
+        self, file: IO, filename: Optional[str] = None, variant: str = ""
+    ) -> Tuple[str, Optional[InvoiceRecord]]:
+        key = self.key_for(file, variant)
+        return key, self.get(key, filename)
+
+    def put(self, key: str, inv: AnyInvoice) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        existed = path.exists()
+
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(inv.json(), encoding="utf-8")
+        os.replace(tmp, path)
+
+        if not existed:
+            if self._entries is None:
+                self._entries = sum(1 for _ in self._iter_entries())
+            else:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop least recently used entries until the cache is at 90% of
+        max_entries. Returns the number of removed entries.
+        """
+        entries = []
+        for p in self._iter_entries():
+            try:
+                entries.append((p.stat().st_mtime, p))
+            except OSError:
+                pass
+
+        target = int(self.max_entries * 0.9)
+        excess = len(entries) - target
+        removed = 0
+        if excess > 0:
+            entries.sort()
+            for _, p in entries[:excess]:
+                p.unlink(missing_ok=True)
+                removed += 1
+
+        self._entries = len(entries) - removed
+        return removed
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        self._entries = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -1,13 +1,142 @@
 import argparse
+import cProfile
 import json
+import os
 import sys
+import time
+from collections import Counter
 from pathlib import Path
 from typing import List
 
-from .extractor import extract_invoices_from_dir
-from .validator import validate_invoices
-from .pdf_generator import create_invoice_pdf_file
-from .schema import Invoice
+from .backends import DEFAULT_BACKEND, backend_chain
+from .cache import DEFAULT_CACHE_DIR, ExtractionCache
+from .dup_index import DEFAULT_INDEX_PATH, DuplicateIndex
+from .extractor import (
+    EXTRACTOR_VERSION,
+    ExtractOptions,
+    extract_invoices_from_dir,
+    iter_invoices_from_dir,
+    iter_invoices_from_paths,
+)
+from .isolation import (
+    DEFAULT_MAX_MEMORY_MB,
+    DEFAULT_MAX_TASKS,
+    DEFAULT_TIMEOUT,
+    ExtractionBudget,
+)
+from .manifest import DEFAULT_MANIFEST_PATH, Manifest
+from .metrics import summary_lines
+from .ndjson import DEFAULT_CHUNK_SIZE, validate_streams
+from .profiling import finish_record, profile_extract, slowest_lines, stage_totals
+from .validator import InvoiceValidator, iter_validate, validate_invoices
+from .schema import AnyInvoice, InvoiceRecord
+
+
+def _write_report_pdf(inv: AnyInvoice, is_valid, pdf_out_dir: Path) -> None:
+    from .pdf_generator import create_invoice_pdf_file, report_filename
+
+    out_pdf = pdf_out_dir / report_filename(inv)
+    create_invoice_pdf_file(inv, str(out_pdf), status=is_valid)
+    label = "VALID" if is_valid else "INVALID"
+    pages = ""
+    if inv.pages_parsed is not None and inv.pages_parsed != inv.page_count:
+        pages = f" ({inv.pages_parsed}/{inv.page_count} pages parsed)"
+    print(f"  - {label}: {out_pdf}{pages}")
+    if inv.extraction_error:
+        print(f"      extraction error: {inv.extraction_error}")
+
+
+def _dup_source(pdf_dir: str):
+    """
+    Duplicate index source of the invoices of a folder: the PDF's absolute
+    path, so that re-scanning the same file is not a duplicate.
+    """
+    root = os.path.abspath(pdf_dir)
+
+    def source_of(inv: AnyInvoice) -> str:
+        return os.path.join(root, inv.source_pdf)
+
+    return source_of
+
+
+def _print_summary(s: dict, cache) -> None:
+    print("\nSummary:")
+    print(f"  Total   : {s['total_invoices']}")
+    print(f"  Valid   : {s['valid_invoices']}")
+    print(f"  Invalid : {s['invalid_invoices']}")
+    if cache is not None:
+        print(f"  Cache   : {cache.hits} hits, {cache.misses} misses")
+
+
+def _print_metrics(workers: int) -> None:
+    print("\nMetrics:")
+    for line in summary_lines():
+        print(line)
+    if workers > 1:
+        print("  (extraction stages ran in worker processes and are not included)")
+
+
+def _run_ndjson(
+    pdf_dir: str,
+    json_out: Path,
+    pdf_out_dir: Path,
+    workers: int,
+    cache,
+    options: ExtractOptions,
+    dup_index,
+    budget=None,
+) -> dict:
+    """
+    Streaming pipeline: extraction, validation and report writing are
+    chained generators, and every invoice is written as one NDJSON record
+    as soon as it has been validated. A trailing record holds the summary.
+    """
+    validator = InvoiceValidator(dup_index=dup_index)
+    invoices = iter_invoices_from_dir(
+        pdf_dir, workers=workers, cache=cache, options=options, budget=budget
+    )
+
+    with json_out.open("w", encoding="utf-8") as out:
+        for inv, result in iter_validate(invoices, validator, _dup_source(pdf_dir)):
+            record = {"extracted": inv.dict(), "validation": result}
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+            _write_report_pdf(inv, result["is_valid"], pdf_out_dir)
+
+        summary = validator.summary()
+        out.write(json.dumps({"summary": summary}) + "\n")
+
+    print(f"Saved NDJSON report → {json_out}")
+    return summary
+
+
+def _backend_spec(value: str) -> str:
+    try:
+        backend_chain(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    return value
+
+
+def _budget(args: argparse.Namespace):
+    """
+    Budget for isolated extraction, or None to extract as before. Any
+    budget option implies --isolate; 0 disables that limit.
+    """
+    overrides = {
+        name: value
+        for name, value in (
+            ("timeout", args.timeout),
+            ("max_memory_mb", args.max_memory_mb),
+            ("max_tasks", args.max_tasks_per_worker),
+        )
+        if value is not None
+    }
+    if not args.isolate and not overrides:
+        return None
+    return ExtractionBudget(
+        **{name: value or None for name, value in overrides.items()}
+    )
 
 
 def cmd_run(args: argparse.Namespace) -> int:
@@ -17,8 +146,226 @@ def cmd_run(args: argparse.Namespace) -> int:
 
     pdf_out_dir.mkdir(parents=True, exist_ok=True)
 
-    invoices: List[Invoice] = extract_invoices_from_dir(pdf_dir)
-    validation = validate_invoices(invoices)
+    cache = ExtractionCache(args.cache_dir, version=EXTRACTOR_VERSION)
+    # Also with --no-cache: the run bypasses the cache, but it is emptied
+    if args.clear_cache:
+        cache.clear()
+    if args.no_cache:
+        cache = None
+
+    options = ExtractOptions(
+        lazy=args.lazy,
+        first_pages=args.first_pages,
+        last_pages=args.last_pages,
+        regions=args.regions,
+        backend=args.backend,
+        line_items=not args.no_line_items,
+    )
+
+    dup_index = None
+    if not args.no_dup_index:
+        dup_index = DuplicateIndex(
+            args.dup_index, bloom_capacity=args.dup_bloom_capacity
+        )
+
+    try:
+        return _run(args, pdf_dir, json_out, pdf_out_dir, cache, options, dup_index)
+    finally:
+        if dup_index is not None:
+            dup_index.close()
+        if args.metrics:
+            _print_metrics(args.workers)
+
+
+def _run_incremental(
+    args, pdf_dir, json_out, pdf_out_dir, cache, options, dup_index
+) -> int:
+    """
+    Extract, validate and render only the PDFs the manifest reports as new
+    or changed, then write a report covering the whole folder from the
+    fresh and the recorded results.
+    """
+    from .pdf_generator import report_filename
+
+    manifest = Manifest(
+        args.manifest, variant=f"{EXTRACTOR_VERSION}:{options.cache_tag()}"
+    )
+    try:
+        scan = manifest.scan(pdf_dir)
+        print(
+            f"Incremental: {len(scan.changed)} new or changed, "
+            f"{len(scan.paths) - len(scan.changed)} unchanged, "
+            f"{scan.removed} removed"
+        )
+
+        validator = InvoiceValidator(dup_index=dup_index)
+        if scan.changed:
+            # Changed files are checked for duplicates against the others
+            changed = set(scan.changed)
+            for path, inv in manifest.duplicate_keys(pdf_dir).items():
+                if path not in changed:
+                    validator.seed(inv)
+
+        invoices = iter_invoices_from_paths(
+            scan.changed,
+            workers=args.workers,
+            cache=cache,
+            options=options,
+            budget=_budget(args),
+        )
+        for path, (inv, result) in zip(
+            scan.changed,
+            iter_validate(invoices, validator, _dup_source(pdf_dir)),
+        ):
+            _write_report_pdf(inv, result["is_valid"], pdf_out_dir)
+            manifest.record(path, inv, result, report_filename(inv))
+        # Commits the duplicate index
+        validator.summary()
+        manifest.commit()
+
+        entries = manifest.entries(pdf_dir)
+    finally:
+        manifest.close()
+
+    records = [entries[path] for path in scan.paths]
+
+    # Reports deleted since the last run are rendered again
+    for invoice_json, result_json, report in records:
+        if not (pdf_out_dir / report).exists():
+            inv = InvoiceRecord.parse_raw(invoice_json)
+            _write_report_pdf(inv, json.loads(result_json)["is_valid"], pdf_out_dir)
+
+    results = [json.loads(result_json) for _, result_json, _ in records]
+    error_counter = Counter(e for r in results for e in r["errors"])
+    valid = sum(1 for r in results if r["is_valid"])
+    s = {
+        "total_invoices": len(results),
+        "valid_invoices": valid,
+        "invalid_invoices": len(results) - valid,
+        "error_counts": dict(error_counter),
+    }
+
+    with json_out.open("w", encoding="utf-8") as out:
+        if args.format == "ndjson":
+            # Stored JSON is spliced in as-is
+            for invoice_json, result_json, _ in records:
+                out.write(
+                    f'{{"extracted": {invoice_json}, "validation": {result_json}}}\n'
+                )
+            out.write(json.dumps({"summary": s}) + "\n")
+        else:
+            payload = {
+                "extracted": [json.loads(inv) for inv, _, _ in records],
+                "validation": {"results": results, "summary": s},
+            }
+            json.dump(payload, out, indent=2, default=str)
+    print(f"Saved report → {json_out}")
+
+    _print_summary(s, cache)
+    return 1 if s["invalid_invoices"] else 0
+
+
+def _run_profile(args, pdf_dir, json_out, pdf_out_dir, options, dup_index) -> int:
+    """
+    Serial, uncached run that times every stage of every invoice, then
+    writes the usual report plus a profile JSON and prints the slowest
+    invoices.
+    """
+    print("Profiling: extraction runs serially and bypasses the cache")
+    validator = InvoiceValidator(dup_index=dup_index)
+    source_of = _dup_source(pdf_dir)
+    paths = [str(p) for p in sorted(Path(pdf_dir).glob("*.pdf"))]
+
+    profiler = cProfile.Profile() if args.profile_pstats else None
+    if profiler is not None:
+        profiler.enable()
+
+    run_start = time.perf_counter()
+    invoices, results, records = [], [], []
+    for path in paths:
+        inv, record = profile_extract(path, options)
+
+        start = time.perf_counter()
+        result = validator.validate(inv, source_of(inv))
+        record["stages"]["validate"] = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        _write_report_pdf(inv, result["is_valid"], pdf_out_dir)
+        record["stages"]["render"] = (time.perf_counter() - start) * 1e3
+
+        invoices.append(inv)
+        results.append(result)
+        records.append(finish_record(record))
+    wall_s = time.perf_counter() - run_start
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile_pstats)
+        print(f"Saved cProfile stats → {args.profile_pstats}")
+
+    s = validator.summary()
+    payload = {
+        "extracted": [i.dict() for i in invoices],
+        "validation": {"results": results, "summary": s},
+    }
+    json_out.write_text(json.dumps(payload, indent=2, default=str), encoding="utf-8")
+    print(f"Saved reports.json → {json_out}")
+
+    profile = {
+        "meta": {
+            "extractor_version": EXTRACTOR_VERSION,
+            "options": options.dict(),
+            "files": len(records),
+            "wall_s": round(wall_s, 3),
+        },
+        "stage_totals_ms": stage_totals(records),
+        "invoices": records,
+    }
+    Path(args.profile_out).write_text(json.dumps(profile, indent=2), encoding="utf-8")
+
+    print(f"\nSlowest invoices (of {len(records)}, {wall_s:.2f} s):")
+    for line in slowest_lines(records, args.profile_top):
+        print(line)
+    print(f"Saved profile → {args.profile_out}")
+
+    _print_summary(s, None)
+    return 1 if s["invalid_invoices"] else 0
+
+
+def _run(args, pdf_dir, json_out, pdf_out_dir, cache, options, dup_index) -> int:
+    if args.profile:
+        return _run_profile(args, pdf_dir, json_out, pdf_out_dir, options, dup_index)
+
+    if args.incremental:
+        return _run_incremental(
+            args, pdf_dir, json_out, pdf_out_dir, cache, options, dup_index
+        )
+
+    if args.format == "ndjson":
+        s = _run_ndjson(
+            pdf_dir,
+            json_out,
+            pdf_out_dir,
+            args.workers,
+            cache,
+            options,
+            dup_index,
+            budget=_budget(args),
+        )
+        _print_summary(s, cache)
+        return 1 if s["invalid_invoices"] else 0
+
+    invoices: List[InvoiceRecord] = extract_invoices_from_dir(
+        pdf_dir,
+        workers=args.workers,
+        cache=cache,
+        options=options,
+        budget=_budget(args),
+    )
+    source_of = _dup_source(pdf_dir)
+    validation = validate_invoices(
+        invoices, dup_index=dup_index, sources=[source_of(inv) for inv in invoices]
+    )
 
     payload = {
         "extracted": [i.dict() for i in invoices],
@@ -33,27 +380,95 @@ def cmd_run(args: argparse.Namespace) -> int:
     }
 
     for inv in invoices:
-        inv_id = inv.get_invoice_id()
-        is_valid = valid_map.get(inv_id)
-        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in inv_id)
-        out_pdf = pdf_out_dir / f"{safe_id}.pdf"
-        create_invoice_pdf_file(inv, str(out_pdf), status=is_valid)
-        label = "VALID" if is_valid else "INVALID"
-        print(f"  - {label}: {out_pdf}")
+        _write_report_pdf(inv, valid_map.get(inv.get_invoice_id()), pdf_out_dir)
 
     s = validation["summary"]
-    print("\nSummary:")
-    print(f"  Total   : {s['total_invoices']}")
-    print(f"  Valid   : {s['valid_invoices']}")
-    print(f"  Invalid : {s['invalid_invoices']}")
+    _print_summary(s, cache)
 
     return 1 if s["invalid_invoices"] else 0
 
 
+def cmd_validate(args: argparse.Namespace) -> int:
+    dup_index = DuplicateIndex(args.dup_index) if args.dup_index else None
+    validator = InvoiceValidator(dup_index=dup_index)
+
+    def streams():
+        for name in args.inputs:
+            if name == "-":
+                yield name, sys.stdin.buffer
+            else:
+                with open(name, "rb") as fh:
+                    yield name, fh
+
+    out = sys.stdout.buffer if args.out == "-" else open(args.out, "wb")
+    try:
+        s, rejected = validate_streams(
+            streams(), out, validator, chunk_size=args.chunk_size
+        )
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        if dup_index is not None:
+            dup_index.close()
+
+    print(
+        f"Validated {s['total_invoices']}: {s['valid_invoices']} valid, "
+        f"{s['invalid_invoices']} invalid, {rejected} rejected",
+        file=sys.stderr,
+    )
+    return 1 if s["invalid_invoices"] or rejected else 0
+
+
+COMMANDS = ("run", "validate")
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
-        description="Invoice QC CLI: Extract + Validate + PDF reports"
+        description="Invoice QC CLI: Extract + Validate + PDF reports",
+        epilog="Without a command, 'run' is assumed.",
     )
+    commands = parser.add_subparsers(dest="command", metavar="{run,validate}")
+
+    run = commands.add_parser(
+        "run", help="Extract and validate a folder of PDFs and write reports"
+    )
+    _add_run_arguments(run)
+    run.set_defaults(func=cmd_run)
+
+    validate = commands.add_parser(
+        "validate",
+        help="Validate NDJSON invoices and write NDJSON results",
+        description=(
+            "Validate invoices given as NDJSON (one Invoice object per line, or "
+            "the records of 'run --format ndjson'). Writes one result per line "
+            "and a trailing summary record."
+        ),
+    )
+    validate.add_argument(
+        "inputs",
+        nargs="*",
+        default=["-"],
+        help="NDJSON files; '-' or none reads stdin",
+    )
+    validate.add_argument(
+        "--out", default="-", help="Output NDJSON file ('-' for stdout)"
+    )
+    validate.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Lines parsed and validated per batch",
+    )
+    validate.add_argument(
+        "--dup-index",
+        default=None,
+        help="SQLite duplicate index to check against (default: this input only)",
+    )
+    validate.set_defaults(func=cmd_validate)
+    return parser
+
+
+def _add_run_arguments(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("--pdf-dir", required=True, help="Directory with PDF invoices")
     parser.add_argument(
         "--json-out", default="reports.json", help="Output JSON report file"
@@ -63,11 +478,164 @@ def build_parser() -> argparse.ArgumentParser:
         default="invoice_reports",
         help="Directory for per-invoice PDF reports",
     )
-    parser.set_defaults(func=cmd_run)
-    return parser
+    parser.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="Report format: one JSON document, or streamed NDJSON records",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes used to extract PDFs in parallel",
+    )
+    parser.add_argument(
+        "--isolate",
+        action="store_true",
+        help=(
+            "Extract every PDF in an isolated worker process with a time and "
+            "memory budget; PDFs over budget get an extraction error"
+        ),
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help=(
+            f"Seconds per PDF with --isolate (default {DEFAULT_TIMEOUT:g}, "
+            "0: no limit)"
+        ),
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=None,
+        help=(
+            f"Memory per PDF with --isolate, in MB (default {DEFAULT_MAX_MEMORY_MB}, "
+            "0: no limit)"
+        ),
+    )
+    parser.add_argument(
+        "--max-tasks-per-worker",
+        type=int,
+        default=None,
+        help=(
+            f"PDFs per worker process before it is replaced (default "
+            f"{DEFAULT_MAX_TASKS}, 0: never)"
+        ),
+    )
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="Read pages one at a time and stop once every field is found",
+    )
+    parser.add_argument(
+        "--first-pages",
+        type=int,
+        default=None,
+        help="Only scan the first N pages (combine with --last-pages)",
+    )
+    parser.add_argument(
+        "--last-pages",
+        type=int,
+        default=None,
+        help="Only scan the last M pages (combine with --first-pages)",
+    )
+    parser.add_argument(
+        "--regions",
+        action="store_true",
+        help="Only lay out the lines around anchor keywords instead of whole pages",
+    )
+    parser.add_argument(
+        "--no-line-items",
+        action="store_true",
+        help="Skip item table parsing (line_items stays empty)",
+    )
+    parser.add_argument(
+        "--backend",
+        type=_backend_spec,
+        default=DEFAULT_BACKEND,
+        help=(
+            f"Text backend: pdfplumber (default), pdfminer, pdfium, auto, or a "
+            f"comma-separated fallback chain such as pdfminer,{DEFAULT_BACKEND}"
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for the extraction cache",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the extraction cache",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Empty the extraction cache before running (also with --no-cache)",
+    )
+    parser.add_argument(
+        "--dup-index",
+        default=DEFAULT_INDEX_PATH,
+        help="SQLite file recording invoice keys across runs",
+    )
+    parser.add_argument(
+        "--no-dup-index",
+        action="store_true",
+        help="Only detect duplicates within this run",
+    )
+    parser.add_argument(
+        "--dup-bloom-capacity",
+        type=int,
+        default=None,
+        help="Expected number of keys; enables a Bloom filter in front of the index",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only process PDFs that are new or changed since the last run",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=DEFAULT_MANIFEST_PATH,
+        help="SQLite file recording processed PDFs for --incremental",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Print per-stage latencies and counters after the run",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time every stage per invoice and report the slowest invoices",
+    )
+    parser.add_argument(
+        "--profile-out",
+        default="profile.json",
+        help="Per-invoice profile JSON written by --profile",
+    )
+    parser.add_argument(
+        "--profile-pstats",
+        default=None,
+        help="Also write a cProfile dump of the --profile run to this file",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="Number of slowest invoices printed by --profile",
+    )
 
 
 def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Older invocations pass the run options without a command
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv.insert(0, "run")
+
     parser = build_parser()
     args = parser.parse_args(argv)
     return args.func(args)
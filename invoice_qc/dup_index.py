@@ -0,0 +1,177 @@
+"""
+Persistent duplicate index shared by the CLI and API.
+
+Keys are (invoice_number, invoice_date) pairs hashed to 16-byte digests.
+The first 8 bytes are the SQLite rowid, so a lookup is a single primary-key
+probe with no secondary index; the full digest is kept to rule out prefix
+collisions. An optional in-memory Bloom filter answers most "never seen"
+lookups without touching SQLite.
+"""
+
+import hashlib
+import math
+import sqlite3
+import threading
+from datetime import date
+from typing import Optional
+
+
+DEFAULT_INDEX_PATH = ".invoice_qc_dups.sqlite"
+
+# Commit pending inserts after this many new keys
+_COMMIT_EVERY = 10_000
+# SQLite page cache per connection
+_CACHE_KIB = 64 * 1024
+
+
+def key_digest(invoice_number: str, invoice_date: Optional[date]) -> bytes:
+    raw = f"{invoice_number}\x1f{invoice_date.isoformat() if invoice_date else ''}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def _row_id(digest: bytes) -> int:
+    return int.from_bytes(digest[:8], "little", signed=True)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over 64-bit key ids, using double hashing on
+    the two 32-bit halves of the id.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key_id: int):
+        h1 = key_id & 0xFFFFFFFF
+        h2 = (key_id >> 32 & 0xFFFFFFFF) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add_id(self, key_id: int) -> None:
+        bits = self.bits
+        for pos in self._positions(key_id):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def has_id(self, key_id: int) -> bool:
+        bits = self.bits
+        for pos in self._positions(key_id):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class DuplicateIndex:
+    """
+    SQLite-backed set of invoice keys seen across runs.
+
+    - path: database file (":memory:" for a throwaway index)
+    - bloom_capacity: expected number of keys; when set, a Bloom filter
+      is built from the table on open so new keys skip the lookup
+
+    A key counts as a duplicate when it was recorded before, unless both
+    records name the same source. The CLI passes the PDF's path, so
+    re-scanning a folder does not flag its own files; API uploads get a
+    fresh id each, so a re-upload is always flagged. A None source is
+    never the same as another.
+    """
+
+    def __init__(
+        self, path: str = DEFAULT_INDEX_PATH, bloom_capacity: Optional[int] = None
+    ):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA cache_size=-{_CACHE_KIB}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " id INTEGER PRIMARY KEY,"
+            " digest BLOB NOT NULL,"
+            " source TEXT)"
+        )
+        self._conn.commit()
+        self._pending = 0
+        self.bloom: Optional[BloomFilter] = None
+        if bloom_capacity:
+            self.bloom = BloomFilter(bloom_capacity)
+            for (row_id,) in self._conn.execute("SELECT id FROM seen"):
+                self.bloom.add_id(row_id)
+
+    @staticmethod
+    def _is_duplicate(row: tuple, source: Optional[str]) -> bool:
+        return source is None or row[1] != source
+
+    def _lookup(self, row_id: int, digest: bytes) -> Optional[tuple]:
+        row = self._conn.execute(
+            "SELECT digest, source FROM seen WHERE id = ?", (row_id,)
+        ).fetchone()
+        if row is None or row[0] != digest:
+            return None
+        return row
+
+    def check_and_add(
+        self, invoice_number: str, invoice_date: Optional[date], source: Optional[str]
+    ) -> bool:
+        """
+        Record the key and return True if it was already recorded, other
+        than for this same source.
+        """
+        digest = key_digest(invoice_number, invoice_date)
+        row_id = _row_id(digest)
+
+        with self._lock:
+            if self.bloom is None or self.bloom.has_id(row_id):
+                row = self._lookup(row_id, digest)
+                if row is not None:
+                    return self._is_duplicate(row, source)
+
+            # A Bloom negative can be stale if another process wrote the
+            # key since we opened; the insert is ignored then and we look
+            # the row up after all.
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO seen (id, digest, source) VALUES (?, ?, ?)",
+                (row_id, digest, source),
+            )
+            if cur.rowcount == 0:
+                row = self._lookup(row_id, digest)
+                # None here means a 64-bit prefix collision: not a duplicate
+                return row is not None and self._is_duplicate(row, source)
+
+            if self.bloom is not None:
+                self.bloom.add_id(row_id)
+
+            self._pending += 1
+            if self._pending >= _COMMIT_EVERY:
+                self._commit()
+
+        return False
+
+    def __contains__(self, key) -> bool:
+        digest = key_digest(*key)
+        row_id = _row_id(digest)
+        if self.bloom is not None and not self.bloom.has_id(row_id):
+            return False
+        with self._lock:
+            return self._lookup(row_id, digest) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def _commit(self) -> None:
+        self._conn.commit()
+        self._pending = 0
+
+    def commit(self) -> None:
+        with self._lock:
+            self._commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._conn.close()
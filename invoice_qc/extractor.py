@@ -1,10 +1,26 @@
 import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import IO, List, Optional
+from typing import IO, Iterator, List, Optional, Tuple
 
-import pdfplumber
-from .schema import Invoice
+from pydantic import BaseModel, Field
+
+from .backends import DEFAULT_BACKEND, TextBackend, backend_chain
+from .cache import ExtractionCache
+from .isolation import (
+    BudgetExceeded,
+    ExtractionBudget,
+    IsolatedExecutor,
+    as_budget_error,
+)
+from .metrics import BYTES, PAGES, STAGE_SECONDS, TEXT_BACKEND, timed
+from .schema import InvoiceRecord
+
+# Bump whenever parsing changes so cached extractions are invalidated.
+EXTRACTOR_VERSION = "2"
 
 # -------------------- Utilities --------------------
 
@@ -48,16 +64,55 @@ def normalize_name(value: str) -> str:
     return value.title().strip()
 
 
+# -------------------- Patterns --------------------
+
+INVOICE_NUMBER_RE = re.compile(r"(AUFNR\d+)")
+INVOICE_DATE_RE = re.compile(r"Bestellung\s+AUFNR\d+.*?vom\s+" + DATE_PATTERN)
+POSTCODE_RE = re.compile(r"\b[0-9]{5}\b")
+SELLER_RE = re.compile(r"\n([A-Za-z\s]+(?:Corporation|GmbH|Ltd))")
+SELLER_FALLBACK_RE = re.compile(r"\b([A-Za-z ]{4,40}(?:Corporation|GmbH|Ltd))\b")
+AMOUNT_RE = re.compile(r"[€]?\s*[\d.,]+")
+
+NET_KEYWORDS = ("netto", "net total", "net amount", "subtotal")
+TAX_KEYWORDS = ("mwst", "tax", "vat", "gst")
+GROSS_KEYWORDS = ("gesamt", "gross", "total")
+TOTALS_KEYWORDS = NET_KEYWORDS + TAX_KEYWORDS + GROSS_KEYWORDS
+# Line breaks other than \n that str.splitlines() also honours
+OTHER_LINE_BREAKS = "\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+SELLER_SUFFIXES = ("Corporation", "GmbH", "Ltd")
+
+# Line items: a table starts at a header or annex line holding one of the
+# markers and runs to the next totals line
+ITEM_TABLE_MARKERS = ("Artikelbeschreibung", "Positionen")
+ITEM_UNITS = (
+    "VE", "Stück", "Stk", "St", "Pck", "Pkg", "Karton", "Fl", "Rolle", "Box",
+    "Set", "Paar", "kg",
+)
+_GERMAN_AMOUNT = r"\d{1,3}(?:\.\d{3})*,\d{2}"
+_GERMAN_PRICE = r"\d{1,3}(?:\.\d{3})*,\d{2,4}"
+# "<pos> <description> [<unit price>] <quantity> <unit> ... <line total>"
+ITEM_ROW_RE = re.compile(
+    r"\d{1,5}\s+(?P<description>\S.*?)\s+"
+    r"(?:(?P<price>" + _GERMAN_PRICE + r")\s+)?"
+    r"(?P<quantity>\d+(?:,\d+)?)\s+(?:" + "|".join(ITEM_UNITS) + r")\b"
+    r"(?:.*\s)?(?P<total>" + _GERMAN_AMOUNT + r")"
+)
+# Unit price on a detail line below the row: "16,0000 pro 1 VE"
+ITEM_PRICE_RE = re.compile(r"(" + _GERMAN_PRICE + r")\s+pro\s+(\d+)\b")
+# Longer lines are not item rows; keeps ITEM_ROW_RE's backtracking bounded
+MAX_ITEM_ROW_CHARS = 300
+
+
 # -------------------- Extractors --------------------
 
 def extract_invoice_number(text: str):
 
-    m = re.search(r"(AUFNR\d+)", text)
+    m = INVOICE_NUMBER_RE.search(text)
     return m.group(1) if m else None
 
 
 def extract_invoice_date(text: str):
-    m = re.search(r"Bestellung\s+AUFNR\d+.*?vom\s+" + DATE_PATTERN, text)
+    m = INVOICE_DATE_RE.search(text)
     return parse_date(m.group(1)) if m else None
 
 
@@ -66,26 +121,40 @@ def extract_buyer(text: str) -> Optional[str]:
     Assume buyer block occurs BEFORE address line containing 'Deutschland'.
     Capture first firm-like line before it.
     """
+    return _find_buyer(text, text.lower())
 
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
 
-    for i, line in enumerate(lines):
-        if "deutschland" in line.lower() or re.search(r"\b[0-9]{5}\b", line):
-            if i > 0:
-                return normalize_name(lines[i - 1])
+def _find_buyer(text: str, lower: str) -> Optional[str]:
+
+    if "deutschland" not in lower and not POSTCODE_RE.search(text):
+        return None
+
+    prev_line = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if prev_line is not None and (
+            "deutschland" in line.lower() or POSTCODE_RE.search(line)
+        ):
+            return normalize_name(prev_line)
+        prev_line = line
 
     return None
 
 
 def extract_seller(text: str) -> Optional[str]:
 
-    m = re.search(r"\n([A-Za-z\s]+(?:Corporation|GmbH|Ltd))", text)
-    
+    if not any(suffix in text for suffix in SELLER_SUFFIXES):
+        return None
+
+    m = SELLER_RE.search(text)
+
     if m:
         return normalize_name(m.group(1))
 
     # fallback scan for known forms
-    name_match = re.search(r"\b([A-Za-z ]{4,40}(?:Corporation|GmbH|Ltd))\b", text)
+    name_match = SELLER_FALLBACK_RE.search(text)
     return normalize_name(name_match.group(1)) if name_match else None
 
 
@@ -95,74 +164,510 @@ def extract_currency(text: str):
     return None
 
 
+def _totals_candidate_lines(text: str, lower: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (line, lowered line) for the lines that contain a totals keyword.
+
+    Keywords are located with str.find on the lowered text, so lines
+    without one are never visited. Falls back to every line when the
+    lowered text is not position-aligned with the original or uses line
+    breaks other than \\n.
+    """
+    if len(lower) != len(text) or any(c in text for c in OTHER_LINE_BREAKS):
+        for line in text.splitlines():
+            yield line, line.lower()
+        return
+
+    starts = set()
+    for kw in TOTALS_KEYWORDS:
+        i = lower.find(kw)
+        while i != -1:
+            starts.add(lower.rfind("\n", 0, i) + 1)
+            end = lower.find("\n", i)
+            if end == -1:
+                break
+            i = lower.find(kw, end)
+
+    for start in sorted(starts):
+        end = lower.find("\n", start)
+        if end == -1:
+            end = len(text)
+        yield text[start:end], lower[start:end]
+
+
+def _totals_line(line: str, lower: str):
+    """
+    Classify one line as net / tax / gross and parse its amount.
+    Returns (kind, value) or None.
+    """
+    if any(k in lower for k in NET_KEYWORDS):
+        kind = "net"
+    elif any(k in lower for k in TAX_KEYWORDS):
+        kind = "tax"
+    elif any(k in lower for k in GROSS_KEYWORDS):
+        kind = "gross"
+    else:
+        return None
+
+    numbers = AMOUNT_RE.findall(line)
+    if not numbers:
+        return None
+
+    value = parse_amount(numbers[-1])
+    if not value:
+        return None
+
+    return kind, value
+
+
 def extract_totals(text: str):
     """
     Flex parsing totals with line scanning.
     """
+    return _scan_totals(text, text.lower())
 
-    net = tax = gross = None
 
-    for line in text.splitlines():
+def _scan_totals(text: str, lower: str):
 
-        lower = line.lower()
-        numbers = re.findall(r"[€]?\s*[\d.,]+", line)
+    totals = {"net": None, "tax": None, "gross": None}
 
-        if not numbers:
-            continue
+    for line, line_lower in _totals_candidate_lines(text, lower):
+        hit = _totals_line(line, line_lower)
+        if hit:
+            totals[hit[0]] = hit[1]
 
-        value = parse_amount(numbers[-1])
+    return totals["net"], totals["tax"], totals["gross"]
 
-        if not value:
+
+def extract_fields(text: str) -> dict:
+    """
+    Fill every Invoice field from text in one go.
+
+    The text is lowered once and shared by the buyer and totals rules;
+    each field is located by its literal anchor or a precompiled pattern
+    so line-based rules only visit the lines that matter. Results match
+    the individual extract_* functions.
+    """
+    lower = text.lower()
+
+    inv_no = inv_date = None
+    anchor = text.find("AUFNR")
+    # "AUFNR" need not be followed by digits; the date pattern needs them too
+    m = INVOICE_NUMBER_RE.search(text, anchor) if anchor != -1 else None
+    if m:
+        inv_no = m.group(1)
+        start = text.find("Bestellung")
+        if start != -1:
+            m = INVOICE_DATE_RE.search(text, start)
+            inv_date = parse_date(m.group(1)) if m else None
+
+    net, tax, gross = _scan_totals(text, lower)
+
+    return {
+        "invoice_number": inv_no,
+        "invoice_date": inv_date,
+        "buyer_name": _find_buyer(text, lower),
+        "seller_name": extract_seller(text),
+        "currency": extract_currency(text),
+        "net_total": net,
+        "tax_amount": tax,
+        "gross_total": gross,
+    }
+
+
+# -------------------- Line items --------------------
+
+def _item_table_start(text: str) -> int:
+    starts = [i for i in (text.find(m) for m in ITEM_TABLE_MARKERS) if i != -1]
+    return text.rfind("\n", 0, min(starts)) + 1 if starts else -1
+
+
+def extract_line_items(text: str) -> List[dict]:
+    """
+    LineItem dicts from the item tables in text. Texts without a table
+    marker return [] after one find per marker; otherwise only the lines
+    from the first marker on are visited, and rows are parsed only inside
+    a table (marker line to totals line).
+
+    The unit price comes from the row or from a "<price> pro <n>" line
+    below it; without one it is the line total over the quantity.
+    """
+    start = _item_table_start(text)
+    if start == -1:
+        return []
+
+    items: List[dict] = []
+    in_table = False
+    current = None
+    for line in text[start:].split("\n"):
+        if any(m in line for m in ITEM_TABLE_MARKERS):
+            in_table = True
+            current = None
+            continue
+        if not in_table:
+            continue
+
+        line = line.strip()
+        m = ITEM_ROW_RE.fullmatch(line) if len(line) <= MAX_ITEM_ROW_CHARS else None
+        if m is not None:
+            quantity = parse_amount(m.group("quantity")) or 0.0
+            total = parse_amount(m.group("total")) or 0.0
+            price = parse_amount(m.group("price")) if m.group("price") else None
+            current = {
+                "description": m.group("description"),
+                "quantity": quantity,
+                "unit_price": price,
+                "line_total": total,
+            }
+            items.append(current)
             continue
 
-        if any(k in lower for k in ["netto", "net total", "net amount", "subtotal"]):
-            net = value
+        lower = line.lower()
+        if any(kw in lower for kw in TOTALS_KEYWORDS):
+            in_table = False
+            current = None
+        elif current is not None and current["unit_price"] is None:
+            p = ITEM_PRICE_RE.search(line)
+            if p is not None:
+                current["unit_price"] = (parse_amount(p.group(1)) or 0.0) / max(
+                    int(p.group(2)), 1
+                )
+
+    for item in items:
+        if item["unit_price"] is None:
+            quantity = item["quantity"]
+            item["unit_price"] = (
+                round(item["line_total"] / quantity, 4) if quantity else 0.0
+            )
+    return items
+
+
+# -------------------- Options --------------------
+
+class ExtractOptions(BaseModel):
+    """
+    Per-run extraction settings.
+
+    - lazy: parse pages one at a time and stop as soon as every field
+      has been found
+    - first_pages / last_pages: only look at the first N and last M
+      pages (None means no limit on that side; both None = all pages)
+    - regions: only lay out the lines around anchor keywords instead of
+      the whole page (see regions.py; not supported by the pdfium backend)
+    - backend: text backend, or a comma-separated fallback chain of them
+      (see backends.py)
+    - line_items: parse item tables into line_items (with regions, the
+      table lines are kept as well)
+    """
 
-        elif any(k in lower for k in ["mwst", "tax", "vat", "gst"]):
-            tax = value
+    lazy: bool = False
+    regions: bool = False
+    backend: str = DEFAULT_BACKEND
+    line_items: bool = True
+    first_pages: Optional[int] = Field(default=None, ge=0)
+    last_pages: Optional[int] = Field(default=None, ge=0)
 
-        elif any(k in lower for k in ["gesamt", "gross", "total"]):
-            gross = value
+    def cache_tag(self) -> str:
+        """
+        Stable string for the non-default options, mixed into cache keys
+        since they change what gets extracted.
+        """
+        return ",".join(
+            f"{k}={v}" for k, v in sorted(self.dict(exclude_defaults=True).items())
+        )
 
-    return net, tax, gross
+
+DEFAULT_OPTIONS = ExtractOptions()
+
+
+def page_scan_order(
+    page_count: int, first: Optional[int] = None, last: Optional[int] = None
+) -> List[int]:
+    """
+    Page indices to read: the first N followed by the last M, without
+    repeats. With no limits every page is read in order.
+    """
+    if first is None and last is None:
+        return list(range(page_count))
+
+    head = range(min(first or 0, page_count))
+    tail = range(max(page_count - (last or 0), len(head)), page_count)
+    return list(head) + list(tail)
 
 
 # -------------------- Pipeline --------------------
 
-def extract_invoice_from_file(file: IO, filename: str) -> Invoice:
+REQUIRED_FIELDS = frozenset(
+    [
+        "invoice_number",
+        "invoice_date",
+        "buyer_name",
+        "seller_name",
+        "net_total",
+        "tax_amount",
+        "gross_total",
+    ]
+)
+
 
-    with pdfplumber.open(file) as pdf:
-        text = "\n".join(p.extract_text() or "" for p in pdf.pages)
+def _found_fields(text: str) -> set:
+    fields = extract_fields(text)
+    return {name for name in REQUIRED_FIELDS if fields[name]}
 
-    inv_no = extract_invoice_number(text)
-    inv_date = extract_invoice_date(text)
-    buyer = extract_buyer(text)
-    seller = extract_seller(text)
 
-    currency = extract_currency(text)
+def extract_invoice_from_text(text: str, filename: str) -> InvoiceRecord:
 
-    net, tax, gross = extract_totals(text)
+    return InvoiceRecord(source_pdf=filename, **extract_fields(text))
 
-    return Invoice(
-        source_pdf=filename,
-        invoice_number=inv_no,
-        invoice_date=inv_date,
-        buyer_name=buyer,
-        seller_name=seller,
-        currency=currency,
-        net_total=net,
-        tax_amount=tax,
-        gross_total=gross,
-        line_items=[],
+
+def failure_record(filename: str, exc: BaseException) -> InvoiceRecord:
+    """
+    Record for a PDF that could not be extracted, with the error as
+    "Type: message" (budget violations: see isolation.BudgetExceeded).
+    """
+    exc = as_budget_error(exc)
+    return InvoiceRecord(
+        source_pdf=filename, extraction_error=f"{type(exc).__name__}: {exc}"
     )
 
 
-def extract_invoices_from_dir(folder: str) -> List[Invoice]:
+def extract_invoice_from_file(
+    file: IO,
+    filename: str,
+    cache: Optional[ExtractionCache] = None,
+    options: Optional[ExtractOptions] = None,
+    cache_key: Optional[str] = None,
+) -> InvoiceRecord:
+    """
+    cache_key skips hashing the file when the caller already computed it
+    (see ExtractionCache.key_hasher).
+    """
+    options = options or DEFAULT_OPTIONS
+
+    if cache is not None:
+        if cache_key is None:
+            key, cached = cache.lookup(file, filename, variant=options.cache_tag())
+        else:
+            key, cached = cache_key, cache.get(cache_key, filename)
+        if cached is not None:
+            return cached
+
+    with timed("extract"):
+        inv = _extract_invoice(file, filename, options)
+
+    if cache is not None:
+        cache.put(key, inv)
+
+    return inv
+
+
+def _read_pages(doc: TextBackend, options: ExtractOptions) -> dict:
+    """
+    Return {page_index: text} for the pages selected by the options.
+    In lazy mode pages are opened one by one, and reading stops once
+    every required field has been seen.
+    """
+    order = page_scan_order(doc.page_count, options.first_pages, options.last_pages)
+    texts = {}
+    found = set()
+    tail = ""
+
+    for idx in order:
+        page_text = doc.page_text(idx, options.regions, options.line_items)
+        texts[idx] = page_text
+
+        if options.lazy:
+            # Include the end of the previous page so fields split across
+            # a page break are still seen.
+            found |= _found_fields(tail + "\n" + page_text)
+            if found >= REQUIRED_FIELDS:
+                break
+            tail = "\n".join(page_text.splitlines()[-2:])
+
+    return texts
+
+
+def read_text(
+    file: IO, options: ExtractOptions, stages: Optional[dict] = None
+) -> Tuple[int, dict, str]:
+    """
+    Return (page_count, {page_index: text}, backend name), trying the
+    backends of options.backend in turn. A backend that fails or finds no
+    text hands the file to the next one; the last one's result or error
+    stands. stages, when given, collects "open" and "page_text" in ms.
+    """
+    chain = backend_chain(options.backend)
+    for position, backend in enumerate(chain):
+        last = position == len(chain) - 1
+        file.seek(0)
+        try:
+            start = time.perf_counter()
+            with backend(file) as doc:
+                opened = time.perf_counter()
+                STAGE_SECONDS.observe(opened - start, "pdf_open")
+                with timed("page_text"):
+                    texts = _read_pages(doc, options)
+                if stages is not None:
+                    stages["open"] = stages.get("open", 0.0) + (opened - start) * 1e3
+                    stages["page_text"] = (
+                        stages.get("page_text", 0.0)
+                        + (time.perf_counter() - opened) * 1e3
+                    )
+        except Exception as exc:
+            # Running out of memory ends the document, not just the backend
+            if (
+                last
+                or isinstance(exc, MemoryError)
+                or isinstance(as_budget_error(exc), BudgetExceeded)
+            ):
+                raise
+            continue
+        if last or any(t.strip() for t in texts.values()):
+            break
+
+    TEXT_BACKEND.inc(1, backend.name)
+    return doc.page_count, texts, backend.name
+
+
+def _extract_invoice(file: IO, filename: str, options: ExtractOptions) -> InvoiceRecord:
+    size = file.seek(0, 2)
+    file.seek(0)
+
+    page_count, texts, _ = read_text(file, options)
+    text = "\n".join(texts[i] for i in sorted(texts))
+
+    with timed("fields"):
+        inv = extract_invoice_from_text(text, filename)
+    if options.line_items:
+        with timed("line_items"):
+            inv.line_items = extract_line_items(text)
+    inv.page_count = page_count
+    inv.pages_parsed = len(texts)
+
+    BYTES.inc(size, "pdf")
+    PAGES.inc(page_count, "total")
+    PAGES.inc(len(texts), "parsed")
+    return inv
 
-    invoices = []
 
-    for f in Path(folder).glob("*.pdf"):
-        with open(f, "rb") as fh:
-            invoices.append(extract_invoice_from_file(fh, f.name))
+def _extract_path(
+    path: str,
+    cache: Optional[ExtractionCache] = None,
+    options: Optional[ExtractOptions] = None,
+) -> InvoiceRecord:
+    """
+    Extract one PDF from disk. Failures are recorded on the returned
+    record instead of being raised, so one bad file never aborts a batch.
+    """
+    name = Path(path).name
+    try:
+        with open(path, "rb") as fh:
+            return extract_invoice_from_file(fh, name, cache=cache, options=options)
+    except Exception as exc:
+        return failure_record(name, exc)
+
+
+def _lookup_path(path: str, cache: ExtractionCache, options: ExtractOptions):
+    try:
+        with open(path, "rb") as fh:
+            return cache.lookup(fh, Path(path).name, variant=options.cache_tag())
+    except OSError:
+        return None, None
 
-    return invoices
+
+def _resolve(entry, cache: Optional[ExtractionCache]) -> InvoiceRecord:
+    path, key, item = entry
+    if isinstance(item, InvoiceRecord):
+        return item
+    try:
+        inv = item.result()
+    except BudgetExceeded as exc:
+        return failure_record(Path(path).name, exc)
+    if cache is not None and key is not None and not inv.extraction_error:
+        cache.put(key, inv)
+    return inv
+
+
+def iter_invoices_from_dir(
+    folder: str,
+    workers: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    options: Optional[ExtractOptions] = None,
+    budget: Optional[ExtractionBudget] = None,
+) -> Iterator[InvoiceRecord]:
+    """
+    Yield one InvoiceRecord per *.pdf in folder, in sorted filename order.
+    See iter_invoices_from_paths.
+    """
+    paths = [str(p) for p in sorted(Path(folder).glob("*.pdf"))]
+    return iter_invoices_from_paths(
+        paths, workers=workers, cache=cache, options=options, budget=budget
+    )
+
+
+def iter_invoices_from_paths(
+    paths: List[str],
+    workers: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    options: Optional[ExtractOptions] = None,
+    budget: Optional[ExtractionBudget] = None,
+) -> Iterator[InvoiceRecord]:
+    """
+    Yield one InvoiceRecord per PDF path, in the given order.
+
+    With workers > 1 the files are parsed in a process pool; results are
+    still yielded in order, each as soon as it (and every file before it)
+    has finished. Cache lookups and writes stay in this process so
+    hit/miss counters cover the whole run.
+
+    With a budget every file is parsed in an isolated worker process (at
+    least one, whatever workers says), and a file that exceeds the budget
+    gets a BudgetExceeded extraction_error instead of stalling the run.
+    """
+    options = options or DEFAULT_OPTIONS
+
+    if budget is None and (workers <= 1 or len(paths) <= 1):
+        for path in paths:
+            yield _extract_path(path, cache=cache, options=options)
+        return
+
+    workers = max(workers, 1)
+    if budget is not None:
+        executor = IsolatedExecutor(workers, budget)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    # Keep a bounded window of submitted files so memory stays flat
+    # however many PDFs the folder holds.
+    window = workers * 4
+    with executor as pool:
+        pending = deque()
+        for path in paths:
+            key = cached = None
+            if cache is not None:
+                key, cached = _lookup_path(path, cache, options)
+            if cached is not None:
+                pending.append((path, key, cached))
+            else:
+                future = pool.submit(_extract_path, path, None, options)
+                pending.append((path, key, future))
+
+            while len(pending) > window:
+                yield _resolve(pending.popleft(), cache)
+
+        while pending:
+            yield _resolve(pending.popleft(), cache)
+
+
+def extract_invoices_from_dir(
+    folder: str,
+    workers: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    options: Optional[ExtractOptions] = None,
+    budget: Optional[ExtractionBudget] = None,
+) -> List[InvoiceRecord]:
+    return list(
+        iter_invoices_from_dir(
+            folder, workers=workers, cache=cache, options=options, budget=budget
+        )
+    )
@@ -0,0 +1,261 @@
+"""
+Upload ingestion: size limits, spooling and memory-mapped reads.
+
+Uploads are copied once, in fixed-size chunks, from the request's
+temporary file into memory (small files) or a spool file on disk (large
+files). Size limits are checked as the bytes arrive. The extraction
+cache key is hashed in the same pass. Extraction then reads spooled files
+through a read-only memory map, so PDF bytes live in the page cache
+rather than on the heap, and only the pages pdfminer touches get loaded.
+"""
+
+import io
+import mmap
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import IO, Callable, List, Optional
+
+_CHUNK_SIZE = 1 << 20
+_MB = 1 << 20
+
+DEFAULT_SPOOL_THRESHOLD = 1 * _MB
+DEFAULT_MAX_FILE_BYTES = 50 * _MB
+DEFAULT_MAX_REQUEST_BYTES = 200 * _MB
+# Room for multipart boundaries and headers in the Content-Length check
+MULTIPART_SLACK = 1 * _MB
+
+
+class UploadTooLarge(Exception):
+    """An upload, or a request's uploads together, exceeded a size limit."""
+
+
+@dataclass
+class IngestLimits:
+    """
+    - spool_threshold: files larger than this go to disk
+    - max_file_bytes / max_request_bytes: None means unlimited
+    - spool_dir: directory for spool files (system temp dir by default)
+    """
+
+    spool_threshold: int = DEFAULT_SPOOL_THRESHOLD
+    max_file_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES
+    max_request_bytes: Optional[int] = DEFAULT_MAX_REQUEST_BYTES
+    spool_dir: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "IngestLimits":
+        def _mb(name: str, default: Optional[int]) -> Optional[int]:
+            value = os.environ.get(name)
+            if value is None:
+                return default
+            return int(float(value) * _MB) if value else None
+
+        return cls(
+            spool_threshold=_mb("INVOICE_QC_SPOOL_MB", DEFAULT_SPOOL_THRESHOLD) or 0,
+            max_file_bytes=_mb("INVOICE_QC_MAX_FILE_MB", DEFAULT_MAX_FILE_BYTES),
+            max_request_bytes=_mb("INVOICE_QC_MAX_REQUEST_MB", DEFAULT_MAX_REQUEST_BYTES),
+            spool_dir=os.environ.get("INVOICE_QC_SPOOL_DIR") or None,
+        )
+
+    def request_too_large(self, content_length: int) -> bool:
+        """
+        Early check on a request's Content-Length, before its body is
+        parsed. Multipart framing is allowed for on top of the limit.
+        """
+        if self.max_request_bytes is None:
+            return False
+        return content_length > self.max_request_bytes + MULTIPART_SLACK
+
+
+@dataclass
+class Upload:
+    """
+    One ingested file: held in memory (data) or spooled to disk (path).
+    Picklable, so it can be handed to process workers as is.
+    """
+
+    filename: str
+    size: int
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+    # Extraction cache key, when a key hasher was given
+    cache_key: Optional[str] = None
+    keep: bool = field(default=False, repr=False)
+
+    def open(self) -> IO[bytes]:
+        if self.path is None:
+            return io.BytesIO(self.data or b"")
+        return MappedFile(self.path)
+
+    def discard(self) -> None:
+        """Remove the spool file, unless it was written to a given destination."""
+        if self.path is not None and not self.keep:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class MappedFile(io.RawIOBase):
+    """
+    Read-only file object over a memory map. Reads return copies of the
+    requested range only; the file itself is never loaded as a whole.
+    """
+
+    def __init__(self, path: str):
+        self.name = path
+        self._fd = os.open(path, os.O_RDONLY)
+        size = os.fstat(self._fd).st_size
+        # Empty files cannot be mapped
+        self._mm = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ) if size else b""
+        self._size = size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"Negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def read(self, size: int = -1) -> bytes:
+        start = min(self._pos, self._size)
+        end = self._size if size is None or size < 0 else min(start + size, self._size)
+        if end > start:
+            self._pos = end
+        return self._mm[start:end]
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            if isinstance(self._mm, mmap.mmap):
+                self._mm.close()
+            os.close(self._fd)
+        super().close()
+
+
+def spool(
+    src: IO[bytes],
+    filename: str,
+    limits: IngestLimits,
+    budget: Optional[List[int]] = None,
+    key_hasher=None,
+    dest: Optional[str] = None,
+) -> Upload:
+    """
+    Copy src into an Upload in one pass, checking the size limits and
+    updating key_hasher (a hashlib object) with every chunk.
+
+    budget is a one-element list with the bytes still allowed for the
+    request; it is decremented as data arrives. With dest the file is
+    always written there and kept by discard().
+    """
+    size = 0
+    head: List[bytes] = []
+    out = None
+    path = dest
+    try:
+        if dest is not None:
+            out = open(dest, "wb")
+        for chunk in iter(lambda: src.read(_CHUNK_SIZE), b""):
+            size += len(chunk)
+            if limits.max_file_bytes is not None and size > limits.max_file_bytes:
+                raise UploadTooLarge(
+                    f"{filename} exceeds {limits.max_file_bytes} bytes"
+                )
+            if budget is not None:
+                budget[0] -= len(chunk)
+                if budget[0] < 0:
+                    raise UploadTooLarge(
+                        f"Request exceeds {limits.max_request_bytes} bytes of uploads"
+                    )
+            if key_hasher is not None:
+                key_hasher.update(chunk)
+
+            if out is None and size > limits.spool_threshold:
+                fd, path = tempfile.mkstemp(
+                    prefix="invoice_qc_", suffix=".pdf", dir=limits.spool_dir
+                )
+                out = os.fdopen(fd, "wb")
+                out.writelines(head)
+                head = []
+            if out is not None:
+                out.write(chunk)
+            else:
+                head.append(chunk)
+    except BaseException:
+        if out is not None:
+            out.close()
+            if path is not None:
+                os.unlink(path)
+        raise
+
+    if out is not None:
+        out.close()
+
+    return Upload(
+        filename=filename,
+        size=size,
+        data=b"".join(head) if out is None else None,
+        path=path,
+        cache_key=key_hasher.hexdigest() if key_hasher is not None else None,
+        keep=dest is not None,
+    )
+
+
+def spool_all(
+    files: List,
+    limits: IngestLimits,
+    key_hasher_factory: Optional[Callable] = None,
+    dests: Optional[List[str]] = None,
+    request_limit: bool = True,
+) -> List[Upload]:
+    """
+    Spool (filename, readable) pairs with a shared request budget. On a
+    limit violation every file spooled so far is discarded, kept or not.
+    """
+    budget = (
+        [limits.max_request_bytes]
+        if request_limit and limits.max_request_bytes is not None
+        else None
+    )
+    uploads: List[Upload] = []
+    try:
+        for idx, (filename, src) in enumerate(files):
+            uploads.append(
+                spool(
+                    src,
+                    filename,
+                    limits,
+                    budget=budget,
+                    key_hasher=key_hasher_factory() if key_hasher_factory else None,
+                    dest=dests[idx] if dests is not None else None,
+                )
+            )
+    except BaseException:
+        for upload in uploads:
+            upload.keep = False
+            upload.discard()
+        raise
+    return uploads
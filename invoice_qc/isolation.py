@@ -0,0 +1,325 @@
+"""
+Isolated extraction workers with per-document time and memory budgets.
+
+IsolatedExecutor runs each task in a long-lived worker process that handles
+one document at a time:
+
+- timeout: wall-clock seconds a document may take. A worker that runs
+  over is killed and replaced; the task fails with ExtractionTimeout.
+- max_memory_mb: address space a document may add on top of the worker's
+  baseline (Linux: RLIMIT_AS). Allocations beyond it raise MemoryError in
+  the worker, reported as MemoryBudgetExceeded.
+- max_tasks: documents a worker handles before it is replaced, so memory
+  fragmented or leaked by pdfminer is given back to the system.
+
+A worker that dies for any other reason (a crash, the OOM killer) fails
+its task with WorkerCrashed. Every violation is a BudgetExceeded, which
+callers record as the invoice's extraction_error.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_MEMORY_MB = 1024
+DEFAULT_MAX_TASKS = 100
+
+_MB = 1 << 20
+
+# Set in worker processes that run under a memory limit: the budget, and
+# the address space limit it translates to
+_memory_limit_mb: Optional[int] = None
+_memory_ceiling: int = 0
+
+
+class BudgetExceeded(Exception):
+    """A document ran past its time or memory budget, or took its worker down."""
+
+
+class ExtractionTimeout(BudgetExceeded):
+    pass
+
+
+class MemoryBudgetExceeded(BudgetExceeded):
+    pass
+
+
+class WorkerCrashed(BudgetExceeded):
+    pass
+
+
+@dataclass
+class ExtractionBudget:
+    """
+    Limits per document; None means no limit. See the module docstring.
+    """
+
+    timeout: Optional[float] = DEFAULT_TIMEOUT
+    max_memory_mb: Optional[int] = DEFAULT_MAX_MEMORY_MB
+    max_tasks: Optional[int] = DEFAULT_MAX_TASKS
+
+    @classmethod
+    def from_env(cls) -> "ExtractionBudget":
+        """Empty variables disable the corresponding limit."""
+
+        def _value(name: str, default, cast):
+            value = os.environ.get(name)
+            if value is None:
+                return default
+            return cast(value) or None if value else None
+
+        return cls(
+            timeout=_value("INVOICE_QC_EXTRACT_TIMEOUT", DEFAULT_TIMEOUT, float),
+            max_memory_mb=_value(
+                "INVOICE_QC_EXTRACT_MEMORY_MB", DEFAULT_MAX_MEMORY_MB, int
+            ),
+            max_tasks=_value("INVOICE_QC_WORKER_MAX_TASKS", DEFAULT_MAX_TASKS, int),
+        )
+
+
+def as_budget_error(exc: BaseException) -> BaseException:
+    """
+    An error caused by a worker's memory limit, as the budget violation it
+    is. Any other exception is returned unchanged.
+
+    Failed allocations in C code do not always raise MemoryError (pdfminer
+    can end in a SystemError), so any error raised once the worker came
+    within a tenth of the budget of its limit counts as well.
+    """
+    if _memory_limit_mb is None:
+        return exc
+    if isinstance(exc, MemoryError) or _near_memory_limit():
+        return MemoryBudgetExceeded(
+            f"exceeded the {_memory_limit_mb} MB memory budget"
+        )
+    return exc
+
+
+# -------------------- Worker process --------------------
+
+def _address_space() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _peak_address_space() -> int:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmPeak:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _near_memory_limit() -> bool:
+    if _memory_limit_mb is None:
+        return False
+    margin = _memory_limit_mb * _MB // 10
+    return _peak_address_space() >= _memory_ceiling - margin
+
+
+def _limit_memory(max_memory_mb: int) -> None:
+    global _memory_limit_mb, _memory_ceiling
+    try:
+        import resource
+    except ImportError:  # not available on this platform
+        return
+    # The baseline (interpreter, PDF stack, inherited mappings) is not
+    # charged to the document
+    limit = _address_space() + max_memory_mb * _MB
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    _memory_limit_mb = max_memory_mb
+    _memory_ceiling = limit
+
+
+def _worker_main(conn, max_memory_mb: Optional[int]) -> None:
+    # Ctrl-C is handled by the parent, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Imported before the baseline is taken, so the import is not
+    # charged to the first document
+    import pdfplumber  # noqa: F401
+
+    if max_memory_mb:
+        _limit_memory(max_memory_mb)
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+
+        fn, args, kwargs = task
+        try:
+            ok, value = True, fn(*args, **kwargs)
+        except BaseException as exc:
+            ok, value = False, as_budget_error(exc)
+        del task
+
+        # A worker that came close to its memory limit asks to be replaced:
+        # its peak would count against the next document
+        retire = _near_memory_limit()
+        try:
+            conn.send((ok, value, retire))
+        except Exception as exc:
+            error = RuntimeError(f"Cannot return result: {exc!r}")
+            conn.send((False, error, retire))
+
+
+# -------------------- Parent side --------------------
+
+class _Worker:
+    def __init__(self, ctx, max_memory_mb: Optional[int]):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child, max_memory_mb), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.tasks = 0
+        self.retired = False
+
+    def call(self, fn: Callable, args, kwargs, timeout: Optional[float]):
+        self.tasks += 1
+        try:
+            self.conn.send((fn, args, kwargs))
+        except OSError:
+            # Died while idle (the OOM killer, a signal)
+            raise self._crashed()
+        if not self.conn.poll(timeout):
+            self.kill()
+            raise ExtractionTimeout(f"exceeded the {timeout:g} s time budget")
+        try:
+            ok, value, retire = self.conn.recv()
+        except (EOFError, OSError):
+            raise self._crashed()
+        if retire:
+            self.retired = True
+        if not ok:
+            raise value
+        return value
+
+    def _crashed(self) -> WorkerCrashed:
+        self.process.join()
+        self.conn.close()
+        reason = _exit_reason(self.process.exitcode)
+        return WorkerCrashed(f"extraction worker {reason}")
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def _exit_reason(code: Optional[int]) -> str:
+    if code is not None and code < 0:
+        try:
+            return f"killed by {signal.Signals(-code).name}"
+        except ValueError:
+            pass
+    return f"exited with code {code}"
+
+
+class IsolatedExecutor(Executor):
+    """
+    Executor over `workers` isolated worker processes, started on first
+    use and replaced when they time out, crash or reach budget.max_tasks.
+    fn, its arguments and its result must be picklable.
+    """
+
+    def __init__(self, workers: int, budget: Optional[ExtractionBudget] = None):
+        self.workers = workers
+        self.budget = budget or ExtractionBudget()
+        self._ctx = multiprocessing.get_context()
+        self._tasks: "queue.Queue" = queue.Queue()
+        self._shutdown = False
+        self._slots: List[threading.Thread] = [
+            threading.Thread(
+                target=self._run_slot, name=f"invoice-qc-isolated-{i}", daemon=True
+            )
+            for i in range(workers)
+        ]
+        for slot in self._slots:
+            slot.start()
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        if self._shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        future: Future = Future()
+        self._tasks.put((future, fn, args, kwargs))
+        return future
+
+    def _run_slot(self) -> None:
+        budget = self.budget
+        worker: Optional[_Worker] = None
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                break
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            if worker is None:
+                worker = _Worker(self._ctx, budget.max_memory_mb)
+            try:
+                future.set_result(worker.call(fn, args, kwargs, budget.timeout))
+            except (ExtractionTimeout, WorkerCrashed) as exc:
+                # The worker is gone already
+                worker = None
+                future.set_exception(exc)
+            except BaseException as exc:
+                future.set_exception(exc)
+
+            # Replaced after max_tasks documents, or once it came close to
+            # its memory limit
+            if worker is not None and (
+                worker.retired
+                or (budget.max_tasks and worker.tasks >= budget.max_tasks)
+            ):
+                worker.stop()
+                worker = None
+
+        if worker is not None:
+            worker.stop()
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._shutdown = True
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        for _ in self._slots:
+            self._tasks.put(None)
+        if wait:
+            for slot in self._slots:
+                slot.join()
@@ -0,0 +1,349 @@
+"""
+Batch jobs for the API.
+
+A job is a set of uploaded PDFs spooled to disk and recorded in a SQLite
+store. JobRunner extracts the files in a worker pool and validates them in
+upload order as they complete, saving every invoice and result as it goes.
+Jobs that were queued or running when the service stopped are resumed on
+the next start; invoices already extracted are not extracted again.
+"""
+
+import asyncio
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .cache import ExtractionCache
+from .dup_index import DuplicateIndex
+from .extractor import ExtractOptions, extract_invoice_from_file, failure_record
+from .ingest import MappedFile
+from .isolation import BudgetExceeded
+from .pool import ExtractionPool
+from .schema import InvoiceRecord
+from .validator import InvoiceValidator
+
+
+logger = logging.getLogger("invoice_qc.jobs")
+
+DEFAULT_JOB_DIR = ".invoice_qc_jobs"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+
+def extract_job_file(
+    path: str,
+    filename: str,
+    cache: Optional[ExtractionCache],
+    options: ExtractOptions,
+) -> InvoiceRecord:
+    """
+    Runs inside the job pool. Takes a path so it can be sent to process
+    workers.
+    """
+    try:
+        with MappedFile(path) as f:
+            return extract_invoice_from_file(f, filename, cache=cache, options=options)
+    except Exception as exc:
+        return failure_record(filename, exc)
+
+
+class JobStore:
+    """
+    SQLite-backed store of jobs, their files, extracted invoices and
+    validation results.
+
+    - root: directory holding jobs.sqlite and the spooled uploads
+    """
+
+    def __init__(self, root: str = DEFAULT_JOB_DIR):
+        self.root = Path(root)
+        self.files_dir = self.root / "files"
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.root / "jobs.sqlite"), check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " options TEXT NOT NULL,"
+            " total INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " summary TEXT,"
+            " error TEXT);"
+            "CREATE TABLE IF NOT EXISTS job_files ("
+            " job_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " filename TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " invoice TEXT,"
+            " result TEXT,"
+            " PRIMARY KEY (job_id, seq));"
+        )
+        self._conn.commit()
+
+    def new_job_dir(self) -> Tuple[str, Path]:
+        job_id = uuid.uuid4().hex
+        job_dir = self.files_dir / job_id
+        job_dir.mkdir(parents=True)
+        return job_id, job_dir
+
+    def create(
+        self, job_id: str, files: List[Tuple[str, str]], options: ExtractOptions
+    ) -> None:
+        """Record a queued job over (filename, spooled path) pairs."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, options, total, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, options.json(), len(files), now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_files (job_id, seq, filename, path) VALUES (?, ?, ?, ?)",
+                [(job_id, seq, name, path) for seq, (name, path) in enumerate(files)],
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT j.*, (SELECT COUNT(*) FROM job_files f"
+                "  WHERE f.job_id = j.id AND f.result IS NOT NULL) AS done"
+                " FROM jobs j WHERE j.id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "total": row["total"],
+            "done": row["done"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "summary": json.loads(row["summary"]) if row["summary"] else None,
+            "error": row["error"],
+        }
+
+    def options(self, job_id: str) -> ExtractOptions:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT options FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return ExtractOptions.parse_raw(row["options"])
+
+    def files(self, job_id: str) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, filename, path, invoice FROM job_files"
+                " WHERE job_id = ? ORDER BY seq",
+                (job_id,),
+            ).fetchall()
+
+    def results(
+        self, job_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Validated invoices with seq >= offset, in upload order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, invoice, result FROM job_files"
+                " WHERE job_id = ? AND seq >= ? AND result IS NOT NULL"
+                " ORDER BY seq LIMIT ?",
+                (job_id, offset, -1 if limit is None else limit),
+            ).fetchall()
+        return [
+            {
+                "seq": row["seq"],
+                "extracted": json.loads(row["invoice"]),
+                "validation": json.loads(row["result"]),
+            }
+            for row in rows
+        ]
+
+    def pending(self) -> List[str]:
+        """Jobs that are queued or were interrupted while running."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (QUEUED, RUNNING),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+
+    def save_invoice(self, job_id: str, seq: int, inv: InvoiceRecord) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE job_files SET invoice = ? WHERE job_id = ? AND seq = ?",
+                (inv.json(), job_id, seq),
+            )
+
+    def save_result(self, job_id: str, seq: int, result: Dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE job_files SET result = ? WHERE job_id = ? AND seq = ?",
+                (json.dumps(result), job_id, seq),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, summary: Dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, summary = ?, updated_at = ? WHERE id = ?",
+                (DONE, json.dumps(summary), time.time(), job_id),
+            )
+        # Invoices are stored; the uploads are no longer needed
+        shutil.rmtree(self.files_dir / job_id, ignore_errors=True)
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock, self._conn:
+            cur = self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.execute("DELETE FROM job_files WHERE job_id = ?", (job_id,))
+        shutil.rmtree(self.files_dir / job_id, ignore_errors=True)
+        return cur.rowcount > 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobRunner:
+    """
+    Processes jobs one at a time, in submission order, with every worker of
+    the pool available to the current job.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        pool: ExtractionPool,
+        cache: Optional[ExtractionCache] = None,
+        dup_index: Optional[DuplicateIndex] = None,
+    ):
+        self.store = store
+        self.pool = pool
+        self.cache = cache
+        self.dup_index = dup_index
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start processing, re-queueing jobs left over from a previous run."""
+        self._queue = asyncio.Queue()
+        for job_id in self.store.pending():
+            self._queue.put_nowait(job_id)
+        self._task = asyncio.create_task(self._dispatch())
+
+    def submit(self, job_id: str) -> None:
+        self._queue.put_nowait(job_id)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _dispatch(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.exception("Job %s failed", job_id)
+                self.store.set_status(job_id, FAILED, f"{type(exc).__name__}: {exc}")
+
+    async def _run_job(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return
+
+        self.store.set_status(job_id, RUNNING)
+        options = self.store.options(job_id)
+        files = self.store.files(job_id)
+
+        invoices: Dict[int, InvoiceRecord] = {
+            row["seq"]: InvoiceRecord.parse_raw(row["invoice"])
+            for row in files
+            if row["invoice"] is not None
+        }
+
+        # Validation runs in upload order so duplicates are flagged on the
+        # later file. Invoices stored before a restart are validated again
+        # to rebuild the validator state; each file is its own source in the
+        # duplicate index, which ignores keys it already holds for it.
+        validator = InvoiceValidator(dup_index=self.dup_index)
+        next_seq = 0
+
+        def advance() -> None:
+            nonlocal next_seq
+            while next_seq in invoices:
+                result = validator.validate(
+                    invoices[next_seq], source=f"job:{job_id}:{next_seq}"
+                )
+                self.store.save_result(job_id, next_seq, result)
+                next_seq += 1
+
+        # Validation and the duplicate index run off the event loop
+        await asyncio.to_thread(advance)
+
+        sem = asyncio.Semaphore(self.pool.workers)
+
+        async def _one(row) -> Tuple[int, InvoiceRecord]:
+            async with sem:
+                try:
+                    inv = await self.pool.run(
+                        extract_job_file,
+                        row["path"],
+                        row["filename"],
+                        self.cache,
+                        options,
+                    )
+                except BudgetExceeded as exc:
+                    inv = failure_record(row["filename"], exc)
+            return row["seq"], inv
+
+        tasks = [
+            asyncio.ensure_future(_one(row))
+            for row in files
+            if row["seq"] not in invoices
+        ]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                seq, inv = await fut
+                self.store.save_invoice(job_id, seq, inv)
+                invoices[seq] = inv
+                await asyncio.to_thread(advance)
+        finally:
+            # Only does anything when the runner is stopped mid-job
+            for task in tasks:
+                task.cancel()
+
+        self.store.finish(job_id, await asyncio.to_thread(validator.summary))
@@ -0,0 +1,200 @@
+"""
+File manifest for incremental CLI runs.
+
+For every PDF the manifest records size, mtime, content hash and the last
+extracted invoice, validation result and report name. A scan compares the
+folder against it: files whose size and mtime are unchanged are skipped
+without being read, and files whose stat changed are hashed, so a touched
+but identical file is not processed again either. Files whose extraction
+failed are processed again on every scan.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from .schema import AnyInvoice, InvoiceRecord
+
+
+DEFAULT_MANIFEST_PATH = ".invoice_qc_manifest.sqlite"
+
+_CHUNK_SIZE = 1 << 20
+
+# Stat and hash recorded for failed extractions, so they are retried
+FAILED_MTIME_NS = -1
+FAILED_DIGEST = ""
+
+
+def content_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ScanResult(NamedTuple):
+    paths: List[str]  # every PDF in the folder, sorted by name
+    changed: List[str]  # new or changed PDFs, in the same order
+    removed: int  # entries dropped because their file is gone
+
+
+class Manifest:
+    """
+    SQLite-backed manifest of processed PDFs.
+
+    - path: database file
+    - variant: extractor version and options; entries recorded under a
+      different variant count as changed
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH, variant: str = ""):
+        self.path = path
+        self.variant = variant
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " folder TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " variant TEXT NOT NULL,"
+            " invoice TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " report TEXT NOT NULL,"
+            " invoice_number TEXT,"
+            " invoice_date TEXT,"
+            " seller_name TEXT,"
+            " gross_total REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS files_folder ON files (folder)"
+        )
+        self._conn.commit()
+        # path -> (size, mtime_ns, digest) of changed files seen by scan
+        self._stats: Dict[str, Tuple[int, int, str]] = {}
+
+    def scan(self, folder: str) -> ScanResult:
+        folder = str(Path(folder).resolve())
+        known = {
+            row[0]: row[1:]
+            for row in self._conn.execute(
+                "SELECT path, size, mtime_ns, digest, variant FROM files"
+                " WHERE folder = ?",
+                (folder,),
+            )
+        }
+
+        with os.scandir(folder) as it:
+            entries = sorted(
+                (e for e in it if e.name.endswith(".pdf") and e.is_file()),
+                key=lambda e: e.name,
+            )
+
+        paths, changed, touched = [], [], []
+        for entry in entries:
+            path = os.path.join(folder, entry.name)
+            st = entry.stat()
+            paths.append(path)
+
+            row = known.pop(path, None)
+            if row is not None and row[3] == self.variant and row[0] == st.st_size:
+                if row[1] == st.st_mtime_ns:
+                    continue
+                # Same size, new mtime: only the hash can tell
+                digest = content_digest(path)
+                if digest == row[2]:
+                    touched.append((st.st_mtime_ns, path))
+                    continue
+            else:
+                digest = content_digest(path)
+
+            changed.append(path)
+            self._stats[path] = (st.st_size, st.st_mtime_ns, digest)
+
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE files SET mtime_ns = ? WHERE path = ?", touched
+            )
+            self._conn.executemany(
+                "DELETE FROM files WHERE path = ?", [(p,) for p in known]
+            )
+
+        return ScanResult(paths, changed, len(known))
+
+    def record(self, path: str, inv: AnyInvoice, result: Dict, report: str) -> None:
+        """
+        Store the outcome for a changed file returned by scan. A failed
+        extraction is stored for the folder report, but with a stat and
+        hash no file has, so the next scan returns the file as changed.
+        """
+        size, mtime_ns, digest = self._stats.pop(path)
+        if inv.extraction_error:
+            mtime_ns, digest = FAILED_MTIME_NS, FAILED_DIGEST
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files"
+            " (path, folder, size, mtime_ns, digest, variant, invoice, result, report,"
+            "  invoice_number, invoice_date, seller_name, gross_total)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                os.path.dirname(path),
+                size,
+                mtime_ns,
+                digest,
+                self.variant,
+                json.dumps(inv.dict(), default=str),
+                json.dumps(result),
+                report,
+                inv.invoice_number,
+                inv.invoice_date.isoformat() if inv.invoice_date else None,
+                inv.seller_name,
+                inv.gross_total,
+            ),
+        )
+
+    def duplicate_keys(self, folder: str) -> Dict[str, InvoiceRecord]:
+        """
+        path -> InvoiceRecord holding only the fields duplicate detection uses,
+        read without parsing the stored JSON.
+        """
+        folder = str(Path(folder).resolve())
+        return {
+            path: InvoiceRecord(
+                source_pdf=os.path.basename(path),
+                invoice_number=number,
+                invoice_date=date.fromisoformat(day) if day else None,
+                seller_name=seller,
+                gross_total=gross,
+            )
+            for path, number, day, seller, gross in self._conn.execute(
+                "SELECT path, invoice_number, invoice_date, seller_name, gross_total"
+                " FROM files WHERE folder = ?",
+                (folder,),
+            )
+        }
+
+    def entries(self, folder: str) -> Dict[str, Tuple[str, str, str]]:
+        """path -> (invoice JSON, result JSON, report name) for the folder."""
+        folder = str(Path(folder).resolve())
+        return {
+            row[0]: row[1:]
+            for row in self._conn.execute(
+                "SELECT path, invoice, result, report FROM files WHERE folder = ?",
+                (folder,),
+            )
+        }
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
@@ -0,0 +1,229 @@
+"""
+In-process metrics: counters and latency histograms for the pipeline
+stages, rendered in the Prometheus text format for /metrics and as a plain
+table for the CLI.
+
+Metrics are per process. With a process executor (API) or --workers > 1
+(CLI) the extraction stages run in worker processes and are not recorded
+here; the parent still records cache lookups, validation and rendering.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+# Seconds; spans a cached lookup up to a slow multi-page PDF
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _label_str(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_label_str(self.labelnames, labels)} {_fmt(value)}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def quantile(self, q: float, *labels) -> float:
+        """Upper bucket bound below which a fraction q of observations fall."""
+        series = self.values.get(labels)
+        if not series or not series[2]:
+            return 0.0
+        target = q * series[2]
+        seen = 0
+        for bound, count in zip(self.buckets, series[0]):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _fmt(bound)
+                extra = f'le="{le}"'
+                yield f"{self.name}_bucket{_label_str(self.labelnames, labels, extra)} {cumulative}"
+            label_str = _label_str(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {_fmt(total)}"
+            yield f"{self.name}_count{label_str} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self.metrics:
+            with metric._lock:
+                metric.values.clear()
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "invoice_qc_stage_seconds",
+    "Time spent in each pipeline stage.",
+    ("stage",),
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "invoice_qc_http_request_seconds",
+    "HTTP request latency by route.",
+    ("method", "route", "status"),
+)
+PAGES = REGISTRY.counter(
+    "invoice_qc_pages_total",
+    "PDF pages, by whether their text was extracted.",
+    ("kind",),
+)
+BYTES = REGISTRY.counter(
+    "invoice_qc_bytes_total",
+    "Bytes of PDFs read and reports rendered.",
+    ("kind",),
+)
+TEXT_BACKEND = REGISTRY.counter(
+    "invoice_qc_text_backend_total",
+    "PDFs by the text backend their text came from.",
+    ("backend",),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "invoice_qc_cache_requests_total",
+    "Extraction cache lookups.",
+    ("result",),
+)
+INVOICES = REGISTRY.counter(
+    "invoice_qc_invoices_total",
+    "Validated invoices.",
+    ("result",),
+)
+RULE_ERRORS = REGISTRY.counter(
+    "invoice_qc_validation_errors_total",
+    "Validation errors by rule.",
+    ("rule",),
+)
+
+
+def rule_name(error: str) -> str:
+    """
+    Error code without its value part, so labels stay bounded:
+    invalid:currency:XYZ -> invalid:currency.
+    """
+    if error.startswith("invalid:currency:"):
+        return "invalid:currency"
+    return error
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+
+
+def summary_lines() -> List[str]:
+    """The same figures as /metrics, as a table for the CLI."""
+    lines = [
+        f"  {'stage':<14}{'count':>8}{'total s':>10}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}"
+    ]
+    for (stage,), (_, total, count) in sorted(STAGE_SECONDS.values.items()):
+        lines.append(
+            f"  {stage:<14}{count:>8}{total:>10.3f}{total / count * 1e3:>10.2f}"
+            f"{STAGE_SECONDS.quantile(0.5, stage) * 1e3:>9.1f}"
+            f"{STAGE_SECONDS.quantile(0.95, stage) * 1e3:>9.1f}"
+        )
+
+    def _counts(counter: Counter) -> str:
+        return ", ".join(
+            f"{'/'.join(labels)}={_fmt(v)}" for labels, v in sorted(counter.values.items())
+        ) or "-"
+
+    lines.append(f"  pages   : {_counts(PAGES)}")
+    lines.append(f"  bytes   : {_counts(BYTES)}")
+    lines.append(f"  cache   : {_counts(CACHE_REQUESTS)}")
+    lines.append(f"  invoices: {_counts(INVOICES)}")
+    if RULE_ERRORS.values:
+        lines.append("  errors by rule:")
+        for (rule,), count in sorted(RULE_ERRORS.values.items(), key=lambda kv: -kv[1]):
+            lines.append(f"    {rule:<36}{_fmt(count):>8}")
+    return lines
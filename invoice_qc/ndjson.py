@@ -0,0 +1,225 @@
+"""
+Streaming validation of NDJSON invoices for `invoice_qc.cli validate`.
+
+Input is read in chunks of lines. Each chunk is decoded with one JSON call
+and turned into Invoice objects with one pydantic call, then fed to a
+single InvoiceValidator, so results and the summary match validate_invoices
+over the whole input while memory stays bounded by the chunk size.
+
+orjson is used for decoding and encoding when it is installed, otherwise
+the standard library json module.
+"""
+
+import gc
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .schema import Invoice
+from .validator import InvoiceValidator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from pydantic import TypeAdapter
+except ImportError:  # pydantic 1
+    TypeAdapter = None
+
+
+DEFAULT_CHUNK_SIZE = 5000
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+    loads = orjson.loads
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+else:
+    import json
+
+    JSON_BACKEND = "json"
+    loads = json.loads
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+
+
+if TypeAdapter is not None:
+    _invoice_list = TypeAdapter(List[Invoice])
+
+    def _parse_invoices(records: List[Dict]) -> List[Invoice]:
+        return _invoice_list.validate_python(records)
+
+else:
+    from pydantic import parse_obj_as
+
+    def _parse_invoices(records: List[Dict]) -> List[Invoice]:
+        return parse_obj_as(List[Invoice], records)
+
+
+# (line number, invoice or None, error message or None)
+Row = Tuple[int, Optional[Invoice], Optional[str]]
+
+
+def iter_line_chunks(
+    stream: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[List[Tuple[int, bytes]]]:
+    """Non-blank lines of stream with their 1-based line numbers, in chunks."""
+    chunk: List[Tuple[int, bytes]] = []
+    for lineno, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append((lineno, line))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _decode(lines: List[bytes]) -> List:
+    """
+    Decode a chunk of lines with a single call. When that fails, or does
+    not give exactly one value per line (a line holding "{...},{...}"),
+    the chunk is decoded line by line, with the exception in place of a
+    malformed line. Lines are joined with a newline, which a JSON string
+    cannot hold, so no string runs from one line into the next.
+    """
+    try:
+        values = loads(b"[" + b",\n".join(lines) + b"]")
+    except ValueError:
+        pass
+    else:
+        if len(values) == len(lines):
+            return values
+
+    values = []
+    for line in lines:
+        try:
+            values.append(loads(line))
+        except ValueError as exc:
+            values.append(exc)
+    return values
+
+
+def _invoice_record(value) -> Optional[Dict]:
+    """
+    The invoice dict carried by a line. Besides bare invoices, the records
+    of `run --format ndjson` are accepted; their summary line is skipped.
+    """
+    if isinstance(value, dict) and isinstance(value.get("extracted"), dict):
+        return value["extracted"]
+    if isinstance(value, dict) and set(value) == {"summary"}:
+        return None
+    return value
+
+
+def parse_chunk(chunk: List[Tuple[int, bytes]]) -> List[Row]:
+    rows: List[Row] = []
+    records: List[Dict] = []
+    for (lineno, _), value in zip(chunk, _decode([line for _, line in chunk])):
+        if isinstance(value, ValueError):
+            rows.append((lineno, None, f"invalid JSON: {value}"))
+            continue
+        record = _invoice_record(value)
+        if record is None:
+            continue
+        if not isinstance(record, dict):
+            rows.append((lineno, None, "expected a JSON object"))
+            continue
+        rows.append((lineno, None, None))
+        records.append(record)
+
+    try:
+        invoices: List[Optional[Invoice]] = _parse_invoices(records)
+        errors: List[Optional[str]] = [None] * len(records)
+    except ValidationError:
+        # Only the records that do not fit the schema are rejected
+        invoices, errors = [], []
+        for record in records:
+            try:
+                invoices.append(Invoice.parse_obj(record))
+                errors.append(None)
+            except ValidationError as exc:
+                invoices.append(None)
+                errors.append(
+                    "; ".join(
+                        f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}"
+                        for e in exc.errors()
+                    )
+                )
+
+    parsed = iter(zip(invoices, errors))
+    return [
+        (lineno, *next(parsed)) if error is None else (lineno, None, error)
+        for lineno, _, error in rows
+    ]
+
+
+class StreamValidation:
+    """
+    Validates NDJSON streams one chunk at a time and writes one NDJSON
+    line per input record: the validate_invoices result, or
+    {"input", "line", "error"} for a line that is not a valid invoice.
+    """
+
+    def __init__(
+        self,
+        out: BinaryIO,
+        validator: Optional[InvoiceValidator] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.out = out
+        self.validator = validator or InvoiceValidator()
+        self.chunk_size = chunk_size
+        self.rejected = 0
+
+    def feed(self, stream: BinaryIO, name: str = "-") -> None:
+        for chunk in iter_line_chunks(stream, self.chunk_size):
+            # A chunk allocates thousands of small acyclic objects; cyclic
+            # GC passes over them cost more than the parsing itself
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                lines = self._validate_chunk(chunk, name)
+            finally:
+                if enabled:
+                    gc.enable()
+            self.out.write(b"\n".join(lines))
+
+    def _validate_chunk(self, chunk: List[Tuple[int, bytes]], name: str) -> List[bytes]:
+        validate = self.validator.validate
+        lines = []
+        for lineno, inv, error in parse_chunk(chunk):
+            if inv is None:
+                self.rejected += 1
+                lines.append(dumps({"input": name, "line": lineno, "error": error}))
+            else:
+                lines.append(dumps(validate(inv)))
+        lines.append(b"")
+        return lines
+
+    def finish(self) -> Dict:
+        """Write the trailing summary record and return the summary."""
+        summary = self.validator.summary()
+        self.out.write(dumps({"summary": summary, "rejected": self.rejected}) + b"\n")
+        self.out.flush()
+        return summary
+
+
+def validate_streams(
+    streams: Iterable[Tuple[str, BinaryIO]],
+    out: BinaryIO,
+    validator: Optional[InvoiceValidator] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Tuple[Dict, int]:
+    """Validate (name, stream) pairs in order; returns (summary, rejected)."""
+    run = StreamValidation(out, validator, chunk_size)
+    for name, stream in streams:
+        run.feed(stream, name)
+    return run.finish(), run.rejected
@@ -1,5 +1,9 @@
+import io
+import os
+import zipfile
 from io import BytesIO
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
@@ -13,7 +17,8 @@ from reportlab.platypus import (
     Spacer,
 )
 
-from .schema import Invoice
+from .metrics import BYTES, timed
+from .schema import AnyInvoice
 
 
 def _fmt_currency(amount: Optional[float], currency: Optional[str]) -> str:
@@ -27,88 +32,103 @@ def _fmt_currency(amount: Optional[float], currency: Optional[str]) -> str:
     return f"{symbol} {amount:,.2f}".strip()
 
 
-def build_invoice_story(invoice: Invoice, status: Optional[bool] = None) -> List:
-    styles = getSampleStyleSheet()
-    styles.add(
-        ParagraphStyle(
-            name="BodySmall",
-            parent=styles["Normal"],
-            fontSize=9,
-            leading=11,
+def report_filename(invoice: AnyInvoice) -> str:
+    inv_id = invoice.get_invoice_id()
+    safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in inv_id)
+    return f"{safe_id}.pdf"
+
+
+PAGE_MARGIN = 20 * mm
+
+HEADER_COLUMNS = ["Invoice ID", "Buyer", "Seller", "Invoice Date", "Gross Total", "Status"]
+HEADER_COL_WIDTHS = [30 * mm, 40 * mm, 40 * mm, 30 * mm, 30 * mm, 20 * mm]
+HALF_COL_WIDTHS = [90 * mm, 90 * mm]
+KV_COL_WIDTHS = [40 * mm, 50 * mm]
+ITEM_COLUMNS = ["Description", "Quantity", "Unit Price", "Line Total"]
+ITEM_COL_WIDTHS = [90 * mm, 25 * mm, 30 * mm, 35 * mm]
+
+# status -> (label, background of the status cell)
+STATUS_STYLES = {
+    None: ("-", colors.whitesmoke),
+    True: ("valid", colors.HexColor("#b6f2b5")),  # green-ish
+    False: ("invalid", colors.HexColor("#ffb3b3")),  # red-ish
+}
+
+_HEADER_COMMANDS = [
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f5f5f5")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+]
+
+_KV_COMMANDS = [
+    ("SPAN", (0, 0), (1, 0)),
+    ("FONTNAME", (0, 0), (1, 0), "Helvetica-Bold"),
+    ("BOTTOMPADDING", (0, 0), (-1, 0), 4),
+    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+]
+
+
+_ITEM_COMMANDS = [
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f5f5f5")),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.grey),
+    ("LINEABOVE", (0, -1), (-1, -1), 0.5, colors.grey),
+]
+
+
+def _item_row(item, currency: Optional[str], style) -> List:
+    # Line items are dicts on InvoiceRecord and LineItem models on Invoice
+    if not isinstance(item, dict):
+        item = item.dict()
+    return [
+        # A paragraph, so long descriptions wrap inside their column
+        Paragraph(escape(item["description"]), style),
+        f"{item['quantity']:g}",
+        _fmt_currency(item["unit_price"], currency),
+        _fmt_currency(item["line_total"], currency),
+    ]
+
+
+class InvoiceReportRenderer:
+    """
+    Renders invoice QC reports. Styles, table styles and column widths are
+    built once per renderer; each report only fills in the invoice fields.
+    Reuse one renderer when rendering many reports.
+    """
+
+    def __init__(self):
+        self.styles = getSampleStyleSheet()
+        self.styles.add(
+            ParagraphStyle(
+                name="BodySmall",
+                parent=self.styles["Normal"],
+                fontSize=9,
+                leading=11,
+            )
         )
-    )
-
-    story: List = []
-
-    # Title
-    story.append(Paragraph("Invoice QC Report", styles["Title"]))
-    story.append(Spacer(1, 6 * mm))
-
-    # Top row: invoice + status
-    invoice_id = invoice.get_invoice_id()
-    status_label = "-"
-    status_bg = colors.whitesmoke
-    if status is True:
-        status_label = "valid"
-        status_bg = colors.HexColor("#b6f2b5")  # green-ish
-    elif status is False:
-        status_label = "invalid"
-        status_bg = colors.HexColor("#ffb3b3")  # red-ish
-
-    header_data = [["Invoice ID", "Buyer", "Seller", "Invoice Date", "Gross Total", "Status"]]
-    header_data.append(
-        [
-            invoice_id,
-            invoice.buyer_name or "",
-            invoice.seller_name or "",
-            invoice.invoice_date.isoformat() if invoice.invoice_date else "",
-            _fmt_currency(invoice.gross_total, invoice.currency),
-            status_label,
-        ]
-    )
-
-    header_table = Table(
-        header_data,
-        colWidths=[30 * mm, 40 * mm, 40 * mm, 30 * mm, 30 * mm, 20 * mm],
-    )
-    header_table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f5f5f5")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                ("BACKGROUND", (-1, 1), (-1, 1), status_bg),
-            ]
+        self.styles.add(
+            ParagraphStyle(
+                name="TableCell",
+                parent=self.styles["Normal"],
+                fontSize=8,
+                leading=10,
+            )
         )
-    )
-
-    story.append(header_table)
-    story.append(Spacer(1, 10 * mm))
-
-    # Buyer / Seller
-    buyer_lines = []
-    if invoice.buyer_name:
-        buyer_lines.append(f"<b>{invoice.buyer_name}</b>")
-    buyer_para = Paragraph(
-        "<br/>".join(buyer_lines) or "<b>Buyer</b>", styles["BodySmall"]
-    )
-
-    seller_lines = []
-    if invoice.seller_name:
-        seller_lines.append(f"<b>{invoice.seller_name}</b>")
-    seller_para = Paragraph(
-        "<br/>".join(seller_lines) or "<b>Seller</b>", styles["BodySmall"]
-    )
-
-    parties_table = Table(
-        [[buyer_para, seller_para]],
-        colWidths=[90 * mm, 90 * mm],
-    )
-    parties_table.setStyle(
-        TableStyle(
+
+        self.header_styles = {
+            status: TableStyle(
+                _HEADER_COMMANDS + [("BACKGROUND", (-1, 1), (-1, 1), bg)]
+            )
+            for status, (_, bg) in STATUS_STYLES.items()
+        }
+        self.parties_style = TableStyle(
             [
                 ("BOX", (0, 0), (-1, -1), 0.5, colors.grey),
                 ("VALIGN", (0, 0), (-1, -1), "TOP"),
@@ -118,85 +138,212 @@ def build_invoice_story(invoice: Invoice, status: Optional[bool] = None) -> List
                 ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
             ]
         )
-    )
+        self.kv_style = TableStyle(_KV_COMMANDS)
+        self.two_col_style = TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP")])
+        self.items_style = TableStyle(_ITEM_COMMANDS)
 
-    story.append(parties_table)
-    story.append(Spacer(1, 6 * mm))
+    def build_story(self, invoice: AnyInvoice, status: Optional[bool] = None) -> List:
+        styles = self.styles
+        story: List = []
 
-    # Invoice info + totals
-    info_data = [
-        ["Invoice Information", ""],
-        ["Invoice Number", invoice.invoice_number or invoice_id],
-        ["Invoice Date", invoice.invoice_date.isoformat() if invoice.invoice_date else "-"],
-    ]
+        # Title
+        story.append(Paragraph("Invoice QC Report", styles["Title"]))
+        story.append(Spacer(1, 6 * mm))
 
-    totals_data = [
-        ["Currency / Totals", ""],
-        ["Currency", invoice.currency or "-"],
-        ["Net Total", _fmt_currency(invoice.net_total, invoice.currency)],
-        ["Tax Total", _fmt_currency(invoice.tax_amount, invoice.currency)],
-        ["Gross Total", _fmt_currency(invoice.gross_total, invoice.currency)],
-    ]
+        # Top row: invoice + status
+        invoice_id = invoice.get_invoice_id()
+        status_label, _ = STATUS_STYLES.get(status, STATUS_STYLES[None])
 
-    info_table = Table(info_data, colWidths=[40 * mm, 50 * mm])
-    info_table.setStyle(
-        TableStyle(
+        header_data = [
+            HEADER_COLUMNS,
             [
-                ("SPAN", (0, 0), (1, 0)),
-                ("FONTNAME", (0, 0), (1, 0), "Helvetica-Bold"),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 4),
-                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-            ]
+                invoice_id,
+                invoice.buyer_name or "",
+                invoice.seller_name or "",
+                invoice.invoice_date.isoformat() if invoice.invoice_date else "",
+                _fmt_currency(invoice.gross_total, invoice.currency),
+                status_label,
+            ],
+        ]
+
+        header_table = Table(header_data, colWidths=HEADER_COL_WIDTHS)
+        header_table.setStyle(
+            self.header_styles.get(status, self.header_styles[None])
+        )
+
+        story.append(header_table)
+        story.append(Spacer(1, 10 * mm))
+
+        # Buyer / Seller
+        buyer_lines = []
+        if invoice.buyer_name:
+            buyer_lines.append(f"<b>{invoice.buyer_name}</b>")
+        buyer_para = Paragraph(
+            "<br/>".join(buyer_lines) or "<b>Buyer</b>", styles["BodySmall"]
+        )
+
+        seller_lines = []
+        if invoice.seller_name:
+            seller_lines.append(f"<b>{invoice.seller_name}</b>")
+        seller_para = Paragraph(
+            "<br/>".join(seller_lines) or "<b>Seller</b>", styles["BodySmall"]
         )
-    )
 
-    totals_table = Table(totals_data, colWidths=[40 * mm, 50 * mm])
-    totals_table.setStyle(
-        TableStyle(
+        parties_table = Table([[buyer_para, seller_para]], colWidths=HALF_COL_WIDTHS)
+        parties_table.setStyle(self.parties_style)
+
+        story.append(parties_table)
+        story.append(Spacer(1, 6 * mm))
+
+        # Invoice info + totals
+        info_data = [
+            ["Invoice Information", ""],
+            ["Invoice Number", invoice.invoice_number or invoice_id],
             [
-                ("SPAN", (0, 0), (1, 0)),
-                ("FONTNAME", (0, 0), (1, 0), "Helvetica-Bold"),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 4),
-                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-            ]
+                "Invoice Date",
+                invoice.invoice_date.isoformat() if invoice.invoice_date else "-",
+            ],
+        ]
+
+        totals_data = [
+            ["Currency / Totals", ""],
+            ["Currency", invoice.currency or "-"],
+            ["Net Total", _fmt_currency(invoice.net_total, invoice.currency)],
+            ["Tax Total", _fmt_currency(invoice.tax_amount, invoice.currency)],
+            ["Gross Total", _fmt_currency(invoice.gross_total, invoice.currency)],
+        ]
+
+        info_table = Table(info_data, colWidths=KV_COL_WIDTHS)
+        info_table.setStyle(self.kv_style)
+
+        totals_table = Table(totals_data, colWidths=KV_COL_WIDTHS)
+        totals_table.setStyle(self.kv_style)
+
+        two_col = Table([[info_table, totals_table]], colWidths=HALF_COL_WIDTHS)
+        two_col.setStyle(self.two_col_style)
+
+        story.append(two_col)
+        story.append(Spacer(1, 6 * mm))
+
+        if invoice.line_items:
+            items_data = [ITEM_COLUMNS]
+            items_data.extend(
+                _item_row(item, invoice.currency, styles["TableCell"])
+                for item in invoice.line_items
+            )
+            items_total = sum(
+                item["line_total"] if isinstance(item, dict) else item.line_total
+                for item in invoice.line_items
+            )
+            items_data.append(
+                ["Sum of line totals", "", "", _fmt_currency(items_total, invoice.currency)]
+            )
+            # Long item lists continue on the next page under the header row
+            items_table = Table(items_data, colWidths=ITEM_COL_WIDTHS, repeatRows=1)
+            items_table.setStyle(self.items_style)
+            story.append(items_table)
+        else:
+            story.append(Paragraph("No line items found.", styles["BodySmall"]))
+
+        return story
+
+    def render(self, target, invoice: AnyInvoice, status: Optional[bool] = None) -> None:
+        """
+        Render one report into target (a filename or a writable binary file).
+        """
+        doc = SimpleDocTemplate(
+            target,
+            pagesize=A4,
+            leftMargin=PAGE_MARGIN,
+            rightMargin=PAGE_MARGIN,
+            topMargin=PAGE_MARGIN,
+            bottomMargin=PAGE_MARGIN,
         )
-    )
-
-    two_col = Table([[info_table, totals_table]], colWidths=[90 * mm, 90 * mm])
-    two_col.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP")]))
-
-    story.append(two_col)
-    story.append(Spacer(1, 6 * mm))
-
-    story.append(Paragraph("Line items not included in this version.", styles["BodySmall"]))
-
-    return story
-
-
-def create_invoice_pdf_file(invoice: Invoice, filename: str, status: Optional[bool] = None) -> None:
-    doc = SimpleDocTemplate(
-        filename,
-        pagesize=A4,
-        leftMargin=20 * mm,
-        rightMargin=20 * mm,
-        topMargin=20 * mm,
-        bottomMargin=20 * mm,
-    )
-    story = build_invoice_story(invoice, status=status)
-    doc.build(story)
-
-
-def create_invoice_pdf_bytes(invoice: Invoice, status: Optional[bool] = None) -> bytes:
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        leftMargin=20 * mm,
-        rightMargin=20 * mm,
-        topMargin=20 * mm,
-        bottomMargin=20 * mm,
-    )
-    story = build_invoice_story(invoice, status=status)
-    doc.build(story)
-    buffer.seek(0)
-    return buffer.read()
+        offset = target.tell() if hasattr(target, "tell") else 0
+        with timed("render"):
+            doc.build(self.build_story(invoice, status=status))
+
+        if hasattr(target, "tell"):
+            BYTES.inc(target.tell() - offset, "report")
+        else:
+            BYTES.inc(os.path.getsize(target), "report")
+
+    def render_bytes(self, invoice: AnyInvoice, status: Optional[bool] = None) -> bytes:
+        buffer = BytesIO()
+        self.render(buffer, invoice, status=status)
+        return buffer.getvalue()
+
+
+_default_renderer: Optional[InvoiceReportRenderer] = None
+
+
+def get_renderer() -> InvoiceReportRenderer:
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = InvoiceReportRenderer()
+    return _default_renderer
+
+
+def build_invoice_story(invoice: AnyInvoice, status: Optional[bool] = None) -> List:
+    return get_renderer().build_story(invoice, status=status)
+
+
+def create_invoice_pdf_file(invoice: AnyInvoice, filename: str, status: Optional[bool] = None) -> None:
+    get_renderer().render(filename, invoice, status=status)
+
+
+def create_invoice_pdf_bytes(invoice: AnyInvoice, status: Optional[bool] = None) -> bytes:
+    return get_renderer().render_bytes(invoice, status=status)
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only, unseekable sink that collects what ZipFile writes so it can
+    be handed out chunk by chunk. Being unseekable makes ZipFile write data
+    descriptors instead of seeking back to patch local headers.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_reports_zip(
+    reports: Iterable[Tuple[AnyInvoice, Optional[bool]]],
+    renderer: Optional[InvoiceReportRenderer] = None,
+) -> Iterator[bytes]:
+    """
+    Render (invoice, status) pairs into a ZIP archive, yielding each
+    compressed report as soon as it is built. Only one report is held in
+    memory at a time. Entry names come from report_filename, with a numeric
+    suffix when two invoices share an id.
+    """
+    renderer = renderer or get_renderer()
+    sink = _ChunkSink()
+    names = set()
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for invoice, status in reports:
+            name = report_filename(invoice)
+            stem, n = name[:-4], 1
+            while name in names:
+                n += 1
+                name = f"{stem}_{n}.pdf"
+            names.add(name)
+
+            zf.writestr(name, renderer.render_bytes(invoice, status=status))
+            yield sink.drain()
+
+    # Central directory
+    yield sink.drain()
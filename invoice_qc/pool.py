@@ -0,0 +1,112 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from .isolation import BudgetExceeded, ExtractionBudget, IsolatedExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when the executor backlog is at its configured cap."""
+
+
+class ExtractionPool:
+    """
+    Bounded executor for CPU-heavy work called from async endpoints.
+
+    - kind: "thread", "process" or "isolated" (processes with a
+      per-document time and memory budget, see isolation.py)
+    - workers: executor size
+    - max_queue: backlog (queued + running tasks) above which new
+      requests are refused with PoolSaturated
+    - per_request: how many tasks one request may have in flight, so a
+      large batch never takes every worker away from small requests
+    - budget: limits of the "isolated" kind
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        per_request: Optional[int] = None,
+        budget: Optional[ExtractionBudget] = None,
+    ):
+        if kind not in ("thread", "process", "isolated"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 2
+        self.max_queue = max_queue or self.workers * 8
+        self.per_request = per_request or max(1, self.workers // 2)
+        self.budget = budget or ExtractionBudget()
+        self.depth = 0
+        self._executor: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls, workers: Optional[int] = None) -> "ExtractionPool":
+        def _int(name: str) -> Optional[int]:
+            value = os.environ.get(name)
+            return int(value) if value else None
+
+        return cls(
+            kind=os.environ.get("INVOICE_QC_EXECUTOR", "thread"),
+            workers=workers or _int("INVOICE_QC_WORKERS"),
+            max_queue=_int("INVOICE_QC_MAX_QUEUE"),
+            per_request=_int("INVOICE_QC_PER_REQUEST"),
+            budget=ExtractionBudget.from_env(),
+        )
+
+    @property
+    def executor(self) -> Executor:
+        # Created lazily so importing the API in a worker process does
+        # not spawn another pool.
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            elif self.kind == "isolated":
+                self._executor = IsolatedExecutor(self.workers, self.budget)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="invoice-qc"
+                )
+        return self._executor
+
+    def check_capacity(self) -> None:
+        if self.depth >= self.max_queue:
+            raise PoolSaturated(
+                f"Extraction backlog is full ({self.depth}/{self.max_queue})"
+            )
+
+    async def run(self, fn: Callable, *args):
+        loop = asyncio.get_running_loop()
+        self.depth += 1
+        try:
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.depth -= 1
+
+    async def map(
+        self, fn: Callable, items, on_budget_exceeded: Optional[Callable] = None
+    ) -> list:
+        """
+        Run fn over items with at most per_request calls in flight,
+        returning results in input order. on_budget_exceeded(item, exc)
+        gives the result of an item whose isolated worker ran out of budget.
+        """
+        sem = asyncio.Semaphore(self.per_request)
+
+        async def _one(item):
+            async with sem:
+                try:
+                    return await self.run(fn, *item)
+                except BudgetExceeded as exc:
+                    if on_budget_exceeded is None:
+                        raise
+                    return on_budget_exceeded(item, exc)
+
+        return await asyncio.gather(*(_one(item) for item in items))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,125 @@
+"""
+Per-invoice cost breakdown for `invoice_qc.cli --profile`.
+
+Each PDF is extracted step by step with every step timed. The field
+extractors are timed one by one on the page text; the pipeline itself
+uses the single-pass extract_fields, timed as "fields", so the field:*
+entries show where that cost goes rather than adding to the total.
+"""
+
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .extractor import (
+    ExtractOptions,
+    extract_buyer,
+    extract_currency,
+    extract_invoice_date,
+    extract_invoice_from_text,
+    extract_invoice_number,
+    extract_line_items,
+    failure_record,
+    extract_seller,
+    extract_totals,
+    read_text,
+)
+from .schema import InvoiceRecord
+
+
+FIELD_EXTRACTORS = (
+    ("invoice_number", extract_invoice_number),
+    ("invoice_date", extract_invoice_date),
+    ("buyer", extract_buyer),
+    ("seller", extract_seller),
+    ("currency", extract_currency),
+    ("totals", extract_totals),
+)
+
+# Stages that make up an invoice's total; field:* entries are a breakdown
+# of "fields" and are left out
+PIPELINE_STAGES = ("open", "page_text", "fields", "line_items", "validate", "render")
+
+
+def profile_extract(path: str, options: ExtractOptions) -> Tuple[InvoiceRecord, Dict]:
+    """
+    Extract one PDF and return it with a profile record:
+    file, bytes, page and character counts, the text backend used, and
+    stage timings in ms.
+    """
+    name = Path(path).name
+    stages: Dict[str, float] = {}
+    record = {
+        "file": name,
+        "bytes": Path(path).stat().st_size,
+        "page_count": None,
+        "pages_parsed": None,
+        "chars": 0,
+        "backend": None,
+        "stages": stages,
+    }
+
+    try:
+        with open(path, "rb") as fh:
+            page_count, texts, backend = read_text(fh, options, stages)
+    except Exception as exc:
+        stages.setdefault("open", 0.0)
+        inv = failure_record(name, exc)
+        return inv, record
+
+    text = "\n".join(texts[i] for i in sorted(texts))
+
+    start = time.perf_counter()
+    inv = extract_invoice_from_text(text, name)
+    stages["fields"] = (time.perf_counter() - start) * 1e3
+    if options.line_items:
+        start = time.perf_counter()
+        inv.line_items = extract_line_items(text)
+        stages["line_items"] = (time.perf_counter() - start) * 1e3
+    inv.page_count = page_count
+    inv.pages_parsed = len(texts)
+
+    for field, fn in FIELD_EXTRACTORS:
+        start = time.perf_counter()
+        fn(text)
+        stages[f"field:{field}"] = (time.perf_counter() - start) * 1e3
+
+    record["page_count"] = page_count
+    record["pages_parsed"] = len(texts)
+    record["chars"] = len(text)
+    record["backend"] = backend
+    return inv, record
+
+
+def finish_record(record: Dict) -> Dict:
+    stages = record["stages"]
+    record["total_ms"] = sum(stages.get(s, 0.0) for s in PIPELINE_STAGES)
+    for key, value in stages.items():
+        stages[key] = round(value, 3)
+    record["total_ms"] = round(record["total_ms"], 3)
+    return record
+
+
+def stage_totals(records: List[Dict]) -> Dict[str, float]:
+    totals: Dict[str, float] = {}
+    for record in records:
+        for stage, ms in record["stages"].items():
+            totals[stage] = totals.get(stage, 0.0) + ms
+    return {stage: round(ms, 3) for stage, ms in sorted(totals.items())}
+
+
+def slowest_lines(records: List[Dict], top: int) -> List[str]:
+    """Table of the slowest invoices, with their dominant stage."""
+    ranked = sorted(records, key=lambda r: r["total_ms"], reverse=True)[:top]
+    lines = [
+        f"  {'file':<32}{'total ms':>10}{'pages':>7}{'chars':>9}  slowest stage"
+    ]
+    for r in ranked:
+        pipeline = {s: r["stages"].get(s, 0.0) for s in PIPELINE_STAGES}
+        stage = max(pipeline, key=pipeline.get)
+        pages = "-" if r["page_count"] is None else f"{r['pages_parsed']}/{r['page_count']}"
+        lines.append(
+            f"  {r['file'][:32]:<32}{r['total_ms']:>10.1f}{pages:>7}{r['chars']:>9}"
+            f"  {stage} ({pipeline[stage]:.1f} ms)"
+        )
+    return lines
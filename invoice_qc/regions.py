@@ -0,0 +1,163 @@
+"""
+Region-of-interest page text for ExtractOptions(regions=True).
+
+page.extract_text() turns every character pdfminer finds into a pdfplumber
+object dict before laying the text out, and that conversion, not pdfminer
+itself, is most of the cost of reading a page. This mode reads pdfminer's
+character stream directly and groups it into lines by position, the way
+pdfplumber does. It then keeps only the lines the field rules can use:
+lines holding an anchor keyword, plus the neighbours the buyer, seller and
+date rules look at. Only those characters are converted and laid out, with
+pdfplumber's own textmap. The result is the full page text without the
+lines no rule reads. Item tables, from their header or annex marker to
+the totals line, are kept whole when line items are extracted.
+"""
+
+import re
+from typing import Iterator, List, Set
+
+from .extractor import ITEM_TABLE_MARKERS, SELLER_SUFFIXES, TOTALS_KEYWORDS
+
+# Same as pdfplumber's default; lines are clustered by their top edge
+Y_TOLERANCE = 3
+
+# Lowered and without spaces: a line's raw character stream need not hold
+# the spaces its laid out text has
+LINE_ANCHORS = tuple(
+    sorted(
+        {kw.replace(" ", "") for kw in TOTALS_KEYWORDS}
+        | {"aufnr", "bestellung", "eur", "€"}
+    )
+)
+BUYER_ANCHOR = "deutschland"
+DATE_ANCHOR = "bestellung"
+SELLER_ANCHORS = tuple(s.lower() for s in SELLER_SUFFIXES)
+TABLE_ANCHORS = tuple(m.lower() for m in ITEM_TABLE_MARKERS)
+TABLE_END_ANCHORS = tuple(kw.replace(" ", "") for kw in TOTALS_KEYWORDS)
+
+# A superset of the extractor's POSTCODE_RE on raw, unspaced text
+POSTCODE_RUN_RE = re.compile(r"(?<!\d)\d{5}(?!\d)")
+# Lines SELLER_RE can run across
+ALPHA_LINE_RE = re.compile(r"[A-Za-z\s]*")
+
+
+def iter_chars(container, char_type, container_type) -> Iterator:
+    """Characters in stream order, including those inside figures."""
+    for obj in container:
+        if isinstance(obj, char_type):
+            yield obj
+        elif isinstance(obj, container_type):
+            yield from iter_chars(obj, char_type, container_type)
+
+
+def line_numbers(tops: List[float]) -> List[int]:
+    """
+    Line index of every character, lines numbered top to bottom. Tops
+    within Y_TOLERANCE of the previous one (in sorted order) share a line,
+    as in pdfplumber's cluster_objects.
+    """
+    order = sorted(range(len(tops)), key=tops.__getitem__)
+    lines = [0] * len(tops)
+    line = 0
+    last = tops[order[0]]
+    for i in order:
+        if tops[i] > last + Y_TOLERANCE:
+            line += 1
+        lines[i] = line
+        last = tops[i]
+    return lines
+
+
+def lines_to_keep(raw_lines: List[str], tables: bool = True) -> Set[int]:
+    """
+    Indices of the lines the field rules need, from each line's raw text:
+
+    - anchor lines (invoice number, totals, currency)
+    - "Deutschland" / postcode lines and the line before (the buyer)
+    - "Bestellung" lines and the line after (the date may wrap)
+    - legal-form suffix lines, the letters-only lines above them that
+      SELLER_RE can run across, and the line that stops it
+    - with tables, item table lines: from a marker line to the next
+      totals line
+    """
+    keep: Set[int] = set()
+    in_table = False
+    for idx, raw in enumerate(raw_lines):
+        lower = raw.lower().replace(" ", "")
+        if tables:
+            if any(a in lower for a in TABLE_ANCHORS):
+                in_table = True
+            elif in_table and any(a in lower for a in TABLE_END_ANCHORS):
+                in_table = False
+            if in_table:
+                keep.add(idx)
+        if any(a in lower for a in LINE_ANCHORS):
+            keep.add(idx)
+        if BUYER_ANCHOR in lower or POSTCODE_RUN_RE.search(raw):
+            keep.update((idx - 1, idx))
+        if DATE_ANCHOR in lower:
+            keep.update((idx, idx + 1))
+        if any(a in lower for a in SELLER_ANCHORS):
+            keep.add(idx)
+            above = idx - 1
+            while above >= 0 and ALPHA_LINE_RE.fullmatch(raw_lines[above]):
+                keep.add(above)
+                above -= 1
+            keep.add(above)
+    keep.discard(-1)
+    keep.discard(len(raw_lines))
+    return keep
+
+
+def region_text(page, tables: bool = True) -> str:
+    """
+    Text of the lines of a pdfplumber page that the field rules (and with
+    tables, the line-item rules) need, laid out exactly as
+    page.extract_text() lays them out.
+    """
+    from pdfminer.layout import LTChar, LTContainer
+    from pdfplumber.utils import chars_to_textmap
+
+    chars = list(iter_chars(page.layout, LTChar, LTContainer))
+    if not chars:
+        return ""
+
+    # pdfplumber's coordinates: top-down, relative to the MediaBox
+    mb_x0, mb_top = page.mediabox[:2]
+    offset = page.height + mb_top
+    tops = [offset - c.y1 for c in chars]
+    lines = line_numbers(tops)
+
+    raw: List[List[str]] = [[] for _ in range(max(lines) + 1)]
+    for c, line in zip(chars, lines):
+        raw[line].append(c.get_text())
+    keep = lines_to_keep(["".join(parts) for parts in raw], tables)
+
+    doctop = page.initial_doctop
+    selected = [
+        {
+            "text": c.get_text(),
+            "x0": c.x0 + mb_x0,
+            "x1": c.x1 + mb_x0,
+            "top": top,
+            "bottom": offset - c.y0,
+            "doctop": doctop + top,
+            "upright": c.upright,
+            "width": c.width,
+            "height": c.height,
+            "size": c.size,
+            "fontname": c.fontname,
+        }
+        for c, top, line in zip(chars, tops, lines)
+        if line in keep
+    ]
+    if not selected:
+        return ""
+
+    textmap = chars_to_textmap(
+        selected,
+        layout_bbox=page.bbox,
+        layout_width=page.width,
+        layout_height=page.height,
+    )
+    return textmap.as_string
@@ -0,0 +1,221 @@
+"""
+Append-only store of API validation reports.
+
+Every /extract-and-validate-pdfs call appends one report under a fresh id.
+Rows are never updated, so concurrent requests cannot overwrite each
+other. The request only queues the report. A writer thread serialises
+and commits queued reports in batches, so disk I/O stays off the
+response path. Until a report is committed it is served from memory.
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from .metrics import timed
+
+logger = logging.getLogger("invoice_qc.report_store")
+
+DEFAULT_REPORT_DB = ".invoice_qc_reports.sqlite"
+
+# Reports committed per transaction, at most
+WRITE_BATCH = 256
+# Seconds to wait before retrying a failed write
+RETRY_DELAY = 1.0
+
+_STOP = object()
+
+
+class ReportStore:
+    """
+    SQLite table of reports keyed by report id, with the counts needed to
+    list them without parsing the payloads.
+    """
+
+    def __init__(self, path: str = DEFAULT_REPORT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " id TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " total INTEGER NOT NULL,"
+            " valid INTEGER NOT NULL,"
+            " invalid INTEGER NOT NULL,"
+            " files TEXT NOT NULL,"
+            " payload TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS reports_created ON reports (created_at);"
+        )
+        self._conn.commit()
+
+        # report id -> (created_at, payload) until committed
+        self._pending: Dict[str, tuple] = {}
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="invoice-qc-report-writer", daemon=True
+        )
+        self._writer.start()
+
+    # -------------------- Writing --------------------
+
+    def append(self, payload: Dict) -> str:
+        """
+        Queue a report ({"extracted": [...], "validation": {...}}) and
+        return its id. The payload must not be modified afterwards.
+        """
+        report_id = uuid.uuid4().hex
+        created_at = time.time()
+        with self._lock:
+            self._pending[report_id] = (created_at, payload)
+        self._queue.put(report_id)
+        return report_id
+
+    def _row(self, report_id: str, created_at: float, payload: Dict) -> tuple:
+        summary = payload["validation"]["summary"]
+        files = [inv.get("source_pdf") for inv in payload["extracted"]]
+        return (
+            report_id,
+            created_at,
+            summary["total_invoices"],
+            summary["valid_invoices"],
+            summary["invalid_invoices"],
+            json.dumps(files),
+            json.dumps(payload, default=str),
+        )
+
+    def _write_loop(self) -> None:
+        stop = False
+        while not stop:
+            ids = [self._queue.get()]
+            while len(ids) < WRITE_BATCH:
+                try:
+                    ids.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in ids:
+                stop = True
+                ids = [i for i in ids if i is not _STOP]
+            if ids:
+                self._write(ids, final=stop)
+            for _ in range(len(ids) + stop):
+                self._queue.task_done()
+
+    def _write(self, ids: List[str], final: bool) -> None:
+        with self._lock:
+            items = [(i, *self._pending[i]) for i in ids]
+        rows = [self._row(*item) for item in items]
+
+        while True:
+            try:
+                with timed("reports_write"), self._lock, self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO reports"
+                        " (id, created_at, total, valid, invalid, files, payload)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    for report_id in ids:
+                        del self._pending[report_id]
+                return
+            except sqlite3.Error:
+                if final:
+                    logger.exception("Dropping %d unwritten reports", len(ids))
+                    return
+                # Reports stay readable from memory while the write is retried
+                logger.exception("Writing %d reports failed, retrying", len(ids))
+                time.sleep(RETRY_DELAY)
+
+    def flush(self) -> None:
+        """Block until every queued report is committed."""
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._conn.close()
+
+    # -------------------- Reading --------------------
+
+    def get(self, report_id: str) -> Optional[Dict]:
+        with self._lock:
+            pending = self._pending.get(report_id)
+            if pending is None:
+                row = self._conn.execute(
+                    "SELECT created_at, payload FROM reports WHERE id = ?",
+                    (report_id,),
+                ).fetchone()
+        if pending is not None:
+            created_at, payload = pending
+        elif row is not None:
+            created_at, payload = row["created_at"], json.loads(row["payload"])
+        else:
+            return None
+        return {"report_id": report_id, "created_at": created_at, **payload}
+
+    def list(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        since: Optional[float] = None,
+        invalid_only: bool = False,
+    ) -> List[Dict]:
+        """Report summaries, newest first, including reports still queued."""
+        where, params = [], []
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if invalid_only:
+            where.append("invalid > 0")
+        sql = "SELECT id, created_at, total, valid, invalid, files FROM reports"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id LIMIT ?"
+
+        with self._lock:
+            pending = list(self._pending.items())
+            rows = self._conn.execute(sql, (*params, offset + limit)).fetchall()
+
+        entries = [
+            _entry(row["id"], row["created_at"], row["total"], row["valid"],
+                   row["invalid"], json.loads(row["files"]))
+            for row in rows
+        ]
+        for report_id, (created_at, payload) in pending:
+            summary = payload["validation"]["summary"]
+            if since is not None and created_at < since:
+                continue
+            if invalid_only and not summary["invalid_invoices"]:
+                continue
+            entries.append(
+                _entry(
+                    report_id,
+                    created_at,
+                    summary["total_invoices"],
+                    summary["valid_invoices"],
+                    summary["invalid_invoices"],
+                    [inv.get("source_pdf") for inv in payload["extracted"]],
+                )
+            )
+
+        entries.sort(key=lambda e: (-e["created_at"], e["report_id"]))
+        return entries[offset : offset + limit]
+
+
+def _entry(report_id, created_at, total, valid, invalid, files) -> Dict:
+    return {
+        "report_id": report_id,
+        "created_at": created_at,
+        "total_invoices": total,
+        "valid_invoices": valid,
+        "invalid_invoices": invalid,
+        "files": files,
+    }
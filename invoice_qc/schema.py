@@ -1,8 +1,14 @@
+import json
 from datetime import date
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import BaseModel, Field
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class LineItem(BaseModel):
     description: str = Field(..., description="Item description")
@@ -54,11 +60,170 @@ class Invoice(BaseModel):
         default=None, description="Gross total"
     )
 
-    # Line items (optional for now)
+    # Line items, from the item tables (see extractor.extract_line_items)
     line_items: List[LineItem] = Field(default_factory=list)
 
+    # Extraction diagnostics
+    extraction_error: Optional[str] = Field(
+        default=None, description="Error raised while reading the source PDF"
+    )
+    page_count: Optional[int] = Field(
+        default=None, description="Number of pages in the source PDF"
+    )
+    pages_parsed: Optional[int] = Field(
+        default=None, description="Number of pages whose text was extracted"
+    )
+
     def get_invoice_id(self) -> str:
         """
         Unified identifier used for filenames, tables, etc.
         """
         return self.invoice_number or self.source_pdf or "UNKNOWN_INVOICE"
+
+
+# -------------------- Internal record --------------------
+
+INVOICE_FIELDS = (
+    "source_pdf",
+    "invoice_number",
+    "seller_name",
+    "buyer_name",
+    "invoice_date",
+    "currency",
+    "net_total",
+    "tax_amount",
+    "gross_total",
+    "line_items",
+    "extraction_error",
+    "page_count",
+    "pages_parsed",
+)
+_AMOUNT_FIELDS = ("net_total", "tax_amount", "gross_total")
+
+
+class InvoiceRecord:
+    """
+    Slotted stand-in for Invoice on the internal extract -> validate ->
+    report path. It has the same fields and the part of the model API the
+    pipeline uses (get_invoice_id, dict, json, copy, parse_raw), but runs
+    no validation: values must already have the model's types, and line
+    items are plain dicts.
+
+    Use from_model / to_model where data crosses the API boundary.
+    """
+
+    __slots__ = INVOICE_FIELDS
+
+    def __init__(
+        self,
+        source_pdf: Optional[str] = None,
+        invoice_number: Optional[str] = None,
+        seller_name: Optional[str] = None,
+        buyer_name: Optional[str] = None,
+        invoice_date: Optional[date] = None,
+        currency: Optional[str] = None,
+        net_total: Optional[float] = None,
+        tax_amount: Optional[float] = None,
+        gross_total: Optional[float] = None,
+        line_items: Optional[List[Dict[str, Any]]] = None,
+        extraction_error: Optional[str] = None,
+        page_count: Optional[int] = None,
+        pages_parsed: Optional[int] = None,
+    ):
+        self.source_pdf = source_pdf
+        self.invoice_number = invoice_number
+        self.seller_name = seller_name
+        self.buyer_name = buyer_name
+        self.invoice_date = invoice_date
+        self.currency = currency
+        self.net_total = net_total
+        self.tax_amount = tax_amount
+        self.gross_total = gross_total
+        self.line_items = line_items if line_items is not None else []
+        self.extraction_error = extraction_error
+        self.page_count = page_count
+        self.pages_parsed = pages_parsed
+
+    def get_invoice_id(self) -> str:
+        return self.invoice_number or self.source_pdf or "UNKNOWN_INVOICE"
+
+    # -------------------- Model API --------------------
+
+    def dict(self) -> Dict[str, Any]:
+        """Same structure as Invoice.dict()."""
+        d = {name: getattr(self, name) for name in INVOICE_FIELDS}
+        d["line_items"] = [dict(item) for item in self.line_items]
+        return d
+
+    def json(self) -> str:
+        d = {name: getattr(self, name) for name in INVOICE_FIELDS}
+        if orjson is not None:
+            return orjson.dumps(d).decode("utf-8")
+        if self.invoice_date is not None:
+            d["invoice_date"] = self.invoice_date.isoformat()
+        return json.dumps(d)
+
+    def copy(self, update: Optional[Dict[str, Any]] = None) -> "InvoiceRecord":
+        fields = {name: getattr(self, name) for name in INVOICE_FIELDS}
+        fields["line_items"] = list(self.line_items)
+        if update:
+            fields.update(update)
+        return InvoiceRecord(**fields)
+
+    @classmethod
+    def parse_obj(cls, obj: Dict[str, Any]) -> "InvoiceRecord":
+        """
+        Record from trusted JSON data (cache, job store, manifest): dates
+        come back from ISO strings and amounts as floats; unknown keys are
+        ignored. Raises ValueError on values of the wrong type.
+        """
+        fields = {name: obj[name] for name in INVOICE_FIELDS if name in obj}
+        try:
+            day = fields.get("invoice_date")
+            if isinstance(day, str):
+                fields["invoice_date"] = date.fromisoformat(day)
+            for name in _AMOUNT_FIELDS:
+                if fields.get(name) is not None:
+                    fields[name] = float(fields[name])
+            if fields.get("line_items") is not None:
+                fields["line_items"] = [dict(item) for item in fields["line_items"]]
+        except TypeError as exc:
+            raise ValueError(str(exc)) from exc
+        return cls(**fields)
+
+    @classmethod
+    def parse_raw(cls, raw: Union[str, bytes]) -> "InvoiceRecord":
+        obj = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        if not isinstance(obj, dict):
+            raise ValueError("expected a JSON object")
+        return cls.parse_obj(obj)
+
+    # -------------------- Conversion --------------------
+
+    @classmethod
+    def from_model(cls, inv: Invoice) -> "InvoiceRecord":
+        fields = {name: getattr(inv, name) for name in INVOICE_FIELDS}
+        fields["line_items"] = [item.dict() for item in inv.line_items]
+        return cls(**fields)
+
+    def to_model(self) -> Invoice:
+        """
+        Validated Invoice. pydantic 2 reads the fields straight off the
+        record, which is faster than construct() skipping validation.
+        """
+        if hasattr(Invoice, "model_validate"):
+            return Invoice.model_validate(self, from_attributes=True)
+        return Invoice(**self.dict())
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, InvoiceRecord):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in INVOICE_FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in INVOICE_FIELDS)
+        return f"InvoiceRecord({fields})"
+
+
+# Either form is accepted by the validator and the report renderer
+AnyInvoice = Union[Invoice, InvoiceRecord]
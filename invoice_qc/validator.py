@@ -1,15 +1,80 @@
+import re
+import time
+from bisect import bisect_left, insort
 from collections import Counter
-from typing import List, Dict
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-from .schema import Invoice
+from .dup_index import DuplicateIndex
+from .metrics import INVOICES, RULE_ERRORS, STAGE_SECONDS, rule_name
+from .schema import AnyInvoice
 
 
 ALLOWED_CURRENCIES = {"INR", "USD", "EUR", "GBP"}
 
+# Near-duplicate detection: same seller and gross total, invoice dates at
+# most this many days apart, invoice numbers at most this many edits apart.
+NEAR_DUP_DATE_WINDOW = 3
+NEAR_DUP_MAX_EDITS = 1
 
-def validate_invoice(inv: Invoice) -> List[str]:
+# Line items: line totals must add up to the net total, and each line
+# total must be its quantity times its unit price, within this tolerance
+LINE_ITEMS_TOLERANCE = 0.02
+
+_NUMBER_NOISE_RE = re.compile(r"[^0-9A-Z]")
+
+
+def line_item_checks(
+    line_items: Sequence,
+    page_count: Optional[int] = None,
+    pages_parsed: Optional[int] = None,
+) -> Tuple[Optional[float], bool]:
+    """
+    (sum of the line totals, whether any line total is off) for the
+    line-item rules. Items are LineItem models or dicts. The sum is None
+    without items, or when only some pages were read, since the items on
+    the other pages are missing from it.
+    """
+    total = 0.0
+    off = False
+    for item in line_items:
+        if isinstance(item, Mapping):
+            quantity, price, line_total = (
+                item["quantity"], item["unit_price"], item["line_total"]
+            )
+        else:
+            quantity, price, line_total = (
+                item.quantity, item.unit_price, item.line_total
+            )
+        total += line_total
+        expected = round(quantity * price, 2)
+        if abs(expected - round(line_total, 2)) > LINE_ITEMS_TOLERANCE:
+            off = True
+
+    partial = (
+        page_count is not None and pages_parsed is not None and pages_parsed < page_count
+    )
+    if not line_items or partial:
+        return None, off
+    return round(total, 2), off
+
+
+def validate_invoice(inv: AnyInvoice) -> List[str]:
     errors: List[str] = []
 
+    # Extraction
+    if inv.extraction_error:
+        errors.append("extraction:failed")
+
     # Completeness
     if not inv.invoice_number:
         errors.append("missing:invoice_number")
@@ -39,6 +104,19 @@ def validate_invoice(inv: Invoice) -> List[str]:
         if abs(expected - provided) > 0.02:
             errors.append("rule:totals_mismatch")
 
+    # Business rules: line items agree with themselves and the net total
+    items_total, item_off = line_item_checks(
+        inv.line_items, inv.page_count, inv.pages_parsed
+    )
+    if item_off:
+        errors.append("rule:line_item_mismatch")
+    if (
+        items_total is not None
+        and inv.net_total is not None
+        and abs(items_total - round(inv.net_total, 2)) > LINE_ITEMS_TOLERANCE
+    ):
+        errors.append("rule:line_items_sum_mismatch")
+
     # Anomaly: date range sanity
     if inv.invoice_date:
         if inv.invoice_date.year < 2000 or inv.invoice_date.year > 2100:
@@ -47,49 +125,228 @@ def validate_invoice(inv: Invoice) -> List[str]:
     return errors
 
 
-def validate_invoices(invoices: List[Invoice]) -> Dict:
-    results = []
-    error_counter = Counter()
-    seen_keys = set()
+# -------------------- Near duplicates --------------------
 
-    for inv in invoices:
-        invoice_id = inv.get_invoice_id()
+def normalize_invoice_number(value: str) -> str:
+    return _NUMBER_NOISE_RE.sub("", value.upper())
+
+
+def near_dup_block(
+    seller_name: Optional[str], gross_total: Optional[float]
+) -> Optional[Tuple[str, int]]:
+    """
+    Blocking key for near-duplicate candidates: normalised seller name
+    and gross total in cents. None when either is missing.
+    """
+    name = (seller_name or "").strip().casefold()
+    if not name or gross_total is None:
+        return None
+    return name, round(gross_total * 100)
+
+
+def within_edits(a: str, b: str, max_edits: int) -> bool:
+    """
+    True if the Levenshtein distance between a and b is <= max_edits,
+    computed on a band of width max_edits around the diagonal.
+    """
+    if abs(len(a) - len(b)) > max_edits:
+        return False
+    if a == b:
+        return True
+
+    inf = max_edits + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        lo = max(1, i - max_edits)
+        hi = min(len(b), i + max_edits)
+        cur = [inf] * (len(b) + 1)
+        cur[0] = i if i <= max_edits else inf
+        for j in range(lo, hi + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+        if min(cur[lo - 1 : hi + 1]) > max_edits:
+            return False
+        prev = cur
+    return prev[len(b)] <= max_edits
+
+
+def is_near_duplicate(
+    number_a: str, ordinal_a: int, number_b: str, ordinal_b: int, max_edits: int
+) -> bool:
+    """
+    Pair rule for two invoices in the same block and date window: the
+    numbers are within max_edits of each other, and the pair is not an
+    exact (number, date) duplicate, which duplicate:invoice already covers.
+    """
+    if number_a == number_b and ordinal_a == ordinal_b:
+        return False
+    return within_edits(
+        normalize_invoice_number(number_a),
+        normalize_invoice_number(number_b),
+        max_edits,
+    )
+
+
+class NearDuplicateIndex:
+    """
+    Blocking index for near duplicates. Invoices are grouped by
+    near_dup_block, and each block keeps its entries sorted by date so
+    only invoices inside the date window are compared.
+    """
+
+    def __init__(
+        self,
+        date_window: int = NEAR_DUP_DATE_WINDOW,
+        max_edits: int = NEAR_DUP_MAX_EDITS,
+    ):
+        self.date_window = date_window
+        self.max_edits = max_edits
+        self.blocks: Dict[Tuple[str, int], list] = {}
+
+    def check_and_add(self, inv: AnyInvoice) -> bool:
+        """
+        Record the invoice and return True if it looks like a resubmission
+        of one recorded earlier.
+        """
+        block = near_dup_block(inv.seller_name, inv.gross_total)
+        if block is None or not inv.invoice_number or not inv.invoice_date:
+            return False
+
+        ordinal = inv.invoice_date.toordinal()
+        number = inv.invoice_number
+        entries = self.blocks.setdefault(block, [])
+
+        suspected = False
+        start = bisect_left(entries, (ordinal - self.date_window,))
+        for other_ordinal, other_number in entries[start:]:
+            if other_ordinal > ordinal + self.date_window:
+                break
+            if is_near_duplicate(
+                number, ordinal, other_number, other_ordinal, self.max_edits
+            ):
+                suspected = True
+                break
 
+        insort(entries, (ordinal, number))
+        return suspected
+
+
+# -------------------- Validation --------------------
+
+class InvoiceValidator:
+    """
+    Incremental form of validate_invoices: feed invoices one at a time
+    and read the summary at the end. The results are not kept, but every
+    duplicate key and near-duplicate entry is, so memory grows with the
+    number of distinct invoices seen.
+
+    With a DuplicateIndex, invoices that have a number are also checked
+    against every earlier run. validate's source names where the invoice
+    came from for the index: a key recorded earlier for the same source
+    is not a duplicate (see DuplicateIndex). Within the batch a repeated
+    key is always a duplicate.
+    """
+
+    def __init__(self, dup_index: Optional[DuplicateIndex] = None):
+        self.error_counter = Counter()
+        self.seen_keys = set()
+        self.dup_index = dup_index
+        self.near_dups = NearDuplicateIndex()
+        self.total = 0
+        self.valid = 0
+
+    def _is_duplicate(self, inv: AnyInvoice, source: Optional[str]) -> bool:
         # Duplicate detection (simple: number + date)
         dup_key = (inv.invoice_number, inv.invoice_date)
-        duplicate = False
-        if dup_key in seen_keys:
-            duplicate = True
-        else:
-            seen_keys.add(dup_key)
+        duplicate = dup_key in self.seen_keys
+        self.seen_keys.add(dup_key)
+
+        if self.dup_index is not None and inv.invoice_number:
+            # Always recorded, also when the batch already flagged it
+            if self.dup_index.check_and_add(
+                inv.invoice_number, inv.invoice_date, source
+            ):
+                duplicate = True
+        return duplicate
+
+    def seed(self, inv: AnyInvoice) -> None:
+        """
+        Record an invoice validated in an earlier run, so later invoices
+        are checked against it, without counting it in the summary.
+        """
+        self.seen_keys.add((inv.invoice_number, inv.invoice_date))
+        self.near_dups.check_and_add(inv)
+
+    def validate(self, inv: AnyInvoice, source: Optional[str] = None) -> Dict:
+        start = time.perf_counter()
+        invoice_id = inv.get_invoice_id()
+
+        duplicate = self._is_duplicate(inv, source)
+        suspected = self.near_dups.check_and_add(inv)
 
         errors = validate_invoice(inv)
         if duplicate:
             errors.append("duplicate:invoice")
+        if suspected:
+            errors.append("duplicate:suspected")
 
         for e in errors:
-            error_counter[e] += 1
-
-        results.append(
-            {
-                "invoice_id": invoice_id,
-                "is_valid": not errors,
-                "errors": errors,
-            }
-        )
+            self.error_counter[e] += 1
+            RULE_ERRORS.inc(1, rule_name(e))
 
-    total = len(invoices)
-    valid = sum(1 for r in results if r["is_valid"])
+        self.total += 1
+        if not errors:
+            self.valid += 1
 
-    summary = {
-        "total_invoices": total,
-        "valid_invoices": valid,
-        "invalid_invoices": total - valid,
-        "error_counts": dict(error_counter),
-    }
+        INVOICES.inc(1, "invalid" if errors else "valid")
+        STAGE_SECONDS.observe(time.perf_counter() - start, "validate")
+
+        return {
+            "invoice_id": invoice_id,
+            "is_valid": not errors,
+            "errors": errors,
+        }
+
+    def summary(self) -> Dict:
+        if self.dup_index is not None:
+            self.dup_index.commit()
+        return {
+            "total_invoices": self.total,
+            "valid_invoices": self.valid,
+            "invalid_invoices": self.total - self.valid,
+            "error_counts": dict(self.error_counter),
+        }
+
+
+def iter_validate(
+    invoices: Iterable[AnyInvoice],
+    validator: InvoiceValidator,
+    source_of: Optional[Callable[[AnyInvoice], Optional[str]]] = None,
+) -> Iterator[Tuple[AnyInvoice, Dict]]:
+    for inv in invoices:
+        source = source_of(inv) if source_of is not None else None
+        yield inv, validator.validate(inv, source)
+
+
+def validate_invoices(
+    invoices: List[AnyInvoice],
+    dup_index: Optional[DuplicateIndex] = None,
+    sources: Optional[Sequence[Optional[str]]] = None,
+) -> Dict:
+    """
+    sources: the duplicate index source of each invoice (see
+    InvoiceValidator); None for all means no invoice is exempt.
+    """
+    if sources is None:
+        sources = [None] * len(invoices)
+    elif len(sources) != len(invoices):
+        raise ValueError(
+            f"Got {len(sources)} sources for {len(invoices)} invoices"
+        )
+    validator = InvoiceValidator(dup_index=dup_index)
+    results = [validator.validate(inv, src) for inv, src in zip(invoices, sources)]
 
     return {
         "results": results,
-        "summary": summary,
+        "summary": validator.summary(),
     }
-
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# invoice_qc.api opens its stores on import; keep them out of the checkout
+_STATE_DIR = tempfile.mkdtemp(prefix="invoice_qc_tests_")
+os.environ.setdefault("INVOICE_QC_CACHE_DIR", "")
+os.environ.setdefault("INVOICE_QC_REPORT_DB", "")
+os.environ.setdefault("INVOICE_QC_DUP_INDEX", os.path.join(_STATE_DIR, "dups.sqlite"))
+os.environ.setdefault("INVOICE_QC_JOB_DIR", os.path.join(_STATE_DIR, "jobs"))
+
+SAMPLE_PDFS = sorted((ROOT / "pdfs").glob("*.pdf"))
+
+
+@pytest.fixture
+def sample_pdf() -> Path:
+    return SAMPLE_PDFS[0]
@@ -0,0 +1,99 @@
+import asyncio
+import io
+import json
+import zipfile
+from datetime import date
+
+from fastapi.testclient import TestClient
+
+from invoice_qc import api
+from invoice_qc.schema import Invoice
+
+
+def _invoice(number="INV-1") -> dict:
+    invoice = Invoice(
+        source_pdf=f"{number}.pdf",
+        invoice_number=number,
+        invoice_date=date(2024, 3, 1),
+        seller_name="Muster GmbH",
+        buyer_name="Kunde AG",
+        currency="EUR",
+        net_total=100.0,
+        tax_amount=19.0,
+        gross_total=119.0,
+    )
+    return json.loads(invoice.json())
+
+
+def test_upload_validation_runs_off_the_event_loop(sample_pdf, monkeypatch):
+    calls = []
+    validate = api.validate_invoices
+
+    def recording_validate(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append("thread")
+        return validate(*args, **kwargs)
+
+    monkeypatch.setattr(api, "validate_invoices", recording_validate)
+    monkeypatch.setattr(api, "dup_index", None)
+    response = TestClient(api.app).post(
+        "/extract-and-validate-pdfs",
+        files=[("files", ("a.pdf", sample_pdf.read_bytes(), "application/pdf"))],
+    )
+    assert response.status_code == 200
+    assert calls == ["thread"]
+
+
+def _caller():
+    try:
+        asyncio.get_running_loop()
+        return "event loop"
+    except RuntimeError:
+        return "thread"
+
+
+def test_job_stream_reads_the_store_off_the_event_loop(monkeypatch):
+    calls = []
+
+    class Store:
+        def get(self, job_id):
+            calls.append(_caller())
+            return {"status": api.FINISHED[0], "summary": {}, "error": None}
+
+        def results(self, job_id, offset=0, limit=None):
+            calls.append(_caller())
+            return [{"seq": 0, "extracted": {}, "validation": {}}]
+
+    monkeypatch.setattr(api, "job_store", Store())
+    response = TestClient(api.app).get("/jobs/x/results?stream=true")
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
+    assert calls and set(calls) == {"thread"}
+
+
+def test_report_pdf_returns_a_pdf():
+    response = TestClient(api.app).post(
+        "/report-pdf?is_valid=true", json=_invoice("INV/7")
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert 'filename="INV_7.pdf"' in response.headers["content-disposition"]
+    assert response.content.startswith(b"%PDF")
+
+
+def test_report_pdfs_zip_has_one_entry_per_invoice_in_order():
+    numbers = ["C-3", "A-1", "B-2", "A-1"]
+    body = [
+        {"invoice": _invoice(n), "is_valid": i % 2 == 0}
+        for i, n in enumerate(numbers)
+    ]
+    response = TestClient(api.app).post("/report-pdfs", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["C-3.pdf", "A-1.pdf", "B-2.pdf", "A-1_2.pdf"]
+        assert all(zf.read(name).startswith(b"%PDF") for name in zf.namelist())
@@ -0,0 +1,81 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_batch_validator import make_invoices
+from invoice_qc import batch_validator
+from invoice_qc.batch_validator import (
+    ColumnarResults,
+    invoices_to_columns,
+    validate_columns,
+)
+from invoice_qc.schema import Invoice
+from invoice_qc.validator import validate_invoices
+
+
+@pytest.fixture(scope="module")
+def invoices():
+    return make_invoices(3000, seed=1)
+
+
+def test_columnar_matches_per_object(invoices):
+    expected = validate_invoices(invoices)
+    columns = invoices_to_columns(invoices)
+
+    assert validate_columns(columns) == expected
+
+    lazy = validate_columns(columns, lazy=True)
+    assert isinstance(lazy["results"], ColumnarResults)
+    assert lazy["summary"] == expected["summary"]
+    assert lazy["results"].to_list() == expected["results"]
+    assert list(lazy["results"]) == expected["results"]
+    assert lazy["results"][-1] == expected["results"][-1]
+    assert lazy["results"].is_valid.tolist() == [
+        r["is_valid"] for r in expected["results"]
+    ]
+
+
+def test_hash_collisions_fall_back_to_exact_grouping(invoices, monkeypatch):
+    expected = validate_invoices(invoices)
+    # Every string hashes alike, so every group has to be split exactly
+    monkeypatch.setattr(
+        batch_validator,
+        "_hash_strings",
+        lambda values: np.zeros(len(values), np.uint64),
+    )
+    assert validate_columns(invoices_to_columns(invoices)) == expected
+
+
+def test_empty_batch():
+    result = validate_columns(invoices_to_columns([]), lazy=True)
+    assert len(result["results"]) == 0
+    assert result["summary"]["total_invoices"] == 0
+
+
+def test_blank_sellers_are_not_near_duplicates():
+    # Same amount, dates a day apart: only the blank seller keeps them apart
+    invoices = [
+        Invoice(
+            source_pdf=f"{number}.pdf",
+            invoice_number=number,
+            invoice_date=date(2024, 3, day),
+            seller_name=seller,
+            buyer_name="Kunde AG",
+            currency="EUR",
+            net_total=100.0,
+            tax_amount=19.0,
+            gross_total=119.0,
+        )
+        for number, day, seller in [
+            ("A1", 1, "   "),
+            ("A2", 2, " \t"),
+            ("B1", 1, ""),
+            ("B2", 2, None),
+        ]
+    ]
+    expected = validate_invoices(invoices)
+    assert validate_columns(invoices_to_columns(invoices)) == expected
+    assert not any(
+        "suspected" in e for r in expected["results"] for e in r["errors"]
+    )
@@ -0,0 +1,25 @@
+from invoice_qc.cli import main as cli_main
+
+
+def _run(tmp_path, sample_pdf, *extra):
+    pdf_dir = tmp_path / "in"
+    pdf_dir.mkdir(exist_ok=True)
+    (pdf_dir / "a.pdf").write_bytes(sample_pdf.read_bytes())
+    return cli_main(
+        [
+            "--pdf-dir", str(pdf_dir),
+            "--json-out", str(tmp_path / "out.json"),
+            "--pdf-out-dir", str(tmp_path / "reports"),
+            "--cache-dir", str(tmp_path / "cache"),
+            "--no-dup-index",
+            *extra,
+        ]
+    )
+
+
+def test_clear_cache_applies_with_no_cache(tmp_path, sample_pdf):
+    _run(tmp_path, sample_pdf)
+    assert list((tmp_path / "cache").glob("*/*.json"))
+
+    _run(tmp_path, sample_pdf, "--no-cache", "--clear-cache")
+    assert not (tmp_path / "cache").exists()
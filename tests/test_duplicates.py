@@ -0,0 +1,211 @@
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+
+import pytest
+
+from invoice_qc.cli import main as cli_main
+from invoice_qc.dup_index import DuplicateIndex
+from invoice_qc.jobs import FINISHED
+from invoice_qc.schema import Invoice
+from invoice_qc.validator import InvoiceValidator, validate_invoices
+
+DUPLICATE = "duplicate:invoice"
+
+
+def _invoice(source_pdf="a.pdf", number="INV-1") -> Invoice:
+    return Invoice(
+        source_pdf=source_pdf,
+        invoice_number=number,
+        invoice_date=date(2024, 3, 1),
+        seller_name="Muster GmbH",
+        buyer_name="Kunde AG",
+        currency="EUR",
+        net_total=100.0,
+        tax_amount=19.0,
+        gross_total=119.0,
+    )
+
+
+def _flags(validation):
+    return [DUPLICATE in r["errors"] for r in validation["results"]]
+
+
+@pytest.fixture
+def index():
+    idx = DuplicateIndex(":memory:")
+    yield idx
+    idx.close()
+
+
+# -------------------- Validator and index --------------------
+
+def test_repeat_within_batch_is_duplicate_without_index():
+    validation = validate_invoices([_invoice(), _invoice()])
+    assert _flags(validation) == [False, True]
+
+
+def test_repeat_within_batch_is_duplicate_for_same_source(index):
+    validation = validate_invoices(
+        [_invoice(), _invoice()], dup_index=index, sources=["/x/a.pdf", "/x/a.pdf"]
+    )
+    assert _flags(validation) == [False, True]
+
+
+def test_repeat_within_batch_is_duplicate_without_sources(index):
+    validation = validate_invoices([_invoice(), _invoice()], dup_index=index)
+    assert _flags(validation) == [False, True]
+
+
+def test_none_sources_are_never_the_same(index):
+    assert _flags(validate_invoices([_invoice()], dup_index=index)) == [False]
+    assert _flags(validate_invoices([_invoice()], dup_index=index)) == [True]
+
+
+def test_rescan_of_same_path_is_not_duplicate(index):
+    for _ in range(2):
+        validation = validate_invoices(
+            [_invoice()], dup_index=index, sources=["/x/a.pdf"]
+        )
+        assert _flags(validation) == [False]
+
+
+def test_same_filename_from_another_path_is_duplicate(index):
+    validate_invoices([_invoice()], dup_index=index, sources=["/x/a.pdf"])
+    validation = validate_invoices([_invoice()], dup_index=index, sources=["/y/a.pdf"])
+    assert _flags(validation) == [True]
+
+
+def test_sources_must_match_invoices(index):
+    with pytest.raises(ValueError):
+        validate_invoices(
+            [_invoice(), _invoice("b.pdf")], dup_index=index, sources=["/x/a.pdf"]
+        )
+    assert len(index) == 0
+
+
+def test_seeded_keys_are_checked_with_index(index):
+    validator = InvoiceValidator(dup_index=index)
+    validator.seed(_invoice("old.pdf"))
+    assert DUPLICATE in validator.validate(_invoice("new.pdf"), "/x/new.pdf")["errors"]
+
+
+def test_cli_rescan_flags_only_true_duplicates(tmp_path, sample_pdf):
+    pdf_dir = tmp_path / "in"
+    pdf_dir.mkdir()
+    data = sample_pdf.read_bytes()
+    (pdf_dir / "a.pdf").write_bytes(data)
+    (pdf_dir / "b.pdf").write_bytes(data)
+    args = [
+        "--pdf-dir", str(pdf_dir),
+        "--json-out", str(tmp_path / "out.ndjson"),
+        "--pdf-out-dir", str(tmp_path / "reports"),
+        "--format", "ndjson",
+        "--no-cache",
+        "--dup-index", str(tmp_path / "dups.sqlite"),
+    ]
+
+    def run():
+        cli_main(args)
+        lines = (tmp_path / "out.ndjson").read_text().splitlines()[:-1]
+        return [DUPLICATE in line for line in lines]
+
+    assert run() == [False, True]
+    # a.pdf is the same file as last time; b.pdf is still a copy of it
+    assert run() == [False, True]
+
+
+# -------------------- API --------------------
+
+@pytest.fixture
+def api(index, monkeypatch):
+    from invoice_qc import api as api_module
+
+    monkeypatch.setattr(api_module, "dup_index", index)
+    monkeypatch.setattr(api_module.job_runner, "dup_index", index)
+    return api_module
+
+
+def _upload(pdf, name):
+    return ("files", (name, pdf.read_bytes(), "application/pdf"))
+
+
+def test_validate_json_flags_repeat_and_leaves_index_alone(api, index):
+    from fastapi.testclient import TestClient
+
+    body = [json.loads(_invoice().json())] * 2
+    client = TestClient(api.app)
+    response = client.post("/validate-json", json=body)
+    assert response.status_code == 200
+    assert _flags(response.json()) == [False, True]
+    assert len(index) == 0
+
+
+def test_validate_json_record_uses_index(api, index):
+    from fastapi.testclient import TestClient
+
+    body = [json.loads(_invoice().json())]
+    client = TestClient(api.app)
+    first = client.post("/validate-json?record=true", json=body).json()
+    second = client.post("/validate-json?record=true", json=body).json()
+    assert _flags(first) == [False]
+    assert _flags(second) == [True]
+    assert len(index) == 1
+
+
+def test_same_pdf_twice_in_one_upload_is_duplicate(api, sample_pdf):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(api.app)
+    response = client.post(
+        "/extract-and-validate-pdfs",
+        files=[_upload(sample_pdf, "a.pdf"), _upload(sample_pdf, "a.pdf")],
+    )
+    assert response.status_code == 200
+    assert _flags(response.json()["validation"]) == [False, True]
+
+
+def test_reupload_of_same_filename_is_duplicate(api, sample_pdf):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(api.app)
+    flags = [
+        _flags(
+            client.post(
+                "/extract-and-validate-pdfs", files=[_upload(sample_pdf, "a.pdf")]
+            ).json()["validation"]
+        )
+        for _ in range(2)
+    ]
+    assert flags == [[False], [True]]
+
+
+def _wait_for_job(client, job_id):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in FINISHED:
+            return client.get(f"/jobs/{job_id}/results").json()
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_reupload_is_duplicate(api, sample_pdf, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    # Only the job runner: the app's lifespan would close the shared stores
+    @asynccontextmanager
+    async def lifespan(app):
+        api.job_runner.start()
+        yield
+        await api.job_runner.stop()
+
+    monkeypatch.setattr(api.app.router, "lifespan_context", lifespan)
+    with TestClient(api.app) as client:
+        flags = []
+        for _ in range(2):
+            job = client.post("/jobs", files=[_upload(sample_pdf, "a.pdf")]).json()
+            results = _wait_for_job(client, job["job_id"])["results"]
+            flags.append([DUPLICATE in r["validation"]["errors"] for r in results])
+    assert flags == [[False], [True]]
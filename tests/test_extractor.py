@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+
+from invoice_qc.extractor import (
+    ExtractOptions,
+    _found_fields,
+    extract_currency,
+    extract_fields,
+    extract_invoice_date,
+    extract_invoice_from_file,
+    extract_invoice_from_text,
+    extract_invoice_number,
+    extract_seller,
+    extract_totals,
+)
+
+SAMPLE_PDFS = sorted((Path(__file__).resolve().parent.parent / "pdfs").glob("*.pdf"))
+
+# "AUFNR" without digits right after it
+BARE_AUFNR = "Bestellung AUFNR: 12345 vom 22.05.2024\nGesamtwert EUR 64,00"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        BARE_AUFNR,
+        BARE_AUFNR + "\nBestellung AUFNR34343 vom 23.05.2024",
+        "AUFNR",
+        "",
+    ],
+)
+def test_extract_fields_matches_single_extractors(text):
+    fields = extract_fields(text)
+    assert fields["invoice_number"] == extract_invoice_number(text)
+    assert fields["invoice_date"] == extract_invoice_date(text)
+    assert fields["seller_name"] == extract_seller(text)
+    assert fields["currency"] == extract_currency(text)
+    net, tax, gross = extract_totals(text)
+    assert (fields["net_total"], fields["tax_amount"], fields["gross_total"]) == (
+        net,
+        tax,
+        gross,
+    )
+
+
+def test_bare_aufnr_is_not_an_extraction_error():
+    inv = extract_invoice_from_text(BARE_AUFNR, "a.pdf")
+    assert inv.extraction_error is None
+    assert inv.invoice_number is None
+    assert inv.gross_total == 64.0
+    assert "invoice_number" not in _found_fields(BARE_AUFNR)
+
+
+# pdfium ignores regions
+@pytest.mark.parametrize("backend", ["pdfplumber", "pdfminer"])
+@pytest.mark.parametrize("pdf", SAMPLE_PDFS, ids=lambda p: p.name)
+def test_region_extraction_matches_full_page(pdf, backend):
+    def extract(regions):
+        with open(pdf, "rb") as fh:
+            inv = extract_invoice_from_file(
+                fh, pdf.name, options=ExtractOptions(backend=backend, regions=regions)
+            )
+        return inv.dict()
+
+    full = extract(regions=False)
+    assert full["extraction_error"] is None
+    assert extract(regions=True) == full
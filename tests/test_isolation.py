@@ -0,0 +1,25 @@
+import os
+import signal
+import time
+
+import pytest
+
+from invoice_qc.isolation import IsolatedExecutor, WorkerCrashed
+
+
+def test_worker_killed_while_idle_is_replaced():
+    executor = IsolatedExecutor(1)
+    try:
+        pid = executor.submit(os.getpid).result(timeout=30)
+        os.kill(pid, signal.SIGKILL)
+        # Give the kernel time to close the worker's end of the pipe
+        time.sleep(0.2)
+
+        with pytest.raises(WorkerCrashed, match="SIGKILL"):
+            executor.submit(os.getpid).result(timeout=30)
+
+        new_pid = executor.submit(os.getpid).result(timeout=30)
+        assert new_pid != pid
+        assert executor.submit(os.getpid).result(timeout=30) == new_pid
+    finally:
+        executor.shutdown()
@@ -0,0 +1,89 @@
+from datetime import date
+
+import pytest
+
+from invoice_qc.extractor import MAX_ITEM_ROW_CHARS, extract_line_items
+from invoice_qc.schema import Invoice
+from invoice_qc.validator import validate_invoice
+
+TABLE = """Bestellung AUFNR34343 vom 22.05.2024
+Pos. Artikelbeschreibung Preis Menge Betrag
+1 Kopierpapier A4 weiß 16,0000 2 VE 1 VE=20 Stück 32,00
+2 Heftklammern 24/6 2 VE 1 VE=10 Stück 12,00
+6,0000 pro 1 VE
+3 Ordner breit 4 Stück 20,00
+Gesamtwert EUR 64,00
+4 Kein Artikel 1 VE 99,00
+"""
+
+ITEMS = [
+    {"description": d, "quantity": q, "unit_price": p, "line_total": t}
+    for d, q, p, t in [
+        ("Kopierpapier A4 weiß", 2.0, 16.0, 32.0),
+        ("Heftklammern 24/6", 2.0, 6.0, 12.0),
+        ("Ordner breit", 4.0, 5.0, 20.0),
+    ]
+]
+
+
+def _invoice(line_items, net_total=64.0, **fields) -> Invoice:
+    return Invoice(
+        source_pdf="a.pdf",
+        invoice_number="AUFNR34343",
+        invoice_date=date(2024, 5, 22),
+        seller_name="Muster GmbH",
+        buyer_name="Kunde AG",
+        currency="EUR",
+        net_total=net_total,
+        tax_amount=round(net_total * 0.19, 2),
+        gross_total=round(net_total * 1.19, 2),
+        line_items=line_items,
+        **fields,
+    )
+
+
+# -------------------- Extraction --------------------
+
+def test_table_rows_are_extracted():
+    # The row after the totals line is outside the table
+    assert extract_line_items(TABLE) == ITEMS
+
+
+def test_text_without_marker_has_no_items():
+    assert extract_line_items(TABLE.replace("Artikelbeschreibung", "Artikel")) == []
+
+
+def test_rows_over_the_length_limit_are_skipped():
+    description = "x" * MAX_ITEM_ROW_CHARS
+    text = TABLE.replace("Ordner breit", description)
+    assert [i["description"] for i in extract_line_items(text)] == [
+        "Kopierpapier A4 weiß",
+        "Heftklammern 24/6",
+    ]
+
+
+# -------------------- Rules --------------------
+
+def test_matching_table_passes():
+    errors = validate_invoice(_invoice(ITEMS))
+    assert "rule:line_item_mismatch" not in errors
+    assert "rule:line_items_sum_mismatch" not in errors
+
+
+def test_line_total_off_from_quantity_times_price():
+    items = [dict(ITEMS[0], line_total=30.0), *ITEMS[1:]]
+    errors = validate_invoice(_invoice(items, net_total=62.0))
+    assert "rule:line_item_mismatch" in errors
+    assert "rule:line_items_sum_mismatch" not in errors
+
+
+@pytest.mark.parametrize(
+    "pages, flagged",
+    [((3, 3), True), ((3, 2), False), ((None, None), True)],
+)
+def test_sum_check_is_skipped_on_partial_scans(pages, flagged):
+    page_count, pages_parsed = pages
+    inv = _invoice(ITEMS[:2], page_count=page_count, pages_parsed=pages_parsed)
+    errors = validate_invoice(inv)
+    assert ("rule:line_items_sum_mismatch" in errors) == flagged
+    assert "rule:line_item_mismatch" not in errors
@@ -0,0 +1,44 @@
+import json
+
+from invoice_qc.manifest import Manifest
+from invoice_qc.schema import InvoiceRecord
+
+
+def _record_all(manifest, folder, invoices):
+    scan = manifest.scan(str(folder))
+    for path in scan.changed:
+        inv = invoices[path.rsplit("/", 1)[-1]]
+        manifest.record(path, inv, {"is_valid": True, "errors": []}, "r.pdf")
+    manifest.commit()
+    return scan
+
+
+def test_failed_extractions_are_retried(tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    (folder / "ok.pdf").write_bytes(b"%PDF ok")
+    (folder / "bad.pdf").write_bytes(b"%PDF bad")
+    invoices = {
+        "ok.pdf": InvoiceRecord(source_pdf="ok.pdf", invoice_number="AUFNR1"),
+        "bad.pdf": InvoiceRecord(
+            source_pdf="bad.pdf", extraction_error="BudgetExceeded: timeout"
+        ),
+    }
+
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"), variant="v")
+    try:
+        first = _record_all(manifest, folder, invoices)
+        assert len(first.changed) == 2
+
+        second = _record_all(manifest, folder, invoices)
+        assert [p.rsplit("/", 1)[-1] for p in second.changed] == ["bad.pdf"]
+        # The failure is still part of the folder's entries
+        entries = manifest.entries(str(folder))
+        invoice_json = entries[str(folder.resolve() / "bad.pdf")][0]
+        assert json.loads(invoice_json)["extraction_error"]
+
+        invoices["bad.pdf"] = InvoiceRecord(source_pdf="bad.pdf")
+        _record_all(manifest, folder, invoices)
+        assert manifest.scan(str(folder)).changed == []
+    finally:
+        manifest.close()
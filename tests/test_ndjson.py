@@ -0,0 +1,112 @@
+import json
+
+from invoice_qc.cli import main as cli_main
+from invoice_qc.ndjson import parse_chunk
+
+
+def _invoice(number="INV-1", net=100.0, **fields) -> dict:
+    # A distinct net total per invoice keeps them apart as near duplicates
+    invoice = {
+        "source_pdf": f"{number}.pdf",
+        "invoice_number": number,
+        "invoice_date": "2024-03-01",
+        "seller_name": "Muster GmbH",
+        "buyer_name": "Kunde AG",
+        "currency": "EUR",
+        "net_total": net,
+        "tax_amount": round(net * 0.19, 2),
+        "gross_total": round(net * 1.19, 2),
+    }
+    invoice.update(fields)
+    return invoice
+
+
+def _validate(tmp_path, *lines):
+    infile = tmp_path / "in.ndjson"
+    infile.write_text("".join(line + "\n" for line in lines))
+    outfile = tmp_path / "out.ndjson"
+    code = cli_main(["validate", str(infile), "--out", str(outfile)])
+    *rows, summary = [json.loads(l) for l in outfile.read_text().splitlines()]
+    return code, rows, summary
+
+
+def test_two_values_on_one_line_do_not_shift_later_lines(tmp_path):
+    a1 = json.dumps(_invoice("A1"))
+    a2 = json.dumps(_invoice("A2", 200.0))
+    b1 = json.dumps(_invoice("B1", 300.0))
+    code, rows, summary = _validate(tmp_path, f"{a1},{a2}", b1)
+    assert rows[0]["line"] == 1 and rows[0]["error"].startswith("invalid JSON")
+    assert rows[1]["invoice_id"] == "B1" and rows[1]["is_valid"]
+    assert summary["rejected"] == 1
+    assert summary["summary"]["total_invoices"] == 1
+    assert code == 1
+
+
+def test_string_spanning_lines_is_rejected_per_line():
+    rows = parse_chunk([(1, b'{"invoice_number": "A'), (2, b'B"}')])
+    assert [(lineno, error is not None) for lineno, _, error in rows] == [
+        (1, True),
+        (2, True),
+    ]
+
+
+def test_invalid_json_and_non_objects_are_rejected(tmp_path):
+    code, rows, summary = _validate(
+        tmp_path, "{not json", "[1, 2]", json.dumps(_invoice())
+    )
+    assert [r.get("line") for r in rows[:2]] == [1, 2]
+    assert rows[0]["error"].startswith("invalid JSON")
+    assert rows[1]["error"] == "expected a JSON object"
+    assert rows[2]["is_valid"]
+    assert summary["rejected"] == 2
+    assert code == 1
+
+
+def test_schema_errors_reject_only_their_line(tmp_path):
+    code, rows, summary = _validate(
+        tmp_path,
+        json.dumps(_invoice("A1")),
+        json.dumps(_invoice("A2", 200.0, gross_total="lots")),
+        json.dumps(_invoice("A3", 300.0)),
+    )
+    assert rows[1]["line"] == 2 and "gross_total" in rows[1]["error"]
+    assert [r.get("invoice_id") for r in rows] == ["A1", None, "A3"]
+    assert summary["rejected"] == 1
+    assert summary["summary"]["valid_invoices"] == 2
+
+
+def test_valid_input_exits_zero(tmp_path):
+    code, rows, summary = _validate(
+        tmp_path, json.dumps(_invoice("A1")), "", json.dumps(_invoice("A2", 200.0))
+    )
+    assert [r["is_valid"] for r in rows] == [True, True]
+    assert summary == {
+        "summary": {
+            "total_invoices": 2,
+            "valid_invoices": 2,
+            "invalid_invoices": 0,
+            "error_counts": {},
+        },
+        "rejected": 0,
+    }
+    assert code == 0
+
+
+def test_invalid_invoice_exits_one(tmp_path):
+    code, rows, summary = _validate(tmp_path, json.dumps(_invoice(gross_total=1.0)))
+    assert not rows[0]["is_valid"]
+    assert summary["rejected"] == 0
+    assert code == 1
+
+
+def test_run_ndjson_output_is_accepted(tmp_path):
+    records = [
+        {"extracted": _invoice("A1"), "validation": {"is_valid": True}},
+        {"extracted": _invoice("A2", 200.0), "validation": {"is_valid": True}},
+        {"summary": {"total_invoices": 2}},
+    ]
+    code, rows, summary = _validate(tmp_path, *map(json.dumps, records))
+    assert [r["invoice_id"] for r in rows] == ["A1", "A2"]
+    assert summary["summary"]["total_invoices"] == 2
+    assert summary["rejected"] == 0
+    assert code == 0
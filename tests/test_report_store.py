@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from invoice_qc import api
+from invoice_qc.report_store import ReportStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def hold_writes(store, monkeypatch):
+    """Keep the writer thread from committing until the event is set."""
+    release = threading.Event()
+    write = store._write
+
+    def held_write(ids, final):
+        release.wait(10)
+        write(ids, final)
+
+    monkeypatch.setattr(store, "_write", held_write)
+    yield release
+    release.set()
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(api, "report_store", store)
+    monkeypatch.setattr(api, "dup_index", None)
+    return TestClient(api.app)
+
+
+def _payload(name, invalid=0) -> dict:
+    return {
+        "extracted": [{"source_pdf": name}],
+        "validation": {
+            "results": [],
+            "summary": {
+                "total_invoices": 1,
+                "valid_invoices": 1 - invalid,
+                "invalid_invoices": invalid,
+                "error_counts": {},
+            },
+        },
+    }
+
+
+def test_report_is_readable_before_and_after_commit(
+    store, hold_writes, client, sample_pdf, tmp_path
+):
+    response = client.post(
+        "/extract-and-validate-pdfs",
+        files=[("files", ("a.pdf", sample_pdf.read_bytes(), "application/pdf"))],
+    )
+    assert response.status_code == 200
+    posted = response.json()
+    report_id = posted["report_id"]
+
+    # Still queued: served from memory
+    assert report_id in store._pending
+    pending = client.get(f"/reports/{report_id}").json()
+    assert pending["extracted"] == posted["extracted"]
+    assert pending["validation"] == posted["validation"]
+    assert [r["report_id"] for r in client.get("/reports").json()["reports"]] == [
+        report_id
+    ]
+
+    hold_writes.set()
+    store.flush()
+    committed = client.get(f"/reports/{report_id}").json()
+    assert committed == pending
+
+    store.close()
+    reopened = ReportStore(store.path)
+    try:
+        assert reopened.get(report_id) == pending
+    finally:
+        reopened.close()
+
+
+def test_unknown_report_is_404(client):
+    assert client.get("/reports/nope").status_code == 404
+
+
+@pytest.mark.parametrize("committed", [False, True])
+def test_since_and_invalid_only_filters(store, hold_writes, client, committed):
+    def append(*args):
+        # Distinct creation times, so the newest-first order is fixed
+        time.sleep(0.01)
+        return store.append(_payload(*args))
+
+    old_ok = append("old_ok.pdf")
+    old_bad = append("old_bad.pdf", 1)
+    time.sleep(0.01)
+    since = time.time()
+    new_ok = append("new_ok.pdf")
+    new_bad = append("new_bad.pdf", 1)
+    if committed:
+        hold_writes.set()
+        store.flush()
+    assert len(store._pending) == (0 if committed else 4)
+
+    def ids(query=""):
+        response = client.get(f"/reports{query}")
+        assert response.status_code == 200
+        return [r["report_id"] for r in response.json()["reports"]]
+
+    assert ids() == [new_bad, new_ok, old_bad, old_ok]
+    assert ids(f"?since={since}") == [new_bad, new_ok]
+    assert ids("?invalid_only=true") == [new_bad, old_bad]
+    assert ids(f"?since={since}&invalid_only=true") == [new_bad]
+    assert ids("?offset=1&limit=2") == [new_ok, old_bad]